@@ -6,6 +6,7 @@ from django.contrib.auth.models import User
 import jwt
 from datetime import datetime, timedelta
 from django.conf import settings
+from config.schema_extensions import SCHEMA_EXTENSIONS
 
 
 @strawberry.django.type(User)
@@ -60,7 +61,7 @@ def generate_jwt_token(user):
 @strawberry.type
 class Query:
     @strawberry.field
-    def me(self, info) -> Optional[UserType]:
+    def me(self, info: strawberry.Info) -> Optional[UserType]:
         request = info.context["request"]
         if hasattr(request, 'user') and request.user.is_authenticated:
             return request.user
@@ -155,4 +156,4 @@ class Mutation:
         )
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=SCHEMA_EXTENSIONS)
\ No newline at end of file
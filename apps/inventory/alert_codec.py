@@ -0,0 +1,116 @@
+import json
+from datetime import datetime, timedelta
+import msgpack
+from django.conf import settings
+
+# Wire format: MAGIC, one schema-id byte, then a msgpack array holding the
+# schema's fields in order plus a trailing map for any fields the schema does
+# not know about. Legacy JSON values start with '{', which never equals MAGIC,
+# so both formats can share a topic during a rollout.
+MAGIC = 0xA7
+
+SCHEMA_GENERIC = 0
+SCHEMA_LOW_STOCK_ALERT_V1 = 1
+SCHEMA_PURCHASE_SUGGESTION_V1 = 2
+SCHEMA_LOW_STOCK_ALERT_V2 = 3
+
+SCHEMAS = {
+    SCHEMA_LOW_STOCK_ALERT_V1: ('LOW_STOCK_ALERT', (
+        'idempotency_key', 'product_id', 'product_name', 'sku',
+        'current_stock', 'threshold', 'timestamp', 'severity',
+    )),
+    SCHEMA_PURCHASE_SUGGESTION_V1: ('PURCHASE_SUGGESTION', (
+        'suggestion_id', 'product_name', 'sku', 'supplier',
+        'suggested_qty', 'total_cost', 'reason',
+    )),
+    SCHEMA_LOW_STOCK_ALERT_V2: ('LOW_STOCK_ALERT', (
+        'idempotency_key', 'product_id', 'product_name', 'sku',
+        'current_stock', 'threshold', 'timestamp', 'severity',
+        'category_id', 'supplier_ids',
+    )),
+}
+# New messages are written with the latest schema for their type; older
+# schema ids stay in SCHEMAS so messages already on the topic still decode.
+SCHEMA_BY_TYPE = {
+    'LOW_STOCK_ALERT': SCHEMA_LOW_STOCK_ALERT_V2,
+    'PURCHASE_SUGGESTION': SCHEMA_PURCHASE_SUGGESTION_V1,
+}
+
+SEVERITIES = ('MEDIUM', 'HIGH', 'CRITICAL')
+EPOCH = datetime(1970, 1, 1)
+
+
+def _pack_field(name, value):
+    if value is None:
+        return None
+    if name == 'severity' and value in SEVERITIES:
+        return SEVERITIES.index(value)
+    if name == 'idempotency_key' and len(value) == 32:
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            return value
+    if name == 'timestamp':
+        try:
+            moment = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return value
+        if moment.tzinfo is None:
+            return (moment - EPOCH) // timedelta(microseconds=1)
+    return value
+
+
+def _unpack_field(name, value):
+    if value is None:
+        return None
+    if name == 'severity' and isinstance(value, int):
+        return SEVERITIES[value]
+    if name == 'idempotency_key' and isinstance(value, bytes):
+        return value.hex()
+    if name == 'timestamp' and isinstance(value, int):
+        return (EPOCH + timedelta(microseconds=value)).isoformat()
+    return value
+
+
+def encode_compact(message):
+    schema_id = SCHEMA_BY_TYPE.get(message.get('type'), SCHEMA_GENERIC)
+    if schema_id == SCHEMA_GENERIC:
+        body = message
+    else:
+        fields = SCHEMAS[schema_id][1]
+        extras = {key: value for key, value in message.items() if key not in fields and key != 'type'}
+        body = [_pack_field(name, message.get(name)) for name in fields] + [extras]
+    return bytes((MAGIC, schema_id)) + msgpack.packb(body, use_bin_type=True)
+
+
+def encode_json(message):
+    return json.dumps(message).encode('utf-8')
+
+
+def encode_alert(message, encoding=None):
+    """Serialise a pipeline message using ``STOCK_ALERT_ENCODING`` ('msgpack' or 'json')"""
+    encoding = encoding or getattr(settings, 'STOCK_ALERT_ENCODING', 'msgpack')
+    if encoding == 'json':
+        return encode_json(message)
+    return encode_compact(message)
+
+
+def decode_alert(data):
+    """Deserialise a pipeline message in either the compact or the legacy JSON format"""
+    if not data or data[0] != MAGIC:
+        return json.loads(data.decode('utf-8'))
+
+    schema_id = data[1]
+    body = msgpack.unpackb(data[2:], raw=False)
+    if schema_id == SCHEMA_GENERIC:
+        return body
+    if schema_id not in SCHEMAS:
+        raise ValueError(f"Unknown alert schema id {schema_id}")
+
+    message_type, fields = SCHEMAS[schema_id]
+    message = {'type': message_type}
+    for name, value in zip(fields, body):
+        message[name] = _unpack_field(name, value)
+    if len(body) > len(fields):
+        message.update(body[len(fields)])
+    return message
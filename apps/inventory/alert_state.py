@@ -0,0 +1,160 @@
+import logging
+import math
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from .kafka_producer import StockAlertProducer
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_RANK = {
+    'MEDIUM': 1,
+    'HIGH': 2,
+    'CRITICAL': 3,
+}
+
+
+class StockAlertGate:
+    """Debounces low stock alerts using per-product state kept in the cache.
+
+    State per product is ``{'severity', 'stock', 'alerted_at'}`` where a
+    ``None`` severity means the product is re-armed. An alert fires when a
+    re-armed product drops to its threshold (and the cooldown since the last
+    alert has passed) or when the severity of an active alert escalates.
+    A product re-arms only once stock climbs back above the threshold plus a
+    hysteresis margin, so stock oscillating around the threshold stays quiet.
+
+    Every stored state carries a random ``token``. An alerting transition
+    first claims ``(token, severity)`` with ``cache.add``, so of several saves
+    racing from the same state only one alerts.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'STOCK_ALERT_CACHE', 'default')]
+        self.cooldown = getattr(settings, 'STOCK_ALERT_COOLDOWN_SECONDS', 900)
+        self.rearm_ratio = getattr(settings, 'STOCK_ALERT_REARM_RATIO', 0.2)
+        self.rearm_min_units = getattr(settings, 'STOCK_ALERT_REARM_MIN_UNITS', 1)
+        self.state_ttl = getattr(settings, 'STOCK_ALERT_STATE_TTL', 7 * 24 * 3600)
+
+    def _key(self, product_id):
+        return f'stock_alert_state:{product_id}'
+
+    def _claim_key(self, product_id, state, severity):
+        # States stored before tokens existed are told apart by their alert time
+        previous = (state.get('token') or state['alerted_at']) if state else None
+        return f'stock_alert_claim:{product_id}:{previous}:{severity}'
+
+    def rearm_level(self, threshold):
+        """Stock level a product has to exceed before it can alert again"""
+        margin = max(math.ceil(threshold * self.rearm_ratio), self.rearm_min_units)
+        return threshold + margin
+
+    def evaluate(self, product_id, current_stock, threshold):
+        """Return ``(should_alert, new_state)``.
+
+        An alert is claimed and recorded here before returning True, and
+        ``new_state`` is then None; any other state change is returned for
+        the caller to persist with ``record``.
+        """
+        state = self.cache.get(self._key(product_id))
+        now = time.time()
+
+        if current_stock > threshold:
+            if state and state['severity'] and current_stock > self.rearm_level(threshold):
+                return False, {**state, 'severity': None, 'stock': current_stock, 'token': uuid.uuid4().hex}
+            return False, None
+
+        severity = StockAlertProducer._get_severity(current_stock, threshold)
+        new_state = {'severity': severity, 'stock': current_stock, 'alerted_at': now, 'token': uuid.uuid4().hex}
+
+        if not state:
+            return self._claim(product_id, state, new_state)
+
+        if state['severity'] is None:
+            # Re-armed: a fresh crossing, unless it comes back inside the cooldown
+            if now - state['alerted_at'] >= self.cooldown:
+                return self._claim(product_id, state, new_state)
+            return False, {**new_state, 'alerted_at': state['alerted_at']}
+
+        if SEVERITY_RANK[severity] > SEVERITY_RANK[state['severity']]:
+            return self._claim(product_id, state, new_state)
+
+        return False, None
+
+    def _claim(self, product_id, state, new_state):
+        """Alert only if no other save has already moved the product on from ``state``"""
+        if not self.cache.add(self._claim_key(product_id, state, new_state['severity']), 1, timeout=self.state_ttl):
+            logger.info(f"Alert for product {product_id} already claimed by a concurrent save")
+            return False, None
+        self.record(product_id, new_state)
+        return True, None
+
+    def record(self, product_id, state):
+        """Persist state returned by ``evaluate``"""
+        try:
+            self.cache.set(self._key(product_id), state, timeout=self.state_ttl)
+        except Exception as e:
+            logger.error(f"Failed to store alert state for product {product_id}: {e}")
+
+    def reset(self, product_id):
+        """Forget alert state so the next low stock save alerts again"""
+        self.cache.delete_many(
+            [self._key(product_id)] + [self._claim_key(product_id, None, severity) for severity in SEVERITY_RANK]
+        )
+
+
+class ProcessedAlertStore:
+    """Remembers the idempotency keys of alerts that were fully processed.
+
+    Consumers commit offsets only after processing, so a crash or rebalance
+    replays some alerts; checking this store first turns the replay into a
+    cache lookup. Alerts without an ``idempotency_key`` (produced before the
+    key existed) are always processed.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'STOCK_ALERT_CACHE', 'default')]
+        self.ttl = getattr(settings, 'STOCK_ALERT_DEDUPE_TTL', 24 * 3600)
+
+    def _key(self, idempotency_key):
+        return f'stock_alert_done:{idempotency_key}'
+
+    def filter_new(self, alerts):
+        """Return the alerts that have not been processed yet"""
+        keys = [self._key(alert['idempotency_key']) for alert in alerts if alert.get('idempotency_key')]
+        if not keys:
+            return list(alerts)
+        try:
+            seen = self.cache.get_many(keys)
+        except Exception as e:
+            logger.error(f"Dedupe store unavailable, processing all alerts: {e}")
+            return list(alerts)
+        fresh = [
+            alert for alert in alerts
+            if not alert.get('idempotency_key') or self._key(alert['idempotency_key']) not in seen
+        ]
+        if len(fresh) < len(alerts):
+            logger.info(f"Skipping {len(alerts) - len(fresh)} already processed alerts")
+        return fresh
+
+    def mark_processed(self, alerts):
+        """Record alerts as processed"""
+        keys = {self._key(alert['idempotency_key']): 1 for alert in alerts if alert.get('idempotency_key')}
+        if not keys:
+            return
+        try:
+            self.cache.set_many(keys, timeout=self.ttl)
+        except Exception as e:
+            logger.error(f"Failed to record processed alerts: {e}")
+
+
+_gate = None
+
+
+def get_stock_alert_gate():
+    """Return the shared alert gate"""
+    global _gate
+    if _gate is None:
+        _gate = StockAlertGate()
+    return _gate
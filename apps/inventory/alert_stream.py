@@ -0,0 +1,100 @@
+import logging
+from django.conf import settings
+from django.core.cache import caches
+from .fanout import alert_groups, stock_alert_event
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = 'stock_alert_seq'
+
+
+class StockAlertHistory:
+    """Bounded, replayable history of the stock alert events sent to WebSockets.
+
+    Every published alert gets the next ``event_id`` from a counter in the
+    alert cache (shared by all consumer processes when that cache is Redis)
+    and its pre-encoded event is kept under that id. Only the most recent
+    ``STOCK_ALERT_HISTORY_SIZE`` ids can be replayed; older ones count as
+    evicted even if the cache still holds them. Ids are reserved before their
+    events are stored, so a missing event among the newest
+    ``STOCK_ALERT_HISTORY_IN_FLIGHT`` ids is still being written, not evicted.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'STOCK_ALERT_CACHE', 'default')]
+        self.size = getattr(settings, 'STOCK_ALERT_HISTORY_SIZE', 10000)
+        self.ttl = getattr(settings, 'STOCK_ALERT_HISTORY_TTL', 3600)
+        self.in_flight = getattr(settings, 'STOCK_ALERT_HISTORY_IN_FLIGHT', 1000)
+
+    def _key(self, event_id):
+        return f'stock_alert_event:{event_id}'
+
+    def _reserve(self, count):
+        """Reserve ``count`` consecutive ids and return the last one"""
+        try:
+            return self.cache.incr(SEQUENCE_KEY, count)
+        except ValueError:
+            self.cache.add(SEQUENCE_KEY, 0, timeout=None)
+            return self.cache.incr(SEQUENCE_KEY, count)
+
+    def latest_id(self):
+        return self.cache.get(SEQUENCE_KEY, 0)
+
+    def record(self, alerts):
+        """Assign event ids to ``alerts`` in order, store them and return their channel layer events"""
+        if not alerts:
+            return []
+        try:
+            last_id = self._reserve(len(alerts))
+        except Exception as e:
+            # Fail open: alerts still go out live, they just cannot be replayed
+            logger.error(f"❌ Alert history unavailable, sending {len(alerts)} alerts without event ids: {e}")
+            return [stock_alert_event(alert_data) for alert_data in alerts]
+
+        first_id = last_id - len(alerts) + 1
+        events = [stock_alert_event(alert_data, event_id) for event_id, alert_data in enumerate(alerts, first_id)]
+        entries = {
+            self._key(event['event_id']): {'event': event, 'groups': alert_groups(alert_data)}
+            for event, alert_data in zip(events, alerts)
+        }
+        try:
+            self.cache.set_many(entries, timeout=self.ttl)
+        except Exception as e:
+            logger.error(f"❌ Failed to store alert history for events {first_id}-{last_id}: {e}")
+        return events
+
+    def since(self, last_event_id):
+        """Return ``(entries, latest_id)`` for every event after ``last_event_id``.
+
+        ``entries`` is ``None`` when part of the gap has already been evicted
+        and the caller has to fall back to a snapshot. Replay stops before an
+        event that is still being written; ``latest_id`` is then the last
+        replayed id and the rest arrives live.
+        """
+        latest = self.latest_id()
+        if last_event_id >= latest:
+            return [], latest
+        if latest - last_event_id > self.size:
+            return None, latest
+        event_ids = range(last_event_id + 1, latest + 1)
+        found = self.cache.get_many([self._key(event_id) for event_id in event_ids])
+        entries = []
+        for event_id in event_ids:
+            entry = found.get(self._key(event_id))
+            if entry is None:
+                if latest - event_id < self.in_flight:
+                    return entries, event_id - 1
+                return None, latest
+            entries.append(entry)
+        return entries, latest
+
+
+_history = None
+
+
+def get_stock_alert_history():
+    """Return the shared alert history"""
+    global _history
+    if _history is None:
+        _history = StockAlertHistory()
+    return _history
@@ -0,0 +1,224 @@
+import asyncio
+import functools
+import logging
+from collections import defaultdict
+from fnmatch import fnmatchcase
+from channels_redis.core import BoundedQueue, RedisChannelLayer, RedisLoopLayer
+from channels_redis.utils import _close_redis, _consistent_hash, _wrap_close, create_pool, decode_hosts
+from redis import asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastRedisChannelLayer(RedisChannelLayer):
+    """RedisChannelLayer that fans broadcast groups out through Redis pub/sub.
+
+    ``RedisChannelLayer.group_send`` reads the group's members and queues the
+    message for each of them, so its cost grows with the number of sockets.
+    For groups matching ``broadcast_groups`` (fnmatch patterns) membership is
+    kept per process instead: a process subscribes once per group and a
+    ``group_send`` is a single PUBLISH, deserialised once per process and
+    handed to every local member. Broadcast groups are spread over
+    ``broadcast_hosts`` (default: ``hosts``) by consistent hashing.
+
+    Per-channel ``send``/``receive`` and every other group keep the
+    RedisChannelLayer semantics. Broadcast delivery is at-most-once: a
+    process that is not subscribed when a message is published misses it,
+    which the alert stream covers with ``last_event_id`` replay.
+    """
+
+    def __init__(self, broadcast_groups=(), broadcast_hosts=None, **kwargs):
+        super().__init__(**kwargs)
+        self.broadcast_patterns = list(broadcast_groups)
+        self.broadcast_hosts = decode_hosts(broadcast_hosts or kwargs.get('hosts'))
+        self._broadcast_cache = {}
+        # Broadcast group -> channels of this process in it
+        self.local_groups = defaultdict(set)
+        # Event loop -> pub/sub subscriber per broadcast host
+        self._subscribers = {}
+        # Broadcast messages waiting for each local channel, and the regular
+        # receive left running when a broadcast message won the race
+        self.broadcast_inbox = defaultdict(functools.partial(BoundedQueue, self.capacity))
+        self._pending_receives = {}
+
+    def is_broadcast(self, group):
+        try:
+            return self._broadcast_cache[group]
+        except KeyError:
+            matched = any(fnmatchcase(group, pattern) for pattern in self.broadcast_patterns)
+            self._broadcast_cache[group] = matched
+            return matched
+
+    def _broadcast_channel(self, group):
+        return f'{self.prefix}:broadcast:{group}'
+
+    def _broadcast_shard(self, group):
+        return _consistent_hash(group, len(self.broadcast_hosts))
+
+    def create_pool(self, index):
+        # Broadcast hosts live after the regular ones in the per-loop pools
+        if index >= self.ring_size:
+            return create_pool(self.broadcast_hosts[index - self.ring_size])
+        return super().create_pool(index)
+
+    def _broadcast_connection(self, shard):
+        loop = asyncio.get_running_loop()
+        try:
+            layer = self._layers[loop]
+        except KeyError:
+            _wrap_close(self, loop)
+            layer = self._layers[loop] = RedisLoopLayer(self)
+        return layer.get_connection(self.ring_size + shard)
+
+    def _subscriber(self, shard):
+        loop = asyncio.get_running_loop()
+        if loop not in self._subscribers:
+            self._subscribers[loop] = [
+                _BroadcastSubscriber(self, host) for host in self.broadcast_hosts
+            ]
+        return self._subscribers[loop][shard]
+
+    async def group_add(self, group, channel):
+        if not self.is_broadcast(group):
+            return await super().group_add(group, channel)
+        assert self.require_valid_group_name(group), "Group name not valid"
+        if '!' not in channel or not self.non_local_name(channel).endswith(self.client_prefix + '!'):
+            raise RuntimeError(f"Broadcast group '{group}' only accepts channels created by this process")
+        members = self.local_groups[group]
+        members.add(channel)
+        if len(members) == 1:
+            await self._subscriber(self._broadcast_shard(group)).subscribe(self._broadcast_channel(group), group)
+
+    async def group_discard(self, group, channel):
+        if not self.is_broadcast(group):
+            return await super().group_discard(group, channel)
+        members = self.local_groups.get(group)
+        if not members or channel not in members:
+            return
+        members.discard(channel)
+        if not members:
+            del self.local_groups[group]
+            await self._subscriber(self._broadcast_shard(group)).unsubscribe(self._broadcast_channel(group))
+
+    async def group_send(self, group, message):
+        if not self.is_broadcast(group):
+            return await super().group_send(group, message)
+        assert self.require_valid_group_name(group), "Group name not valid"
+        connection = self._broadcast_connection(self._broadcast_shard(group))
+        await connection.publish(self._broadcast_channel(group), self.serialize(message))
+
+    def _deliver(self, group, data):
+        members = self.local_groups.get(group)
+        if not members:
+            return
+        # One deserialise per process; members share the (read-only) message
+        message = self.deserialize(data)
+        for channel in members:
+            self.broadcast_inbox[channel].put_nowait(message)
+
+    async def receive(self, channel):
+        if '!' not in channel:
+            return await super().receive(channel)
+
+        inbox = self.broadcast_inbox[channel]
+        if not inbox.empty():
+            return inbox.get_nowait()
+
+        # The regular receive may be the one blocked on Redis for every local
+        # channel, so it is raced against the inbox rather than interrupted
+        regular = self._pending_receives.pop(channel, None) or asyncio.ensure_future(super().receive(channel))
+        broadcast = asyncio.ensure_future(inbox.get())
+        try:
+            await asyncio.wait([regular, broadcast], return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            broadcast.cancel()
+            regular.cancel()
+            self.broadcast_inbox.pop(channel, None)
+            raise
+
+        if not regular.done():
+            self._pending_receives[channel] = regular
+            return broadcast.result()
+        if broadcast.done():
+            # Both arrived at once; keep the broadcast message for the next call
+            inbox.put_nowait(broadcast.result())
+        else:
+            broadcast.cancel()
+        return regular.result()
+
+    async def flush(self):
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                await subscriber.close()
+        self._subscribers = {}
+        self.local_groups = defaultdict(set)
+        self.broadcast_inbox.clear()
+        for pending in self._pending_receives.values():
+            pending.cancel()
+        self._pending_receives = {}
+        await super().flush()
+
+
+class _BroadcastSubscriber:
+    """Pub/sub connection to one broadcast host, feeding local group members"""
+
+    def __init__(self, layer, host):
+        self.layer = layer
+        self.host = host
+        self.groups = {}
+        self.lock = asyncio.Lock()
+        self.redis = None
+        self.pubsub = None
+        self.task = None
+
+    async def subscribe(self, name, group):
+        async with self.lock:
+            if self.redis is None:
+                self.redis = aioredis.Redis(connection_pool=create_pool(self.host))
+                self.pubsub = self.redis.pubsub()
+            self.groups[name] = group
+            await self.pubsub.subscribe(name)
+            if self.task is None:
+                self.task = asyncio.ensure_future(self._receive())
+
+    async def unsubscribe(self, name):
+        async with self.lock:
+            if self.groups.pop(name, None) is not None:
+                await self.pubsub.unsubscribe(name)
+
+    async def _receive(self):
+        while True:
+            try:
+                if not self.pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
+                if message is None:
+                    continue
+                name = message['channel']
+                if isinstance(name, bytes):
+                    name = name.decode()
+                group = self.groups.get(name)
+                if group is not None:
+                    self.layer._deliver(group, message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Broadcast subscriber failed, retrying")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        async with self.lock:
+            if self.task is not None:
+                self.task.cancel()
+                try:
+                    await self.task
+                except asyncio.CancelledError:
+                    pass
+                self.task = None
+            if self.redis is not None:
+                await self.pubsub.reset()
+                await _close_redis(self.redis)
+                self.redis = None
+                self.pubsub = None
+            self.groups = {}
@@ -1,39 +1,109 @@
+import asyncio
 import json
 import logging
 from datetime import datetime
+from urllib.parse import parse_qs
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from .alert_stream import get_stock_alert_history
+from .low_stock_index import low_stock_snapshot
+from .outbound import COALESCE, OutboundQueue
+from .ticker import get_stock_ticker, ticker_group
+from .fanout import (
+    STOCK_ALERTS_GROUP, SUBSCRIPTION_GROUPS, RecentKeys, filter_groups,
+    batch_frame, stamp_delivery, stock_alert_event, purchase_suggestion_event,
+)
 
 logger = logging.getLogger(__name__)
 
 class StockAlertWebSocketConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer that handles real-time stock alert connections"""
+    """WebSocket consumer that handles real-time stock alert connections.
+
+    A new connection receives every alert through the ``stock_alerts`` group.
+    Subscribing to filters moves it to the matching per-product, category,
+    severity and supplier groups only, e.g.::
+
+        {"type": "subscribe", "product_ids": [1, 2], "severities": ["CRITICAL"]}
+        {"type": "unsubscribe", "product_ids": [2]}
+        {"type": "unsubscribe", "all": true}    # drop every filter
+        {"type": "subscribe", "all": true}      # back to every alert
+
+    Filters are OR-ed; an alert matching several of them is delivered once.
+
+    Connecting with ``?batch_window_ms=N`` turns on batching: alerts are held
+    for up to N ms, a newer alert for the same SKU replaces the buffered one,
+    and the survivors go out as one ``stock_alert_batch`` array frame.
+
+    Every alert frame carries an ``event_id``. A reconnecting client passes
+    the last one it saw as ``?last_event_id=N`` (or sends
+    ``{"type": "resume", "last_event_id": N}``) and receives only the alerts
+    it missed, or a ``stock_snapshot`` of current low stock products when
+    that gap is no longer in the history. Other connections get that
+    snapshot straight after ``connection_established`` (``?snapshot=0`` skips it).
+
+    Alerts are written through a bounded ``OutboundQueue``, so a slow client
+    loses frames (or is told to resync) instead of stalling delivery.
+    """
     
     async def connect(self):
         """Handle WebSocket connection"""
+        self.firehose = True
+        self.subscriptions = set()
+        self.recent_keys = RecentKeys()
+        self.max_subscriptions = getattr(settings, 'STOCK_ALERT_MAX_SUBSCRIPTIONS', 2000)
+        self.batch_window = self._negotiate_batch_window()
+        self.batch_max_size = getattr(settings, 'STOCK_ALERT_BATCH_MAX_SIZE', 500)
+        self.pending = {}
+        self.superseded = 0
+        self.flush_task = None
+        self.history = get_stock_alert_history()
+        self.replayed_through = 0
+
         # Join stock alerts group
-        await self.channel_layer.group_add('stock_alerts', self.channel_name)
+        await self.channel_layer.group_add(STOCK_ALERTS_GROUP, self.channel_name)
         await self.accept()
+        self.outbound = OutboundQueue(self)
         logger.info(f"🔗 WebSocket client connected: {self.channel_name}")
         
-        # Log connection event
-        logger.info(f"📊 New WebSocket connection added to group 'stock_alerts'")
-        
         # Send welcome message
         await self.send(text_data=json.dumps({
             'type': 'connection_established',
             'message': 'Connected to stock alerts stream',
-            'timestamp': json.dumps(datetime.now(), default=str)
+            'timestamp': json.dumps(datetime.now(), default=str),
+            'batch_window_ms': int(self.batch_window * 1000),
         }))
-        logger.info(f"✅ Welcome message sent to {self.channel_name}")
+
+        last_event_id = self._query_param('last_event_id')
+        if last_event_id is not None:
+            await self._resume(last_event_id)
+        elif self._query_param('snapshot') != 0:
+            await self._send_snapshot()
+
+    def _query_param(self, name):
+        """Integer query string parameter, or None when absent or invalid"""
+        query = parse_qs(self.scope.get('query_string', b'').decode('latin-1'))
+        try:
+            return int(query[name][0])
+        except (KeyError, ValueError):
+            return None
+
+    def _negotiate_batch_window(self):
+        """Batch window in seconds requested through the query string, capped by settings (0 = off)"""
+        requested = self._query_param('batch_window_ms') or 0
+        limit = getattr(settings, 'STOCK_ALERT_BATCH_MAX_WINDOW_MS', 5000)
+        return max(0, min(requested, limit)) / 1000
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
-        # Leave stock alerts group
-        await self.channel_layer.group_discard('stock_alerts', self.channel_name)
+        if getattr(self, 'flush_task', None):
+            self.flush_task.cancel()
+        if getattr(self, 'outbound', None):
+            self.outbound.close()
+        groups = set(getattr(self, 'subscriptions', ())) | {STOCK_ALERTS_GROUP}
+        await self._discard(groups)
         logger.info(f"🔌 WebSocket client disconnected: {self.channel_name} (code: {close_code})")
-        
-        # Log disconnection event
-        logger.info(f"📊 WebSocket connection removed from group 'stock_alerts'")
     
     async def receive(self, text_data):
         """Handle messages from WebSocket client"""
@@ -48,39 +118,174 @@ class StockAlertWebSocketConsumer(AsyncWebsocketConsumer):
                     'timestamp': data.get('timestamp')
                 }))
             elif message_type == 'subscribe':
-                # Client wants to subscribe to specific product alerts
-                product_id = data.get('product_id')
-                if product_id:
-                    await self.channel_layer.group_add(
-                        f'product_alerts_{product_id}', 
-                        self.channel_name
-                    )
-                    await self.send(text_data=json.dumps({
-                        'type': 'subscribed',
-                        'product_id': product_id
-                    }))
+                await self._subscribe(data)
+            elif message_type == 'unsubscribe':
+                await self._unsubscribe(data)
+            elif message_type == 'resume':
+                try:
+                    last_event_id = int(data.get('last_event_id'))
+                except (TypeError, ValueError):
+                    raise ValueError("'last_event_id' must be an integer")
+                await self._resume(last_event_id)
         except json.JSONDecodeError:
             logger.error("Invalid JSON received from WebSocket client")
-    
+        except ValueError as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'message': str(e)}))
+
+    def _parse_filters(self, data):
+        """Group names for the filters in a (un)subscribe frame"""
+        filters = {name: data.get(name) or [] for name in SUBSCRIPTION_GROUPS}
+        for name, values in filters.items():
+            if not isinstance(values, list):
+                raise ValueError(f"'{name}' must be a list")
+        if data.get('product_id'):
+            # Single product form used by older clients
+            filters['product_ids'] = [*filters['product_ids'], data['product_id']]
+
+        return filter_groups(filters)
+
+    async def _subscribe(self, data):
+        if data.get('all'):
+            if not self.firehose:
+                await self.channel_layer.group_add(STOCK_ALERTS_GROUP, self.channel_name)
+                self.firehose = True
+            await self._send_subscription_state('subscribed')
+            return
+
+        groups = self._parse_filters(data)
+        if not groups:
+            raise ValueError("Nothing to subscribe to")
+        added = groups - self.subscriptions
+        if len(self.subscriptions) + len(added) > self.max_subscriptions:
+            raise ValueError(f"At most {self.max_subscriptions} subscriptions per connection")
+
+        # One frame can carry hundreds of ids; join their groups concurrently
+        await asyncio.gather(*[self.channel_layer.group_add(group, self.channel_name) for group in added])
+        self.subscriptions |= added
+        if self.firehose:
+            await self.channel_layer.group_discard(STOCK_ALERTS_GROUP, self.channel_name)
+            self.firehose = False
+        await self._send_subscription_state('subscribed', data.get('product_id'))
+
+    async def _unsubscribe(self, data):
+        if data.get('all'):
+            removed = set(self.subscriptions)
+            if self.firehose:
+                removed.add(STOCK_ALERTS_GROUP)
+                self.firehose = False
+        else:
+            removed = self._parse_filters(data) & self.subscriptions
+        await self._discard(removed)
+        self.subscriptions -= removed
+        await self._send_subscription_state('unsubscribed', data.get('product_id'))
+
+    async def _discard(self, groups):
+        await asyncio.gather(*[self.channel_layer.group_discard(group, self.channel_name) for group in groups])
+
+    async def _send_subscription_state(self, message_type, product_id=None):
+        response = {
+            'type': message_type,
+            'all': self.firehose,
+            'subscriptions': len(self.subscriptions),
+        }
+        if product_id:
+            response['product_id'] = product_id
+        await self.send(text_data=json.dumps(response))
+
+    async def _resume(self, last_event_id):
+        """Replay the alerts published after ``last_event_id``, or send a snapshot if they were evicted"""
+        try:
+            entries, latest = await sync_to_async(self.history.since)(last_event_id)
+        except Exception as e:
+            logger.error(f"❌ Alert history unavailable for {self.channel_name}: {e}")
+            entries, latest = None, None
+
+        if entries is None:
+            await self._send_snapshot(latest)
+            logger.info(f"📸 Gap after event {last_event_id} evicted, sent a snapshot to {self.channel_name}")
+        else:
+            for entry in entries:
+                if self.firehose or self.subscriptions.intersection(entry['groups']):
+                    await self._deliver(entry['event'], direct=True)
+            logger.info(f"⏪ Replayed {len(entries)} events after {last_event_id} to {self.channel_name}")
+
+        # Live alerts that raced with the replay are already covered by it
+        self.replayed_through = max(self.replayed_through, latest or 0)
+
+    async def _send_snapshot(self, event_id=None):
+        """Send the current low stock set from the low stock index"""
+        try:
+            if event_id is None:
+                # Read first: alerts after this id may already be in the snapshot, never missing from it
+                event_id = await sync_to_async(self.history.latest_id)()
+            products = await sync_to_async(low_stock_snapshot)()
+        except Exception as e:
+            logger.error(f"❌ Low stock snapshot unavailable for {self.channel_name}: {e}")
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'stock_snapshot',
+            'event_id': event_id,
+            'products': products,
+        }))
+        self.replayed_through = max(self.replayed_through, event_id or 0)
+
     async def stock_alert_message(self, event):
         """Handle stock alert messages from Kafka consumer"""
-        message = event['message']
-        
-        logger.info(f"📤 Received alert for WebSocket delivery: {message.get('sku')}")
-        
-        # Prepare response
-        response_data = {
-            'type': 'stock_alert',
-            'data': message,
-            'timestamp': message.get('timestamp'),
-            'delivered_at': datetime.now().isoformat()
-        }
-        
-        # Send alert to WebSocket client
-        await self.send(text_data=json.dumps(response_data))
-        
-        logger.info(f"✅ Stock alert delivered to WebSocket client {self.channel_name}: {message.get('sku')}")
-        logger.info(f"📊 Alert data: {json.dumps(message, indent=2)}")
+        # Only a socket in several groups (the firehose counts) can receive the same alert twice
+        if len(self.subscriptions) + self.firehose > 1 and self.recent_keys.seen(event.get('key')):
+            return
+
+        if 'frame' not in event:
+            # Published by a consumer that predates pre-encoded frames
+            event = stock_alert_event(event['message'])
+
+        if event.get('event_id') is not None and event['event_id'] <= self.replayed_through:
+            return
+        await self._deliver(event)
+
+    async def _deliver(self, event, direct=False):
+        if self.batch_window:
+            await self._buffer(event)
+            return
+
+        # The frame was encoded once by the publisher; only stamp delivery here
+        if direct:
+            # Replays are written inline so a long gap cannot overflow the queue
+            await self.send(text_data=stamp_delivery(event['frame']))
+        else:
+            self.outbound.put(stamp_delivery(event['frame']), key=event.get('sku'), event_id=event.get('event_id'))
+        logger.debug(f"✅ Stock alert delivered to WebSocket client {self.channel_name}: {event.get('sku')}")
+
+    async def _buffer(self, event):
+        """Hold an alert for the batch window, replacing any buffered alert for the same SKU"""
+        if self.pending.pop(event.get('sku'), None) is not None:
+            self.superseded += 1
+        self.pending[event.get('sku')] = event
+
+        if len(self.pending) >= self.batch_max_size:
+            await self._flush()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_window)
+        self.flush_task = None
+        await self._flush()
+
+    async def _flush(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        if not self.pending:
+            return
+        events, superseded = list(self.pending.values()), self.superseded
+        self.pending, self.superseded = {}, 0
+        event_ids = [event['event_id'] for event in events if event.get('event_id') is not None]
+        self.outbound.put(
+            batch_frame([event['frame'] for event in events], superseded),
+            event_id=max(event_ids, default=None),
+        )
+        logger.debug(f"✅ {len(events)} stock alerts queued for WebSocket client {self.channel_name} in one frame")
 
 
 class PurchaseSuggestionWebSocketConsumer(AsyncWebsocketConsumer):
@@ -91,6 +296,7 @@ class PurchaseSuggestionWebSocketConsumer(AsyncWebsocketConsumer):
         # Join purchase suggestions group
         await self.channel_layer.group_add('purchase_suggestions', self.channel_name)
         await self.accept()
+        self.outbound = OutboundQueue(self)
         logger.info(f"🛒 Purchase suggestion WebSocket client connected: {self.channel_name}")
         
         # Send welcome message
@@ -103,6 +309,8 @@ class PurchaseSuggestionWebSocketConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
         await self.channel_layer.group_discard('purchase_suggestions', self.channel_name)
+        if getattr(self, 'outbound', None):
+            self.outbound.close()
         logger.info(f"🔌 Purchase suggestion WebSocket client disconnected: {self.channel_name}")
     
     async def receive(self, text_data):
@@ -121,15 +329,115 @@ class PurchaseSuggestionWebSocketConsumer(AsyncWebsocketConsumer):
     
     async def purchase_suggestion_message(self, event):
         """Handle purchase suggestion messages from Kafka consumer"""
-        message = event['message']
-        
-        logger.info(f"🛒 Received purchase suggestion for WebSocket delivery: {message.get('sku')}")
-        
-        response_data = {
-            'type': 'purchase_suggestion',
-            'data': message,
-            'delivered_at': datetime.now().isoformat()
-        }
-        
-        await self.send(text_data=json.dumps(response_data))
-        logger.info(f"✅ Purchase suggestion delivered to WebSocket client: {message.get('sku')}")
\ No newline at end of file
+        if 'frame' not in event:
+            event = purchase_suggestion_event(event['message'])
+
+        self.outbound.put(stamp_delivery(event['frame']), key=event.get('sku'))
+        logger.debug(f"✅ Purchase suggestion queued for WebSocket client: {event.get('sku')}")
+
+class StockTickerWebSocketConsumer(AsyncWebsocketConsumer):
+    """WebSocket consumer streaming live stock levels for watched products.
+
+    Clients pick products with ``{"type": "watch", "product_ids": [1, 2]}``
+    (``"unwatch"`` to stop) and get ``["d", product_id, qty, seq]`` deltas
+    for every stock change, plus a ``["k", [[product_id, qty, seq], ...]]``
+    keyframe of everything watched on each watch and every
+    ``STOCK_TICKER_KEYFRAME_SECONDS``. Once a slow client's queue is full, a
+    new level replaces the queued one of the same product (coalesce policy).
+    """
+
+    async def connect(self):
+        """Handle WebSocket connection"""
+        self.watched = set()
+        self.max_watched = getattr(settings, 'STOCK_TICKER_MAX_PRODUCTS', 5000)
+        self.keyframe_interval = getattr(settings, 'STOCK_TICKER_KEYFRAME_SECONDS', 30)
+        self.ticker = get_stock_ticker()
+        await self.accept()
+        self.outbound = OutboundQueue(self, policy=COALESCE)
+        self.keyframe_task = asyncio.create_task(self._send_keyframes())
+        logger.info(f"📈 Stock ticker WebSocket client connected: {self.channel_name}")
+
+        await self.send(text_data=json.dumps({
+            'type': 'connection_established',
+            'message': 'Connected to stock ticker stream',
+            'timestamp': datetime.now().isoformat(),
+            'keyframe_interval': self.keyframe_interval,
+        }))
+
+    async def disconnect(self, close_code):
+        """Handle WebSocket disconnection"""
+        if getattr(self, 'keyframe_task', None):
+            self.keyframe_task.cancel()
+        if getattr(self, 'outbound', None):
+            self.outbound.close()
+        await asyncio.gather(*[
+            self.channel_layer.group_discard(ticker_group(product_id), self.channel_name)
+            for product_id in getattr(self, 'watched', ())
+        ])
+        logger.info(f"🔌 Stock ticker WebSocket client disconnected: {self.channel_name}")
+
+    async def receive(self, text_data):
+        """Handle messages from WebSocket client"""
+        try:
+            data = json.loads(text_data)
+            message_type = data.get('type')
+
+            if message_type == 'ping':
+                await self.send(text_data=json.dumps({
+                    'type': 'pong',
+                    'timestamp': data.get('timestamp')
+                }))
+            elif message_type == 'watch':
+                await self._watch(self._parse_product_ids(data))
+            elif message_type == 'unwatch':
+                await self._unwatch(self._parse_product_ids(data))
+        except json.JSONDecodeError:
+            logger.error("Invalid JSON received from stock ticker WebSocket client")
+        except ValueError as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'message': str(e)}))
+
+    def _parse_product_ids(self, data):
+        product_ids = data.get('product_ids')
+        if not isinstance(product_ids, list):
+            raise ValueError("'product_ids' must be a list")
+        try:
+            return {int(product_id) for product_id in product_ids}
+        except (TypeError, ValueError):
+            raise ValueError("'product_ids' must contain integers")
+
+    async def _watch(self, product_ids):
+        added = product_ids - self.watched
+        if len(self.watched) + len(added) > self.max_watched:
+            raise ValueError(f"At most {self.max_watched} products per connection")
+        await asyncio.gather(*[
+            self.channel_layer.group_add(ticker_group(product_id), self.channel_name) for product_id in added
+        ])
+        self.watched |= added
+        await self.send(text_data=json.dumps({'type': 'watching', 'products': len(self.watched)}))
+        if added:
+            await self._send_keyframe(added)
+
+    async def _unwatch(self, product_ids):
+        removed = product_ids & self.watched
+        await asyncio.gather(*[
+            self.channel_layer.group_discard(ticker_group(product_id), self.channel_name) for product_id in removed
+        ])
+        self.watched -= removed
+        await self.send(text_data=json.dumps({'type': 'watching', 'products': len(self.watched)}))
+
+    async def _send_keyframe(self, product_ids):
+        frame = await database_sync_to_async(self.ticker.keyframe)(sorted(product_ids))
+        self.outbound.put(frame)
+
+    async def _send_keyframes(self):
+        while True:
+            await asyncio.sleep(self.keyframe_interval)
+            if self.watched:
+                try:
+                    await self._send_keyframe(self.watched)
+                except Exception as e:
+                    logger.error(f"❌ Failed to send stock ticker keyframe to {self.channel_name}: {e}")
+
+    async def stock_tick(self, event):
+        """Handle stock level deltas published by InventoryService"""
+        self.outbound.put(event['frame'], key=event['product_id'])
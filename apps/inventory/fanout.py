@@ -0,0 +1,143 @@
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from .alert_state import SEVERITY_RANK
+
+# Group events carry the WebSocket frame pre-encoded as ``frame``: the JSON
+# text of the frame up to, but not including, the ``delivered_at`` value. The
+# publisher serialises once per alert; each socket only appends its own
+# delivery time, however many clients are in the group.
+
+
+def encode_frame(frame):
+    """Encode ``frame`` once, leaving it open for ``stamp_delivery``"""
+    return json.dumps(frame)[:-1] + ', "delivered_at": '
+
+
+def stamp_delivery(prefix):
+    """Close a pre-encoded frame with the current delivery time"""
+    return f'{prefix}"{datetime.now().isoformat()}"}}'
+
+
+def batch_frame(prefixes, superseded=0):
+    """Join pre-encoded alert frames into one ``stock_alert_batch`` array frame"""
+    alerts = ', '.join(stamp_delivery(prefix) for prefix in prefixes)
+    return f'{{"type": "stock_alert_batch", "superseded": {superseded}, "alerts": [{alerts}]}}'
+
+
+STOCK_ALERTS_GROUP = 'stock_alerts'
+
+# Subscription filter -> group name template. An alert is published to the
+# firehose group plus one group per filter value it matches, so a socket only
+# receives the traffic it subscribed to.
+SUBSCRIPTION_GROUPS = {
+    'product_ids': 'product_alerts_{}',
+    'category_ids': 'category_alerts_{}',
+    'severities': 'severity_alerts_{}',
+    'supplier_ids': 'supplier_alerts_{}',
+}
+
+
+def subscription_group(filter_name, value):
+    return SUBSCRIPTION_GROUPS[filter_name].format(value)
+
+
+def filter_groups(filters):
+    """Group names for a ``{filter name: [values]}`` mapping, validating the values"""
+    groups = set()
+    for name, values in filters.items():
+        if not isinstance(values, list):
+            raise ValueError(f"'{name}' must be a list")
+        for value in values:
+            if name == 'severities':
+                value = str(value).upper()
+                if value not in SEVERITY_RANK:
+                    raise ValueError(f"Unknown severity '{value}'")
+            else:
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid value {value!r} in '{name}'")
+            groups.add(subscription_group(name, value))
+    return groups
+
+
+class RecentKeys:
+    """Idempotency keys of the last alerts delivered to one client"""
+
+    def __init__(self, maxlen=256):
+        self.keys = set()
+        self.order = deque(maxlen=maxlen)
+
+    def seen(self, key):
+        """Whether ``key`` was already delivered (through another group); records it otherwise"""
+        if key is None:
+            return False
+        if key in self.keys:
+            return True
+        if len(self.order) == self.order.maxlen:
+            self.keys.discard(self.order[0])
+        self.order.append(key)
+        self.keys.add(key)
+        return False
+
+
+def alert_groups(alert_data):
+    """Every group a stock alert is published to"""
+    groups = [STOCK_ALERTS_GROUP, subscription_group('product_ids', alert_data['product_id'])]
+    if alert_data.get('category_id') is not None:
+        groups.append(subscription_group('category_ids', alert_data['category_id']))
+    if alert_data.get('severity'):
+        groups.append(subscription_group('severities', alert_data['severity']))
+    for supplier_id in alert_data.get('supplier_ids') or []:
+        groups.append(subscription_group('supplier_ids', supplier_id))
+    return groups
+
+
+def stock_alert_event(alert_data, event_id=None):
+    """Channel layer event for the stock alert groups"""
+    return {
+        'type': 'stock_alert_message',
+        'sku': alert_data.get('sku'),
+        'event_id': event_id,
+        # Lets a socket in several matching groups drop the extra copies
+        'key': alert_data.get('idempotency_key'),
+        'frame': encode_frame({
+            'type': 'stock_alert',
+            'event_id': event_id,
+            'data': alert_data,
+            'timestamp': alert_data.get('timestamp'),
+        }),
+    }
+
+
+def purchase_suggestion_event(po_alert):
+    """Channel layer event for the ``purchase_suggestions`` group"""
+    return {
+        'type': 'purchase_suggestion_message',
+        'sku': po_alert.get('sku'),
+        'frame': encode_frame({
+            'type': 'purchase_suggestion',
+            'data': po_alert,
+        }),
+    }
+
+
+async def _group_send_all(channel_layer, groups, event):
+    results = await asyncio.gather(
+        *[channel_layer.group_send(group, event) for group in groups],
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+
+async def publish_stock_alert(channel_layer, alert_data, event=None):
+    """Send one stock alert to the firehose and every matching subscription group"""
+    await _group_send_all(channel_layer, alert_groups(alert_data), event or stock_alert_event(alert_data))
+
+
+async def publish_purchase_suggestion(channel_layer, po_alert):
+    await channel_layer.group_send('purchase_suggestions', purchase_suggestion_event(po_alert))
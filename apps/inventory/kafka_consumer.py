@@ -1,60 +1,112 @@
-import json
+import asyncio
 import logging
 import pdb
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-from kafka import KafkaConsumer
+from kafka import ConsumerRebalanceListener
+from kafka.structs import OffsetAndMetadata
 from django.conf import settings
+from django.db import close_old_connections
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+from .alert_state import ProcessedAlertStore
+from .alert_stream import get_stock_alert_history
+from .retry import AlertRetryRouter, retry_tiers
+from .alert_codec import decode_alert
+from .fanout import publish_stock_alert, publish_purchase_suggestion
+from .transports import get_alert_transport
+import queue
 import threading
+import zlib
+from collections import defaultdict, deque
 
 logger = logging.getLogger(__name__)
 
+
+def _committed_offset(offset):
+    """OffsetAndMetadata for the next offset to read (leader_epoch only exists on kafka-python>=2.1)"""
+    if 'leader_epoch' in OffsetAndMetadata._fields:
+        return OffsetAndMetadata(offset, '', -1)
+    return OffsetAndMetadata(offset, '')
+
+
 class StockAlertConsumer:
-    def __init__(self):
+    def __init__(self, batch_size=None, max_wait_ms=None):
+        self.batch_size = batch_size or getattr(settings, 'KAFKA_CONSUMER_BATCH_SIZE', 500)
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else getattr(settings, 'KAFKA_CONSUMER_MAX_WAIT_MS', 100)
+        self.processed = ProcessedAlertStore()
+        self.history = get_stock_alert_history()
         try:
-            self.consumer = KafkaConsumer(
-                settings.KAFKA_STOCK_ALERTS_TOPIC,
-                bootstrap_servers=['localhost:9092'],
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                key_deserializer=lambda k: k.decode('utf-8') if k else None,
-                group_id='stock-alert-group',
-                auto_offset_reset='latest'
-            )
+            self.consumer = get_alert_transport().consumer(**self._consumer_config())
+            self.consumer.subscribe(self._topics(), listener=self._rebalance_listener())
             self.channel_layer = get_channel_layer()
+            self.retry = AlertRetryRouter()
             self.running = False
             logger.info("Kafka consumer initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Kafka consumer: {e}")
             self.consumer = None
     
+    def _topics(self):
+        """Topics this consumer subscribes to"""
+        return [settings.KAFKA_STOCK_ALERTS_TOPIC]
+    
+    def _consumer_config(self):
+        """Keyword arguments for the underlying KafkaConsumer"""
+        return {
+            'value_deserializer': decode_alert,
+            'key_deserializer': lambda k: k.decode('utf-8') if k else None,
+            'group_id': 'stock-alert-group',
+            'auto_offset_reset': getattr(settings, 'KAFKA_CONSUMER_AUTO_OFFSET_RESET', 'latest'),
+            # Offsets are committed explicitly once a batch has been processed
+            'enable_auto_commit': False,
+        }
+    
+    def _rebalance_listener(self):
+        """Listener passed to subscribe(); None keeps kafka-python's default"""
+        return None
+    
     def start_consuming(self):
-        """Start consuming messages from Kafka and forward to WebSocket"""
+        """Start consuming messages from Kafka in batches and forward to WebSocket"""
         if not self.consumer:
             logger.error("Kafka consumer not available")
             return
         
         self.running = True
         logger.info("🚀 Starting Kafka consumer for stock alerts...")
-        logger.info(f"📡 Listening on topic: stock-alerts")
+        logger.info(f"📡 Listening on topics: {', '.join(self._topics())}")
         logger.info(f"🔗 Bootstrap servers: {self.consumer.config.get('bootstrap_servers', 'Unknown')}")
+        logger.info(f"📦 Batch size: {self.batch_size}, max wait: {self.max_wait_ms}ms")
+        
+        window_start = time.monotonic()
+        window_count = 0
         
         try:
-            for message in self.consumer:
-                if not self.running:
-                    break
-                
-                alert_data = message.value
-                logger.info(f"📨 Kafka message received: {alert_data}")
-                logger.info(f"🔄 Processing alert for product: {alert_data.get('sku', 'Unknown')}")
-                
-                # Forward message to WebSocket clients
-                self._send_to_websocket(alert_data)
+            while self.running:
+                records = self.consumer.poll(timeout_ms=self.max_wait_ms, max_records=self.batch_size)
+                messages = [message for batch in records.values() for message in batch]
                 
-                # Generate purchase order suggestion
-                self._generate_purchase_suggestion(alert_data)
+                if messages:
+                    try:
+                        self.process_batch(messages)
+                    except Exception as e:
+                        # Per-alert failures are routed to retry topics inside process_batch;
+                        # anything escaping it is infrastructural, so re-read the batch later
+                        logger.error(f"❌ Batch processing failed, rewinding: {e}")
+                        self._rewind(records)
+                        time.sleep(1)
+                        continue
+                    self._commit()
+                    window_count += len(messages)
                 
-                logger.info(f"✅ Kafka->WebSocket flow completed for {alert_data.get('sku', 'Unknown')}")
+                elapsed = time.monotonic() - window_start
+                if elapsed >= 10:
+                    if window_count:
+                        logger.info(f"📊 Consumer throughput: {window_count} messages in {elapsed:.1f}s ({window_count / elapsed:.0f} msg/s)")
+                    window_start = time.monotonic()
+                    window_count = 0
                 
         except Exception as e:
             logger.error(f"❌ Error in Kafka consumer: {e}")
@@ -63,32 +115,126 @@ class StockAlertConsumer:
         finally:
             self.consumer.close()
     
-    def _send_to_websocket(self, alert_data):
-        """Send alert data to WebSocket group"""
+    def process_batch(self, messages):
+        """Collapse a polled batch per product and fan it out in one event loop turn"""
+        alerts = self.processed.filter_new(self._collapse_alerts(messages))
+        logger.info(f"📨 Processing {len(messages)} Kafka messages as {len(alerts)} alerts")
+        
+        po_alerts = []
+        delivered = []
+        failed = []
+        for alert_data in alerts:
+            try:
+                po_alert = self._generate_purchase_suggestion(alert_data)
+            except Exception as e:
+                failed.append((alert_data, e))
+                continue
+            delivered.append(alert_data)
+            if po_alert:
+                po_alerts.append(po_alert)
+        
+        failed += self._send_batch_to_websocket(delivered, po_alerts)
+        for alert_data, error in failed:
+            self._route_failure(alert_data, error)
+        
+        failed_ids = {id(alert_data) for alert_data, _ in failed}
+        self.processed.mark_processed([alert_data for alert_data in delivered if id(alert_data) not in failed_ids])
+        logger.info(f"✅ Kafka->WebSocket flow completed for {len(alerts)} alerts ({len(failed)} sent for retry)")
+    
+    def _route_failure(self, alert_data, error):
+        """Send a failed alert to its retry tier, logging instead of raising if that fails too"""
         try:
-            if self.channel_layer:
-                logger.info(f"📤 Sending to WebSocket group 'stock_alerts': {alert_data['sku']}")
-                
-                async_to_sync(self.channel_layer.group_send)(
-                    'stock_alerts',
-                    {
-                        'type': 'stock_alert_message',
-                        'message': alert_data
-                    }
-                )
-                logger.info(f"✅ Alert forwarded to WebSocket clients for {alert_data['sku']}")
-                
-                # Log successful delivery
-                logger.info("📊 Message sent to WebSocket group 'stock_alerts'")
+            self.retry.route_failure(alert_data, error)
+        except Exception as e:
+            logger.error(f"❌ Could not route failed alert for {alert_data.get('sku', 'Unknown')} to retry: {e}")
+    
+    def _rewind(self, records):
+        """Seek each partition back to the first record of a polled batch"""
+        for tp, batch in records.items():
+            if batch:
+                self.consumer.seek(tp, batch[0].offset)
+    
+    def _commit(self, offsets=None):
+        """Commit consumed offsets (all polled records when ``offsets`` is None)"""
+        try:
+            if offsets is None:
+                self.consumer.commit()
             else:
-                logger.error("❌ Channel layer not available")
+                self.consumer.commit({tp: _committed_offset(offset) for tp, offset in offsets.items()})
         except Exception as e:
-            logger.error(f"❌ Failed to send to WebSocket: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.error(f"❌ Offset commit failed: {e}")
+    
+    def _collapse_alerts(self, messages):
+        """Keep only the latest alert per product, in first-seen order"""
+        latest = {}
+        for message in messages:
+            alert_data = message.value
+            key = message.key or alert_data.get('product_id')
+            latest[key] = alert_data
+        return list(latest.values())
+    
+    def _record(self, alerts):
+        """Resolve the routing fields of ``alerts`` and give them event ids"""
+        self._resolve_supplier_ids(alerts)
+        return self.history.record(alerts)
+
+    def _resolve_supplier_ids(self, alerts):
+        """Fill in ``supplier_ids`` left out by the producer with one query per batch"""
+        missing = {alert.get('product_id') for alert in alerts if alert.get('supplier_ids') is None}
+        missing.discard(None)
+        if not missing:
+            return
+        from apps.purchase.models import ProductSupplier
+
+        suppliers = defaultdict(list)
+        rows = ProductSupplier.objects.filter(product_id__in=missing).values_list('product_id', 'supplier_id')
+        for product_id, supplier_id in rows.order_by('id'):
+            suppliers[product_id].append(supplier_id)
+        for alert in alerts:
+            if alert.get('supplier_ids') is None:
+                alert['supplier_ids'] = suppliers.get(alert.get('product_id'), [])
+
+    def _send_batch_to_websocket(self, alerts, po_alerts):
+        """Send all alerts and suggestions of a batch through a single async_to_sync bridge.
+
+        Returns ``(alert_data, error)`` for every stock alert that could not be sent.
+        """
+        if not self.channel_layer:
+            logger.error("❌ Channel layer not available")
+            error = RuntimeError("Channel layer not available")
+            return [(alert_data, error) for alert_data in alerts]
+        try:
+            events = self._record(alerts)
+            return async_to_sync(self._group_send_batch)(alerts, events, po_alerts)
+        except Exception as e:
+            logger.error(f"❌ Failed to send batch to WebSocket: {e}")
+            return [(alert_data, e) for alert_data in alerts]
+    
+    async def _group_send_batch(self, alerts, events, po_alerts):
+        sends = [
+            publish_stock_alert(self.channel_layer, alert_data, event)
+            for alert_data, event in zip(alerts, events)
+        ] + [
+            publish_purchase_suggestion(self.channel_layer, po_alert)
+            for po_alert in po_alerts
+        ]
+        results = await asyncio.gather(*sends, return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.error(f"❌ {len(failures)} of {len(sends)} WebSocket group sends failed: {failures[0]}")
+        else:
+            logger.info(f"📊 {len(alerts)} alerts and {len(po_alerts)} suggestions sent to WebSocket groups")
+        return [
+            (alert_data, result)
+            for alert_data, result in zip(alerts, results)
+            if isinstance(result, Exception)
+        ]
     
     def _generate_purchase_suggestion(self, alert_data):
-        """Generate purchase order suggestion based on stock alert"""
+        """Generate purchase order suggestion based on stock alert, returning its WebSocket payload.
+
+        Errors are re-raised so the caller can route the alert to a retry topic.
+        """
         try:
             from apps.purchase.services import PurchaseOrderSuggestionService
             
@@ -105,7 +251,8 @@ class StockAlertConsumer:
             suggestion = PurchaseOrderSuggestionService.generate_suggestion_for_product(
                 product_id=product_id,
                 current_stock=current_stock,
-                threshold=threshold
+                threshold=threshold,
+                source_event_id=alert_data.get('idempotency_key')
             )
             if suggestion:
                 logger.info(f"✅ Purchase suggestion created: {suggestion.suggested_qty} units from {suggestion.supplier.name}")
@@ -122,14 +269,7 @@ class StockAlertConsumer:
                     'reason': suggestion.reason
                 }
                 
-                async_to_sync(self.channel_layer.group_send)(
-                    'purchase_suggestions',
-                    {
-                        'type': 'purchase_suggestion_message',
-                        'message': po_alert
-                    }
-                )
-                logger.info("📋 Purchase suggestion sent to WebSocket")
+                return po_alert
             else:
                 logger.warning(f"Could not generate purchase suggestion for product {product_id}")
                 
@@ -137,6 +277,15 @@ class StockAlertConsumer:
             logger.error(f"❌ Failed to generate purchase suggestion: {e}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
+            raise
+    
+    def _generate_purchase_suggestion_in_pool(self, alert_data):
+        """Run suggestion generation on a worker thread, recycling stale DB connections"""
+        close_old_connections()
+        try:
+            return self._generate_purchase_suggestion(alert_data)
+        finally:
+            close_old_connections()
     
     def stop_consuming(self):
         """Stop the consumer"""
@@ -149,4 +298,376 @@ class StockAlertConsumer:
         """Start consumer in a separate thread"""
         thread = threading.Thread(target=self.start_consuming, daemon=True)
         thread.start()
-        return thread
\ No newline at end of file
+        return thread
+
+
+class AsyncStockAlertConsumer(StockAlertConsumer):
+    """Stock alert consumer driven by a single asyncio event loop.
+
+    kafka-python is blocking, so ``poll`` (fetch + deserialise) runs on a
+    dedicated thread while the loop works on the previous batch. Each alert
+    becomes a task that pushes to the channel layer and, in parallel, builds a
+    purchase suggestion on a separate ORM thread pool. A semaphore bounds the
+    number of in-flight alerts and tasks for the same product are chained so
+    per-product order is kept.
+    """
+
+    def __init__(self, batch_size=None, max_wait_ms=None, concurrency=None, orm_workers=None):
+        super().__init__(batch_size=batch_size, max_wait_ms=max_wait_ms)
+        self.concurrency = concurrency or getattr(settings, 'KAFKA_CONSUMER_CONCURRENCY', 100)
+        self.orm_workers = orm_workers or getattr(settings, 'KAFKA_CONSUMER_ORM_WORKERS', 8)
+
+    def start_consuming(self):
+        """Run the consumer event loop until stopped"""
+        if not self.consumer:
+            logger.error("Kafka consumer not available")
+            return
+        
+        self.running = True
+        logger.info("🚀 Starting asyncio Kafka consumer for stock alerts...")
+        logger.info(f"📦 Batch size: {self.batch_size}, max wait: {self.max_wait_ms}ms, "
+                    f"concurrency: {self.concurrency}, ORM workers: {self.orm_workers}")
+        asyncio.run(self._consume())
+
+    def stop_consuming(self):
+        """Stop the consumer; the event loop closes the Kafka client on its way out"""
+        self.running = False
+        logger.info("🛑 Kafka consumer stopping")
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        # Every KafkaConsumer call (poll, commit, close) goes through this one thread
+        poll_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kafka-poll')
+        self.poll_executor = poll_executor
+        self.orm_executor = ThreadPoolExecutor(max_workers=self.orm_workers, thread_name_prefix='alert-orm')
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.tails = {}
+        pending = set()
+        commit_chain = None
+        
+        window_start = time.monotonic()
+        window_count = 0
+        
+        try:
+            while self.running:
+                records = await loop.run_in_executor(
+                    poll_executor,
+                    partial(self.consumer.poll, timeout_ms=self.max_wait_ms, max_records=self.batch_size)
+                )
+                messages = [message for batch in records.values() for message in batch]
+                if not messages:
+                    continue
+                
+                alerts = await loop.run_in_executor(
+                    self.orm_executor, self.processed.filter_new, self._collapse_alerts(messages)
+                )
+                batch_tasks = []
+                for alert_data in alerts:
+                    await self.semaphore.acquire()
+                    key = alert_data.get('product_id')
+                    task = asyncio.create_task(self._handle_alert(alert_data, self.tails.get(key)))
+                    self.tails[key] = task
+                    pending.add(task)
+                    batch_tasks.append(task)
+                    task.add_done_callback(partial(self._task_done, pending, key))
+                
+                # Commit this batch once its alerts and every earlier batch are done
+                offsets = {tp: batch[-1].offset + 1 for tp, batch in records.items() if batch}
+                commit_chain = asyncio.create_task(self._commit_after(batch_tasks, offsets, commit_chain))
+                pending.add(commit_chain)
+                commit_chain.add_done_callback(pending.discard)
+                
+                window_count += len(messages)
+                elapsed = time.monotonic() - window_start
+                if elapsed >= 10:
+                    if window_count:
+                        logger.info(f"📊 Consumer throughput: {window_count} messages in {elapsed:.1f}s ({window_count / elapsed:.0f} msg/s)")
+                    window_start = time.monotonic()
+                    window_count = 0
+                    
+        except Exception as e:
+            logger.error(f"❌ Error in Kafka consumer: {e}")
+            import traceback
+            logger.error(f"Traceback: {traceback.format_exc()}")
+        finally:
+            while pending:
+                await asyncio.gather(*list(pending), return_exceptions=True)
+            await loop.run_in_executor(poll_executor, self.consumer.close)
+            poll_executor.shutdown()
+            self.orm_executor.shutdown()
+
+    async def _commit_after(self, tasks, offsets, previous):
+        if previous is not None:
+            await asyncio.wait([previous])
+        if tasks:
+            await asyncio.wait(tasks)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.poll_executor, self._commit, offsets)
+
+    def _task_done(self, pending, key, task):
+        pending.discard(task)
+        if self.tails.get(key) is task:
+            del self.tails[key]
+
+    async def _handle_alert(self, alert_data, previous):
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            await asyncio.gather(
+                self._group_send_alert(alert_data),
+                self._suggest(alert_data),
+            )
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.orm_executor, self.processed.mark_processed, [alert_data])
+        except Exception as e:
+            logger.error(f"❌ Failed to process alert for {alert_data.get('sku', 'Unknown')}: {e}")
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.orm_executor, self._route_failure, alert_data, e)
+        finally:
+            self.semaphore.release()
+
+    async def _group_send_alert(self, alert_data):
+        loop = asyncio.get_running_loop()
+        event, = await loop.run_in_executor(self.orm_executor, self._record, [alert_data])
+        await publish_stock_alert(self.channel_layer, alert_data, event)
+
+    async def _suggest(self, alert_data):
+        loop = asyncio.get_running_loop()
+        po_alert = await loop.run_in_executor(self.orm_executor, self._generate_purchase_suggestion_in_pool, alert_data)
+        if po_alert:
+            await publish_purchase_suggestion(self.channel_layer, po_alert)
+
+
+class PartitionOffsetTracker:
+    """Tracks in-flight offsets per partition and reports what is safe to commit.
+
+    Offsets are registered in poll order and may complete in any order; the
+    committable offset for a partition only advances past an offset once every
+    earlier offset of that partition has completed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.completed = {}
+        self.committable = {}
+
+    def track(self, tp, offset):
+        with self.lock:
+            self.in_flight.setdefault(tp, deque()).append(offset)
+            self.completed.setdefault(tp, set())
+
+    def done(self, tp, offset):
+        with self.lock:
+            if tp not in self.in_flight:
+                return  # partition revoked while the message was in flight
+            self.completed[tp].add(offset)
+            offsets, completed = self.in_flight[tp], self.completed[tp]
+            while offsets and offsets[0] in completed:
+                completed.discard(offsets[0])
+                self.committable[tp] = offsets.popleft() + 1
+
+    def take_commits(self):
+        """Return and clear ``{tp: next_offset}`` for partitions that advanced"""
+        with self.lock:
+            commits, self.committable = self.committable, {}
+            return commits
+
+    def forget(self, partitions):
+        """Drop state for revoked partitions"""
+        with self.lock:
+            for tp in partitions:
+                self.in_flight.pop(tp, None)
+                self.completed.pop(tp, None)
+                self.committable.pop(tp, None)
+
+
+class _PoolRebalanceListener(ConsumerRebalanceListener):
+    def __init__(self, owner):
+        self.owner = owner
+
+    def on_partitions_revoked(self, revoked):
+        self.owner._commit_completed()
+        self.owner.tracker.forget(revoked)
+        for tp in revoked:
+            # Never committed, so the next owner of the partition reads these again
+            self.owner.backlog.pop(tp, None)
+
+    def on_partitions_assigned(self, assigned):
+        pass
+
+
+class PooledStockAlertConsumer(StockAlertConsumer):
+    """Stock alert consumer that processes alerts on a pool of worker threads.
+
+    Every alert is routed to a worker by a stable hash of its product key, so
+    alerts for one product are handled in order by a single worker while
+    different products proceed in parallel. Offsets are committed per partition only up to the last offset whose predecessors
+    have all been processed, so a crash replays unfinished work instead of
+    skipping it. A full worker queue pauses the partition until the worker
+    catches up, so ``poll`` keeps running and the group does not rebalance.
+    Workers spend most of their time waiting on the database and
+    channel layer, so threads scale until the DB connection pool saturates.
+    """
+
+    def __init__(self, batch_size=None, max_wait_ms=None, workers=None, queue_size=None):
+        self.workers = workers or getattr(settings, 'KAFKA_CONSUMER_WORKERS', 8)
+        self.queue_size = queue_size or getattr(settings, 'KAFKA_CONSUMER_WORKER_QUEUE_SIZE', 1000)
+        self.tracker = PartitionOffsetTracker()
+        # Polled messages waiting for room in a full worker queue, per paused partition
+        self.backlog = {}
+        super().__init__(batch_size=batch_size, max_wait_ms=max_wait_ms)
+
+    def _rebalance_listener(self):
+        return _PoolRebalanceListener(self)
+
+    def start_consuming(self):
+        """Poll, route alerts to workers and commit completed offsets until stopped"""
+        if not self.consumer:
+            logger.error("Kafka consumer not available")
+            return
+        
+        self.running = True
+        self.queues = [queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        threads = [
+            threading.Thread(target=self._worker, args=(q,), name=f'alert-worker-{i}', daemon=True)
+            for i, q in enumerate(self.queues)
+        ]
+        for thread in threads:
+            thread.start()
+        logger.info(f"🚀 Starting pooled Kafka consumer with {self.workers} workers...")
+        
+        window_start = time.monotonic()
+        window_count = 0
+        
+        try:
+            while self.running:
+                self._drain_backlog()
+                records = self.consumer.poll(timeout_ms=self.max_wait_ms, max_records=self.batch_size)
+                for tp, messages in records.items():
+                    for message in messages:
+                        self.tracker.track(tp, message.offset)
+                        self._route(tp, message)
+                    window_count += len(messages)
+                
+                self._commit_completed()
+                
+                elapsed = time.monotonic() - window_start
+                if elapsed >= 10:
+                    if window_count:
+                        logger.info(f"📊 Consumer throughput: {window_count} messages in {elapsed:.1f}s ({window_count / elapsed:.0f} msg/s)")
+                    window_start = time.monotonic()
+                    window_count = 0
+                
+        except Exception as e:
+            logger.error(f"❌ Error in Kafka consumer: {e}")
+            import traceback
+            logger.error(f"Traceback: {traceback.format_exc()}")
+        finally:
+            for q in self.queues:
+                q.put(None)
+            for thread in threads:
+                thread.join()
+            self._commit_completed()
+            self.consumer.close()
+
+    def stop_consuming(self):
+        """Stop polling; workers drain their queues and the last offsets are committed"""
+        self.running = False
+        logger.info("🛑 Kafka consumer stopping")
+
+    def _worker_queue(self, message):
+        key = message.key or str(message.value.get('product_id'))
+        return self.queues[zlib.crc32(key.encode('utf-8')) % self.workers]
+
+    def _route(self, tp, message):
+        """Hand a message to its worker; a full worker queue pauses the partition instead of blocking poll()"""
+        backlog = self.backlog.get(tp)
+        if backlog is None:
+            try:
+                self._worker_queue(message).put_nowait((tp, message))
+                return
+            except queue.Full:
+                backlog = self.backlog[tp] = deque()
+                self.consumer.pause(tp)
+                logger.warning(f"⏸️ Worker queue full, pausing {tp.topic}[{tp.partition}] at offset {message.offset}")
+        # Later messages of the partition wait behind it to keep their order
+        backlog.append(message)
+
+    def _drain_backlog(self):
+        """Move backlogged messages to workers with room again and resume partitions that caught up"""
+        for tp in list(self.backlog):
+            backlog = self.backlog[tp]
+            while backlog:
+                try:
+                    self._worker_queue(backlog[0]).put_nowait((tp, backlog[0]))
+                except queue.Full:
+                    break
+                backlog.popleft()
+            if not backlog:
+                del self.backlog[tp]
+                self.consumer.resume(tp)
+                logger.info(f"▶️ Resumed {tp.topic}[{tp.partition}]")
+
+    def _worker(self, work_queue):
+        while True:
+            item = work_queue.get()
+            if item is None:
+                close_old_connections()
+                return
+            tp, message = item
+            try:
+                alert_data = message.value
+                if self.processed.filter_new([alert_data]):
+                    po_alert = self._generate_purchase_suggestion_in_pool(alert_data)
+                    failed = self._send_batch_to_websocket([alert_data], [po_alert] if po_alert else [])
+                    if failed:
+                        raise failed[0][1]
+                    self.processed.mark_processed([alert_data])
+            except Exception as e:
+                logger.error(f"❌ Worker failed on offset {message.offset} of {tp}: {e}")
+                self._route_failure(message.value, e)
+            finally:
+                self.tracker.done(tp, message.offset)
+
+    def _commit_completed(self):
+        commits = self.tracker.take_commits()
+        if commits:
+            self._commit(commits)
+
+
+class RetryStockAlertConsumer(StockAlertConsumer):
+    """Consumes one retry tier, waiting out each batch's backoff before reprocessing it.
+
+    Every alert on a tier was delayed by the same amount, so the topic is
+    ordered by due time and sleeping until the newest alert of a batch is due
+    never holds back an alert that is already due elsewhere. Failures move on
+    to the next tier (or the DLQ) through the usual retry routing.
+    """
+
+    def __init__(self, tier, batch_size=None, max_wait_ms=None):
+        tiers = retry_tiers()
+        if not 1 <= tier <= len(tiers):
+            raise ValueError(f"Retry tier must be between 1 and {len(tiers)}, got {tier}")
+        self.tier = tier
+        self.topic, self.delay = tiers[tier - 1]
+        super().__init__(batch_size=batch_size, max_wait_ms=max_wait_ms)
+
+    def _topics(self):
+        return [self.topic]
+
+    def _consumer_config(self):
+        return {
+            **super()._consumer_config(),
+            'group_id': f'stock-alert-group-retry-{self.tier}',
+            'auto_offset_reset': 'earliest',
+            # Sleeping out the backoff must not look like a dead consumer
+            'max_poll_interval_ms': max(300000, (self.delay + 60) * 1000),
+        }
+
+    def process_batch(self, messages):
+        due = max(message.value.get('retry_not_before', 0) for message in messages)
+        wait = due - time.time()
+        if wait > 0:
+            time.sleep(min(wait, self.delay))
+        super().process_batch(messages)
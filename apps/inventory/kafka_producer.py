@@ -1,61 +1,115 @@
-import json
+import atexit
 import logging
-from kafka import KafkaProducer
+import os
+import queue
+import threading
+import time
+import uuid
 from django.conf import settings
 from datetime import datetime
+from .alert_codec import encode_alert
+from .transports import get_alert_transport
 
 logger = logging.getLogger(__name__)
 
 class StockAlertProducer:
+    """Kafka producer for stock alerts.
+
+    A failed setup is not final: while the broker is unreachable ``producer``
+    is None, and the next access after a backoff (doubling up to
+    ``KAFKA_PRODUCER_RETRY_BACKOFF_MAX`` seconds) tries to create it again.
+    """
+
     def __init__(self):
+        self._producer = None
+        self._retry_at = 0.0
+        self._backoff = 0
+        self._lock = threading.Lock()
+        self._connect()
+
+    @property
+    def producer(self):
+        if self._producer is None and time.monotonic() >= self._retry_at:
+            with self._lock:
+                if self._producer is None and time.monotonic() >= self._retry_at:
+                    self._connect()
+        return self._producer
+
+    def _connect(self):
         try:
-            self.producer = KafkaProducer(
-                bootstrap_servers=['localhost:9092'],
-                value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+            self._producer = get_alert_transport().producer(
+                value_serializer=encode_alert,
                 key_serializer=lambda k: str(k).encode('utf-8') if k else None,
                 acks='all',
-                retries=3
+                retries=3,
+                **getattr(settings, 'KAFKA_PRODUCER_CONFIG', {})
             )
+            self._backoff = 0
             logger.info("Kafka producer initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize Kafka producer: {e}")
-            self.producer = None
-    
+            self._backoff = min(max(self._backoff * 2, 1), getattr(settings, 'KAFKA_PRODUCER_RETRY_BACKOFF_MAX', 60))
+            self._retry_at = time.monotonic() + self._backoff
+            logger.error(f"Failed to initialize Kafka producer: {e} (retrying in {self._backoff}s)")
+
     def send_stock_alert(self, product_data):
-        """Send low stock alert to Kafka topic"""
+        """Send low stock alert to Kafka topic without waiting for the broker"""
         if not self.producer:
             logger.error("Kafka producer not available")
             return False
-        
+
         try:
-            alert_message = {
-                'type': 'LOW_STOCK_ALERT',
-                'product_id': product_data['id'],
-                'product_name': product_data['name'],
-                'sku': product_data['sku'],
-                'current_stock': product_data['current_stock'],
-                'threshold': product_data['low_stock_threshold'],
-                'timestamp': datetime.now().isoformat(),
-                'severity': self._get_severity(product_data['current_stock'], product_data['low_stock_threshold'])
-            }
-            
-            # Send to Kafka topic
-            future = self.producer.send(
-                'stock-alerts',
-                key=product_data['id'],
-                value=alert_message
-            )
-            
-            # Wait for message to be sent
-            self.producer.flush()
-            logger.info(f"Stock alert sent for product {product_data['sku']}")
+            alert_message = self.build_alert_message(product_data)
+            self.publish(settings.KAFKA_STOCK_ALERTS_TOPIC, product_data['id'], alert_message)
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to send stock alert: {e}")
             return False
-    
-    def _get_severity(self, current_stock, threshold):
+
+    def publish(self, topic, key, message):
+        """Queue an already-built message on the producer and return its future"""
+        # Hand the record to the producer's batch buffer; delivery is
+        # reported through the callbacks instead of a blocking flush()
+        producer = self.producer
+        if producer is None:
+            raise RuntimeError("Kafka producer not available")
+        future = producer.send(topic, key=key, value=message)
+        future.add_callback(self._on_send_success, message.get('sku'))
+        future.add_errback(self._on_send_error, message.get('sku'))
+        return future
+
+    @classmethod
+    def build_alert_message(cls, product_data):
+        """Build the LOW_STOCK_ALERT payload for a product snapshot"""
+        return {
+            'type': 'LOW_STOCK_ALERT',
+            'idempotency_key': uuid.uuid4().hex,
+            'product_id': product_data['id'],
+            'product_name': product_data['name'],
+            'sku': product_data['sku'],
+            'current_stock': product_data['current_stock'],
+            'threshold': product_data['low_stock_threshold'],
+            'timestamp': datetime.now().isoformat(),
+            'severity': cls._get_severity(product_data['current_stock'], product_data['low_stock_threshold']),
+            # Used to route the alert to filtered WebSocket subscriptions;
+            # None supplier_ids are looked up by the consumer
+            'category_id': product_data.get('category_id'),
+            'supplier_ids': product_data.get('supplier_ids'),
+        }
+
+    def _on_send_success(self, sku, record_metadata):
+        """Delivery callback for acknowledged alerts"""
+        logger.info(
+            f"Stock alert delivered for product {sku} "
+            f"(partition {record_metadata.partition}, offset {record_metadata.offset})"
+        )
+
+    def _on_send_error(self, sku, exc):
+        """Delivery callback for alerts the broker did not acknowledge"""
+        logger.error(f"Failed to deliver stock alert for product {sku}: {exc}")
+
+    @staticmethod
+    def _get_severity(current_stock, threshold):
         """Determine alert severity based on stock levels"""
         if current_stock == 0:
             return 'CRITICAL'
@@ -63,8 +117,102 @@ class StockAlertProducer:
             return 'HIGH'
         else:
             return 'MEDIUM'
-    
-    def close(self):
+
+    def flush(self, timeout=None):
+        """Wait for buffered alerts to be delivered"""
+        if self._producer:
+            self._producer.flush(timeout=timeout)
+
+    def close(self, timeout=None):
         """Close Kafka producer"""
-        if self.producer:
-            self.producer.close()
\ No newline at end of file
+        if self._producer:
+            self._producer.close(timeout=timeout)
+
+
+class StockAlertDispatcher:
+    """Bounded in-memory queue drained by a background thread.
+
+    Request threads only enqueue; the broker connection, metadata fetches and
+    batching all happen on the dispatcher thread, so a slow or unavailable
+    broker never blocks a GraphQL mutation. When the queue is full new alerts
+    are dropped and counted rather than applying backpressure to the caller.
+    """
+
+    def __init__(self, maxsize=None):
+        if maxsize is None:
+            maxsize = getattr(settings, 'KAFKA_ALERT_QUEUE_SIZE', 10000)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, product_data):
+        """Queue an alert for delivery; returns False if it had to be dropped"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(product_data)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(
+                f"Stock alert queue full, dropping alert for {product_data.get('sku')} "
+                f"({self.dropped} dropped so far)"
+            )
+            return False
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='stock-alert-dispatcher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        producer = get_stock_alert_producer()
+        while True:
+            product_data = self.queue.get()
+            try:
+                producer.send_stock_alert(product_data)
+            except Exception as e:
+                logger.error(f"Stock alert dispatcher error: {e}")
+            finally:
+                self.queue.task_done()
+
+
+_producer = None
+_dispatcher = None
+_owner_pid = None
+_singleton_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """Drop singletons inherited from a parent process"""
+    global _producer, _dispatcher, _owner_pid
+    if _owner_pid != os.getpid():
+        _producer = None
+        _dispatcher = None
+        _owner_pid = os.getpid()
+
+
+def get_stock_alert_producer():
+    """Return the process-wide producer, creating it on first use"""
+    global _producer
+    with _singleton_lock:
+        _reset_after_fork()
+        if _producer is None:
+            _producer = StockAlertProducer()
+            atexit.register(_producer.close, timeout=5)
+        return _producer
+
+
+def get_stock_alert_dispatcher():
+    """Return the process-wide alert dispatcher, creating it on first use"""
+    global _dispatcher
+    with _singleton_lock:
+        _reset_after_fork()
+        if _dispatcher is None:
+            _dispatcher = StockAlertDispatcher()
+        return _dispatcher
@@ -0,0 +1,107 @@
+import json
+import logging
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .kafka_producer import StockAlertProducer
+
+logger = logging.getLogger(__name__)
+
+
+def low_stock_entry(product):
+    """Index entry for a product at or below its threshold"""
+    return {
+        'product_id': product.id,
+        'product_name': product.name,
+        'sku': product.sku,
+        'current_stock': product.current_stock,
+        'threshold': product.low_stock_threshold,
+        'category_id': product.category_id,
+        'severity': StockAlertProducer._get_severity(product.current_stock, product.low_stock_threshold),
+    }
+
+
+def _lowest_first(entries, limit):
+    return sorted(entries, key=lambda entry: (entry['current_stock'], entry['product_id']))[:limit]
+
+
+class InProcessLowStockIndex:
+    """Low stock index held in this process (single process deployments, tests)"""
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def update(self, entry):
+        with self.lock:
+            self.entries[entry['product_id']] = entry
+
+    def discard(self, product_id):
+        with self.lock:
+            self.entries.pop(product_id, None)
+
+    def replace(self, entries):
+        with self.lock:
+            self.entries = {entry['product_id']: entry for entry in entries}
+
+    def snapshot(self, limit=None):
+        with self.lock:
+            entries = list(self.entries.values())
+        return _lowest_first(entries, limit)
+
+
+class RedisLowStockIndex:
+    """Low stock index kept in a Redis hash (product id -> JSON entry) shared by every process"""
+
+    def __init__(self, url='redis://127.0.0.1:6379/1', key='low_stock_index'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.key = key
+
+    def update(self, entry):
+        self.client.hset(self.key, entry['product_id'], json.dumps(entry))
+
+    def discard(self, product_id):
+        self.client.hdel(self.key, product_id)
+
+    def replace(self, entries):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self.key)
+        if entries:
+            pipe.hset(self.key, mapping={entry['product_id']: json.dumps(entry) for entry in entries})
+        pipe.execute()
+
+    def snapshot(self, limit=None):
+        return _lowest_first([json.loads(value) for value in self.client.hvals(self.key)], limit)
+
+
+def low_stock_snapshot(limit=None):
+    """Current low stock products from the index, lowest stock first (no database query)"""
+    return get_low_stock_index().snapshot(limit or getattr(settings, 'STOCK_ALERT_SNAPSHOT_LIMIT', 1000))
+
+
+def sync_product(product):
+    """Add, refresh or remove a product's index entry after a stock change"""
+    index = get_low_stock_index()
+    try:
+        if product.current_stock <= product.low_stock_threshold:
+            index.update(low_stock_entry(product))
+        else:
+            index.discard(product.id)
+    except Exception as e:
+        # The next save of this product (or rebuild_low_stock_index) repairs the entry
+        logger.error(f"❌ Failed to update low stock index for {product.sku}: {e}")
+
+
+_index = None
+
+
+def get_low_stock_index():
+    """Return the index configured in ``STOCK_ALERT_LOW_STOCK_INDEX``"""
+    global _index
+    if _index is None:
+        config = getattr(settings, 'STOCK_ALERT_LOW_STOCK_INDEX', {
+            'BACKEND': 'apps.inventory.low_stock_index.InProcessLowStockIndex',
+        })
+        _index = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _index
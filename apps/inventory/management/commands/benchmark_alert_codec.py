@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from apps.inventory.alert_codec import encode_alert, decode_alert
+from apps.inventory.kafka_producer import StockAlertProducer
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compare encode/decode cost and bytes per alert for the JSON and msgpack alert encodings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alerts', type=int, default=100000, help='Alerts to encode and decode per encoding')
+
+    def handle(self, *args, **options):
+        total = options['alerts']
+        alerts = [
+            StockAlertProducer.build_alert_message({
+                'id': i,
+                'name': f'Product {i}',
+                'sku': f'SKU-{i:06d}',
+                'current_stock': i % 10,
+                'low_stock_threshold': 10,
+            })
+            for i in range(total)
+        ]
+
+        for encoding in ('json', 'msgpack'):
+            started = time.perf_counter()
+            encoded = [encode_alert(alert, encoding) for alert in alerts]
+            encode_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for data in encoded:
+                decode_alert(data)
+            decode_elapsed = time.perf_counter() - started
+
+            assert decode_alert(encoded[0]) == alerts[0], f'{encoding} round trip changed the alert'
+            size = sum(len(data) for data in encoded) / total
+            self.stdout.write(
+                f'{encoding:8} {size:6.1f} bytes/alert  '
+                f'encode {encode_elapsed / total * 1e6:5.2f}us  decode {decode_elapsed / total * 1e6:5.2f}us'
+            )
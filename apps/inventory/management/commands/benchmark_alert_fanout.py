@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from apps.inventory.consumers import StockAlertWebSocketConsumer
+from apps.inventory.fanout import stock_alert_event
+from apps.inventory.kafka_producer import StockAlertProducer
+import asyncio
+import logging
+import time
+
+
+class Command(BaseCommand):
+    help = 'Measure WebSocket fan-out CPU per alert against the number of connected clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', default='100,1000,5000', help='Comma separated client counts to measure')
+        parser.add_argument('--alerts', type=int, default=20, help='Alerts fanned out per client count')
+
+    def handle(self, *args, **options):
+        logging.disable(logging.INFO)
+        try:
+            self.stdout.write(f"{'clients':>8} {'per-client encode':>20} {'pre-encoded':>14}")
+            for clients in [int(count) for count in options['clients'].split(',')]:
+                per_client = async_to_sync(self._fan_out)(clients, options['alerts'], pre_encoded=False)
+                pre_encoded = async_to_sync(self._fan_out)(clients, options['alerts'], pre_encoded=True)
+                self.stdout.write(f'{clients:>8} {per_client * 1000:>17.2f}ms {pre_encoded * 1000:>11.2f}ms')
+            self.stdout.write('CPU time per alert, summed over every connected client')
+        finally:
+            logging.disable(logging.NOTSET)
+
+    async def _fan_out(self, clients, alerts, pre_encoded):
+        async def discard(message):
+            pass
+
+        channel_layer = InMemoryChannelLayer()
+        sockets = []
+        for i in range(clients):
+            socket = StockAlertWebSocketConsumer()
+            socket.scope = {'type': 'websocket', 'query_string': b'snapshot=0'}
+            socket.channel_layer = channel_layer
+            socket.channel_name = f'bench.{i}'
+            socket.base_send = discard
+            await socket.connect()
+            sockets.append(socket)
+
+        cpu = 0.0
+        for i in range(alerts):
+            alert_data = StockAlertProducer.build_alert_message({
+                'id': i,
+                'name': f'Product {i}',
+                'sku': f'SKU-{i}',
+                'current_stock': i % 10,
+                'low_stock_threshold': 10,
+            })
+            started = time.process_time()
+            # The channel layer delivers one copy of the event to every socket
+            event = stock_alert_event(alert_data) if pre_encoded else {
+                'type': 'stock_alert_message',
+                'message': alert_data,
+            }
+            for socket in sockets:
+                await socket.stock_alert_message(event)
+            # Let every connection's writer task flush its queue
+            while any(len(socket.outbound) for socket in sockets):
+                await asyncio.sleep(0)
+            cpu += time.process_time() - started
+
+        for socket in sockets:
+            socket.outbound.close()
+        return cpu / alerts
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from channels.layers import InMemoryChannelLayer
+from asgiref.sync import async_to_sync
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Benchmark producer -> broker -> consumer -> channel layer throughput with the in-memory transport'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alerts', type=int, default=100000, help='Alerts to push through the pipeline')
+        parser.add_argument('--products', type=int, default=1000, help='Distinct products the alerts are spread over')
+        parser.add_argument('--partitions', type=int, default=4, help='Partitions of the in-memory topic')
+        parser.add_argument('--batch-size', type=int, default=500, help='Consumer poll batch size')
+        parser.add_argument('--subscribers', type=int, default=1, help='Channel names joined to the stock_alerts group')
+        parser.add_argument('--with-suggestions', action='store_true',
+                            help='Generate purchase suggestions (needs a migrated database)')
+
+    def handle(self, *args, **options):
+        # Keep library logging out of the timings
+        logging.disable(logging.INFO)
+        try:
+            with override_settings(
+                STOCK_ALERT_TRANSPORT={
+                    'BACKEND': 'apps.inventory.transports.InMemoryTransport',
+                    'OPTIONS': {'partitions': options['partitions']},
+                },
+                STOCK_ALERT_CACHE='default',
+                KAFKA_CONSUMER_AUTO_OFFSET_RESET='earliest',
+            ):
+                self._run(options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def _run(self, options):
+        from apps.inventory.kafka_producer import StockAlertProducer, get_stock_alert_producer
+        from apps.inventory.kafka_consumer import StockAlertConsumer
+        from django.conf import settings
+
+        total = options['alerts']
+        producer = get_stock_alert_producer()
+        consumer = StockAlertConsumer(batch_size=options['batch_size'], max_wait_ms=0)
+        consumer.channel_layer = InMemoryChannelLayer()
+        for i in range(options['subscribers']):
+            async_to_sync(consumer.channel_layer.group_add)('stock_alerts', f'bench.{i}')
+        if not options['with_suggestions']:
+            consumer._generate_purchase_suggestion = lambda alert_data: None
+
+        started = time.perf_counter()
+        for i in range(total):
+            product_id = i % options['products'] + 1
+            producer.publish(settings.KAFKA_STOCK_ALERTS_TOPIC, product_id, StockAlertProducer.build_alert_message({
+                'id': product_id,
+                'name': f'Product {product_id}',
+                'sku': f'SKU-{product_id}',
+                'current_stock': i % 10,
+                'low_stock_threshold': 10,
+                # Resolved up front so the consumer does not look suppliers up
+                'supplier_ids': [],
+            }))
+        produce_elapsed = time.perf_counter() - started
+
+        consumed = 0
+        started = time.perf_counter()
+        while consumed < total:
+            records = consumer.consumer.poll(timeout_ms=0, max_records=consumer.batch_size)
+            messages = [message for batch in records.values() for message in batch]
+            if not messages:
+                break
+            consumer.process_batch(messages)
+            consumer._commit()
+            consumed += len(messages)
+        consume_elapsed = time.perf_counter() - started
+        consumer.consumer.close()
+
+        self.stdout.write(f'Produced {total} alerts in {produce_elapsed:.2f}s ({total / produce_elapsed:.0f} alerts/s)')
+        self.stdout.write(f'Consumed {consumed} alerts in {consume_elapsed:.2f}s ({consumed / consume_elapsed:.0f} alerts/s)')
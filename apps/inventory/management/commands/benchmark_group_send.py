@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from channels_redis.core import RedisChannelLayer
+from apps.inventory.channel_layers import BroadcastRedisChannelLayer
+import asyncio
+import statistics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compare group_send latency of RedisChannelLayer and BroadcastRedisChannelLayer (needs Redis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', default='100,1000,10000', help='Comma separated group sizes to measure')
+        parser.add_argument('--rounds', type=int, default=20, help='group_send calls per group size')
+
+    def handle(self, *args, **options):
+        hosts = settings.CHANNEL_LAYERS['default'].get('CONFIG', {}).get('hosts')
+        sizes = [int(size) for size in options['subscribers'].split(',')]
+        self.stdout.write(f"{'layer':<12} {'subscribers':>11} {'p50 last delivery':>18} {'max':>10}")
+        for name, factory in (
+            ('redis', lambda: RedisChannelLayer(hosts=hosts, prefix='bench', capacity=10000)),
+            ('broadcast', lambda: BroadcastRedisChannelLayer(
+                hosts=hosts, prefix='bench', capacity=10000, broadcast_groups=['bench_*'])),
+        ):
+            for size in sizes:
+                latencies = asyncio.run(self._measure(factory(), size, options['rounds']))
+                self.stdout.write(
+                    f'{name:<12} {size:>11} {statistics.median(latencies) * 1000:>16.2f}ms {max(latencies) * 1000:>8.2f}ms'
+                )
+        self.stdout.write('Latency from group_send to the last subscriber receiving the message')
+
+    async def _measure(self, layer, size, rounds):
+        group = f'bench_{size}'
+        channels = [await layer.new_channel() for _ in range(size)]
+        for channel in channels:
+            await layer.group_add(group, channel)
+
+        latencies = []
+        try:
+            for i in range(rounds):
+                receives = [asyncio.ensure_future(layer.receive(channel)) for channel in channels]
+                # Let every receive start waiting before the clock starts
+                await asyncio.sleep(0.05)
+                started = time.perf_counter()
+                await layer.group_send(group, {'type': 'bench.message', 'round': i})
+                await asyncio.gather(*receives)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            for channel in channels:
+                await layer.group_discard(group, channel)
+            await layer.flush()
+        return latencies
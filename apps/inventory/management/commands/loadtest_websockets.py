@@ -0,0 +1,130 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+import asyncio
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+
+
+class Command(BaseCommand):
+    help = 'Load test stock alert and purchase suggestion WebSockets in-process (in-memory channel layer)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000, help='Simulated ws/stock-alerts/ clients')
+        parser.add_argument('--suggestion-clients', type=int, default=100,
+                            help='Simulated ws/purchase-suggestions/ clients')
+        parser.add_argument('--alerts', type=int, default=100, help='Alerts (and suggestions) to push')
+        parser.add_argument('--rate', type=float, default=0, help='Alerts per second, 0 for as fast as possible')
+        parser.add_argument('--batch-window-ms', type=int, default=0, help='Ask stock alert clients for batching')
+
+    def handle(self, *args, **options):
+        logging.disable(logging.WARNING)
+        try:
+            with override_settings(
+                CHANNEL_LAYERS={'default': {
+                    'BACKEND': 'channels.layers.InMemoryChannelLayer',
+                    'CONFIG': {'capacity': max(1000, options['alerts'] * 2)},
+                }},
+                STOCK_ALERT_CACHE='default',
+                STOCK_ALERT_LOW_STOCK_INDEX={'BACKEND': 'apps.inventory.low_stock_index.InProcessLowStockIndex'},
+                WEBSOCKET_OUTBOUND_QUEUE_SIZE=max(1000, options['alerts'] * 2),
+            ):
+                asyncio.run(self._run(options))
+        finally:
+            logging.disable(logging.NOTSET)
+
+    async def _run(self, options):
+        from channels.layers import get_channel_layer
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from config.routing import websocket_urlpatterns
+        from apps.inventory.alert_stream import get_stock_alert_history
+        from apps.inventory.fanout import publish_stock_alert, publish_purchase_suggestion
+        from apps.inventory.kafka_producer import StockAlertProducer
+
+        application = URLRouter(websocket_urlpatterns)
+        channel_layer = get_channel_layer()
+        history = get_stock_alert_history()
+        alerts, window = options['alerts'], options['batch_window_ms']
+        alert_path = f'/ws/stock-alerts/?snapshot=0&batch_window_ms={window}'
+
+        # Memory per connection: Python allocations while the sockets are opened
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        stock_clients = [WebsocketCommunicator(application, alert_path) for _ in range(options['clients'])]
+        suggestion_clients = [
+            WebsocketCommunicator(application, '/ws/purchase-suggestions/')
+            for _ in range(options['suggestion_clients'])
+        ]
+        clients = stock_clients + suggestion_clients
+        for client in clients:
+            connected, _ = await client.connect()
+            assert connected, 'WebSocket connection refused'
+            await client.receive_from()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        connection_bytes = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+        sent_at = {}
+        latencies = []
+
+        async def read(client, expected):
+            received = 0
+            while received < expected:
+                frame = json.loads(await client.receive_from(timeout=60))
+                delivered = time.perf_counter()
+                items = frame['alerts'] if frame['type'] == 'stock_alert_batch' else [frame]
+                for item in items:
+                    data = item['data']
+                    key = data.get('idempotency_key') or f"suggestion-{data['suggestion_id']}"
+                    latencies.append(delivered - sent_at[key])
+                received += len(items)
+            return received
+
+        started_cpu, started = time.process_time(), time.perf_counter()
+        # Batching collapses alerts per SKU, so every alert uses its own product
+        readers = [asyncio.ensure_future(read(client, alerts)) for client in clients]
+        for i in range(alerts):
+            alert_data = StockAlertProducer.build_alert_message({
+                'id': i + 1,
+                'name': f'Product {i + 1}',
+                'sku': f'LOAD-{i + 1}',
+                'current_stock': i % 10,
+                'low_stock_threshold': 10,
+            })
+            po_alert = {
+                'type': 'PURCHASE_SUGGESTION',
+                'suggestion_id': i + 1,
+                'product_name': alert_data['product_name'],
+                'sku': alert_data['sku'],
+                'supplier': 'Load Test Supplier',
+                'suggested_qty': 10,
+                'total_cost': 100.0,
+                'reason': 'load test',
+            }
+            event, = history.record([alert_data])
+            sent_at[alert_data['idempotency_key']] = sent_at[f'suggestion-{i + 1}'] = time.perf_counter()
+            await publish_stock_alert(channel_layer, alert_data, event)
+            await publish_purchase_suggestion(channel_layer, po_alert)
+            if options['rate']:
+                await asyncio.sleep(1 / options['rate'])
+            else:
+                await asyncio.sleep(0)
+        delivered = sum(await asyncio.gather(*readers))
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - started_cpu
+
+        for client in clients:
+            await client.disconnect()
+
+        latencies.sort()
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+        self.stdout.write(f'Clients:           {len(stock_clients)} stock alert, {len(suggestion_clients)} suggestion')
+        self.stdout.write(f'Delivered:         {delivered} messages in {elapsed:.2f}s ({delivered / elapsed:.0f} msg/s)')
+        self.stdout.write(
+            f'Latency:           p50 {percentile(0.50):.1f}ms  p95 {percentile(0.95):.1f}ms  '
+            f'p99 {percentile(0.99):.1f}ms  max {latencies[-1] * 1000:.1f}ms  (mean {statistics.mean(latencies) * 1000:.1f}ms)'
+        )
+        self.stdout.write(f'Memory/connection: {connection_bytes / len(clients) / 1024:.1f} KiB (Python allocations)')
+        self.stdout.write(f'CPU/message:       {cpu / delivered * 1e6:.1f}us')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from apps.product.models import Product
+from apps.inventory.low_stock_index import get_low_stock_index, low_stock_entry
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the low stock index used for WebSocket snapshots from the products table'
+
+    def handle(self, *args, **options):
+        products = Product.objects.filter(current_stock__lte=F('low_stock_threshold')).only(
+            'id', 'name', 'sku', 'current_stock', 'low_stock_threshold', 'category_id'
+        )
+        entries = [low_stock_entry(product) for product in products.iterator()]
+        get_low_stock_index().replace(entries)
+        self.stdout.write(self.style.SUCCESS(f'Low stock index rebuilt with {len(entries)} products'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from apps.inventory.outbox import OutboxRelay
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Relay committed outbox events (stock alerts) to Kafka'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Outbox rows claimed per batch')
+        parser.add_argument('--poll-interval', type=float, default=None, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox and exit')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Starting outbox relay...'))
+        
+        relay = OutboxRelay(batch_size=options['batch_size'], poll_interval=options['poll_interval'])
+        started = time.monotonic()
+        
+        try:
+            relay.run(once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Stopping outbox relay...'))
+            relay.stop()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error in outbox relay: {e}'))
+            logger.error(f'Outbox relay error: {e}')
+        finally:
+            relay.producer.flush()
+            elapsed = time.monotonic() - started
+            rate = relay.relayed / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f'Outbox relay stopped: {relay.relayed} events in {elapsed:.1f}s ({rate:.0f} events/s)'
+            ))
@@ -1,5 +1,8 @@
-from django.core.management.base import BaseCommand
-from apps.inventory.kafka_consumer import StockAlertConsumer
+from django.core.management.base import BaseCommand, CommandError
+from apps.inventory.kafka_consumer import (
+    AsyncStockAlertConsumer, PooledStockAlertConsumer, RetryStockAlertConsumer, StockAlertConsumer
+)
+from apps.inventory.retry import retry_tiers
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,10 +10,50 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'Start Kafka consumer for stock alerts'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Maximum records fetched per poll')
+        parser.add_argument('--max-wait-ms', type=int, default=None, help='Maximum time a poll waits to fill a batch')
+        parser.add_argument('--mode', choices=['sync', 'async', 'pool'], default='sync',
+                            help='Blocking batch loop, asyncio event loop or partition-aware worker pool')
+        parser.add_argument('--concurrency', type=int, default=None, help='Maximum alerts in flight (async mode)')
+        parser.add_argument('--orm-workers', type=int, default=None, help='Threads for ORM work (async mode)')
+        parser.add_argument('--workers', type=int, default=None, help='Worker threads (pool mode)')
+        parser.add_argument('--retry-tier', type=int, default=None,
+                            help='Consume retry tier N (1-based) of KAFKA_STOCK_ALERTS_RETRY_TIERS instead of the main topic')
+
     def handle(self, *args, **options):
+        tier = options['retry_tier']
+        if tier is not None and not 1 <= tier <= len(retry_tiers()):
+            raise CommandError(
+                f"--retry-tier must be between 1 and {len(retry_tiers())} (KAFKA_STOCK_ALERTS_RETRY_TIERS), got {tier}"
+            )
+
         self.stdout.write(self.style.SUCCESS('Starting Kafka consumer for stock alerts...'))
         
-        consumer = StockAlertConsumer()
+        if tier is not None:
+            consumer = RetryStockAlertConsumer(
+                tier,
+                batch_size=options['batch_size'],
+                max_wait_ms=options['max_wait_ms']
+            )
+        elif options['mode'] == 'async':
+            consumer = AsyncStockAlertConsumer(
+                batch_size=options['batch_size'],
+                max_wait_ms=options['max_wait_ms'],
+                concurrency=options['concurrency'],
+                orm_workers=options['orm_workers']
+            )
+        elif options['mode'] == 'pool':
+            consumer = PooledStockAlertConsumer(
+                batch_size=options['batch_size'],
+                max_wait_ms=options['max_wait_ms'],
+                workers=options['workers']
+            )
+        else:
+            consumer = StockAlertConsumer(
+                batch_size=options['batch_size'],
+                max_wait_ms=options['max_wait_ms']
+            )
         
         try:
             consumer.start_consuming()
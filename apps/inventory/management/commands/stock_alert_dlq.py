@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.inventory.retry import inspect_dead_letters, redrive_dead_letters
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Inspect or re-drive dead-lettered stock alerts'
+
+    def add_arguments(self, parser):
+        action = parser.add_mutually_exclusive_group(required=True)
+        action.add_argument('--list', action='store_true', help='Print dead letters from the start of the DLQ')
+        action.add_argument('--redrive', action='store_true', help='Republish dead letters to the main stock alert topic')
+        parser.add_argument('--limit', type=int, default=None, help='Maximum letters to list or re-drive')
+        parser.add_argument('--product-id', type=int, default=None, help='Only re-drive letters for this product')
+
+    def handle(self, *args, **options):
+        try:
+            if options['list']:
+                letters = inspect_dead_letters(limit=options['limit'] or 100)
+                for letter in letters:
+                    alert = letter['alert']
+                    self.stdout.write(
+                        f"[{letter['partition']}:{letter['offset']}] {alert.get('sku')} "
+                        f"attempts={alert.get('retry_attempts')} at={alert.get('dead_lettered_at')} "
+                        f"error={alert.get('last_error')}"
+                    )
+                    if options['verbosity'] > 1:
+                        self.stdout.write(json.dumps(alert, indent=2))
+                self.stdout.write(self.style.SUCCESS(f'{len(letters)} dead letters'))
+            else:
+                redriven, skipped = redrive_dead_letters(limit=options['limit'], product_id=options['product_id'])
+                self.stdout.write(self.style.SUCCESS(f'Re-drove {redriven} dead letters ({skipped} skipped)'))
+        except Exception as e:
+            logger.error(f'Dead letter command failed: {e}')
+            raise CommandError(str(e))
@@ -37,4 +37,14 @@ class StockLot(models.Model):
     # Index to optimize consuming lots
     class Meta:
         db_table = "stock_lots"
-        indexes = [models.Index(fields=["product", "created_at"])]
\ No newline at end of file
+        indexes = [models.Index(fields=["product", "created_at"])]
+
+class OutboxEvent(models.Model):
+    """Event written in the same transaction as the stock change, relayed to Kafka afterwards"""
+    topic = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, null=True, blank=True)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "outbox"
@@ -0,0 +1,166 @@
+import asyncio
+import itertools
+import json
+import logging
+import weakref
+from collections import Counter, OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = 'drop_oldest'
+COALESCE = 'coalesce'
+DISCONNECT = 'disconnect'
+OVERFLOW_POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+# Close code sent to clients evicted by the disconnect policy
+SLOW_CLIENT_CLOSE_CODE = 4008
+
+_counters = Counter()
+_queues = weakref.WeakSet()
+
+
+class OutboundQueue:
+    """Bounded queue of frames between the channel layer and one WebSocket.
+
+    Handlers ``put`` frames and return immediately; a writer task awaits the
+    socket, so a slow client only backs up its own queue instead of stalling
+    its channel layer inbox. When the queue is full the overflow policy
+    decides what gives:
+
+    * ``drop_oldest`` drops the oldest queued frame
+    * ``coalesce`` replaces the newest queued frame with the same key (SKU),
+      and drops the oldest frame if nothing can be replaced; below the limit
+      every frame is queued
+    * ``disconnect`` sends a ``resync_required`` hint with the last delivered
+      ``event_id`` and closes the socket, so the client can resume from there
+    """
+
+    def __init__(self, consumer, maxsize=None, policy=None):
+        self.consumer = consumer
+        self.maxsize = maxsize or getattr(settings, 'WEBSOCKET_OUTBOUND_QUEUE_SIZE', 1000)
+        self.policy = policy or getattr(settings, 'WEBSOCKET_OVERFLOW_POLICY', DROP_OLDEST)
+        if self.policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy '{self.policy}'")
+        self.frames = OrderedDict()
+        # Coalesce policy: key -> sequence of its newest queued frame
+        self.keys = {}
+        self.sequence = itertools.count()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.last_event_id = None
+        self.dropped = 0
+        self.writer = asyncio.create_task(self._drain())
+        _queues.add(self)
+        _counters['connections'] += 1
+
+    def __len__(self):
+        return len(self.frames)
+
+    def put(self, frame, key=None, event_id=None):
+        """Queue a text frame; ``key`` lets the coalesce policy replace an older frame on overflow"""
+        if self.closed:
+            return
+        if len(self.frames) >= self.maxsize:
+            if self.policy == DISCONNECT:
+                self.closed = True
+                asyncio.create_task(self._evict())
+                return
+            if not self._coalesce(key):
+                self._drop_oldest()
+
+        sequence = next(self.sequence)
+        self.frames[sequence] = (frame, event_id, key)
+        if self.policy == COALESCE and key is not None:
+            self.keys[key] = sequence
+        self.ready.set()
+
+    def _coalesce(self, key):
+        """Drop the newest queued frame for ``key`` to make room, if the policy allows it"""
+        if self.policy != COALESCE or key not in self.keys:
+            return False
+        del self.frames[self.keys.pop(key)]
+        _counters['frames_coalesced'] += 1
+        return True
+
+    def _drop_oldest(self):
+        sequence, (_, _, key) = self.frames.popitem(last=False)
+        self._forget(sequence, key)
+        self.dropped += 1
+        _counters['frames_dropped'] += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning(f"🐢 Slow WebSocket client {self.consumer.channel_name}: {self.dropped} frames dropped")
+
+    def _forget(self, sequence, key):
+        if key is not None and self.keys.get(key) == sequence:
+            del self.keys[key]
+
+    async def _drain(self):
+        while True:
+            await self.ready.wait()
+            while self.frames:
+                sequence, (frame, event_id, key) = self.frames.popitem(last=False)
+                self._forget(sequence, key)
+                try:
+                    await self.consumer.send(text_data=frame)
+                except Exception as e:
+                    await self._send_failed(e)
+                    return
+                _counters['frames_sent'] += 1
+                if event_id is not None:
+                    self.last_event_id = event_id
+            self.ready.clear()
+
+    async def _send_failed(self, error):
+        """Stop queueing for a socket that can no longer be written to and close it"""
+        self.closed = True
+        _counters['send_failures'] += 1
+        _counters['frames_discarded_on_close'] += len(self.frames)
+        self.frames.clear()
+        self.keys.clear()
+        logger.error(f"❌ WebSocket send to {self.consumer.channel_name} failed, closing the connection: {error}")
+        try:
+            await self.consumer.close()
+        except Exception as e:
+            logger.debug(f"Closing {self.consumer.channel_name} after a failed send: {e}")
+
+    async def _evict(self):
+        self.writer.cancel()
+        queued = len(self.frames)
+        self.frames.clear()
+        self.keys.clear()
+        _counters['slow_disconnects'] += 1
+        _counters['frames_dropped'] += queued
+        logger.warning(f"🐢 Disconnecting slow WebSocket client {self.consumer.channel_name} ({queued} frames queued)")
+        await self.consumer.send(text_data=json.dumps({
+            'type': 'resync_required',
+            'last_event_id': self.last_event_id,
+        }))
+        await self.consumer.close(code=SLOW_CLIENT_CLOSE_CODE)
+
+    def close(self):
+        """Stop the writer; frames still queued are discarded, not counted as dropped"""
+        self.closed = True
+        self.writer.cancel()
+        _counters['frames_discarded_on_close'] += len(self.frames)
+        self.frames.clear()
+        self.keys.clear()
+        if self in _queues:
+            _queues.discard(self)
+            _counters['connections'] -= 1
+
+
+def outbound_metrics():
+    """Process-wide WebSocket delivery metrics"""
+    depths = [len(queue) for queue in list(_queues)]
+    return {
+        'connections': _counters['connections'],
+        'queued_frames': sum(depths),
+        'max_queue_depth': max(depths, default=0),
+        'frames_sent': _counters['frames_sent'],
+        'frames_dropped': _counters['frames_dropped'],
+        'frames_coalesced': _counters['frames_coalesced'],
+        'frames_discarded_on_close': _counters['frames_discarded_on_close'],
+        'slow_disconnects': _counters['slow_disconnects'],
+        'send_failures': _counters['send_failures'],
+    }
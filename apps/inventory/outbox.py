@@ -0,0 +1,91 @@
+import logging
+import time
+from django.conf import settings
+from django.db import transaction
+from .models import OutboxEvent
+from .kafka_producer import get_stock_alert_producer
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_outbox_event(topic, key, payload):
+    """Record an event for the relay; joins the caller's transaction if there is one"""
+    return OutboxEvent.objects.create(
+        topic=topic,
+        key=str(key) if key is not None else None,
+        payload=payload,
+    )
+
+
+class OutboxRelay:
+    """Moves committed outbox rows to Kafka in batches.
+
+    Each batch is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so any
+    number of relay processes can run side by side without handing out the
+    same row twice. Rows are only deleted after the whole batch has been
+    acknowledged by the broker; a failed publish rolls the claim back and the
+    rows are retried on the next pass.
+    """
+
+    def __init__(self, batch_size=None, poll_interval=None):
+        self.batch_size = batch_size or getattr(settings, 'OUTBOX_RELAY_BATCH_SIZE', 500)
+        self.poll_interval = poll_interval if poll_interval is not None else getattr(
+            settings, 'OUTBOX_RELAY_POLL_INTERVAL', 0.5
+        )
+        self.producer = get_stock_alert_producer()
+        self.running = False
+        self.relayed = 0
+
+    def relay_batch(self):
+        """Publish and delete one batch of outbox rows; returns the number relayed"""
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .order_by('id')[:self.batch_size]
+            )
+            if not events:
+                return 0
+
+            futures = [self.producer.publish(event.topic, event.key, event.payload) for event in events]
+            self.producer.flush()
+
+            failed = [future.exception for future in futures if future.failed()]
+            if failed:
+                raise RuntimeError(f"{len(failed)} of {len(events)} outbox events not acknowledged: {failed[0]}")
+
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).delete()
+
+        self.relayed += len(events)
+        return len(events)
+
+    def run(self, once=False, report_every=10.0):
+        """Relay until stopped, logging throughput every ``report_every`` seconds"""
+        self.running = True
+        window_start = time.monotonic()
+        window_count = 0
+
+        while self.running:
+            try:
+                count = self.relay_batch()
+            except Exception as e:
+                logger.error(f"❌ Outbox relay batch failed: {e}")
+                count = 0
+                time.sleep(self.poll_interval)
+
+            window_count += count
+            elapsed = time.monotonic() - window_start
+            if elapsed >= report_every:
+                logger.info(f"📊 Outbox relay: {window_count} events in {elapsed:.1f}s ({window_count / elapsed:.0f} events/s)")
+                window_start = time.monotonic()
+                window_count = 0
+
+            if once and count < self.batch_size:
+                break
+            if count == 0:
+                time.sleep(self.poll_interval)
+
+        self.running = False
+
+    def stop(self):
+        """Stop the relay after the current batch"""
+        self.running = False
@@ -0,0 +1,145 @@
+import logging
+import time
+from datetime import datetime
+from kafka.structs import TopicPartition
+from django.conf import settings
+from .kafka_producer import get_stock_alert_producer
+from .alert_codec import decode_alert
+from .transports import get_alert_transport
+
+logger = logging.getLogger(__name__)
+
+
+def retry_tiers():
+    """``[(topic, delay_seconds), ...]`` in escalation order"""
+    return getattr(settings, 'KAFKA_STOCK_ALERTS_RETRY_TIERS', [])
+
+
+def dead_letter_topic():
+    return getattr(settings, 'KAFKA_STOCK_ALERTS_DLQ_TOPIC', 'stock-alerts-dlq')
+
+
+class AlertRetryRouter:
+    """Moves failed alerts off the main topic.
+
+    An alert that fails processing is republished to the next retry tier with
+    its attempt count and a ``retry_not_before`` timestamp; once every tier
+    is exhausted it goes to the dead-letter topic. The main consumer commits
+    past the failed offset, so one bad product never holds up its partition.
+    """
+
+    def __init__(self, producer=None):
+        self.producer = producer or get_stock_alert_producer()
+        self.tiers = retry_tiers()
+        self.dlq_topic = dead_letter_topic()
+
+    def route_failure(self, alert_data, error):
+        """Publish a failed alert to its next retry tier or the DLQ; raises if that publish fails"""
+        attempts = alert_data.get('retry_attempts', 0)
+        message = {
+            **alert_data,
+            'retry_attempts': attempts + 1,
+            'last_error': f"{type(error).__name__}: {error}",
+        }
+
+        if attempts < len(self.tiers):
+            topic, delay = self.tiers[attempts]
+            message['retry_not_before'] = time.time() + delay
+            logger.warning(f"🔁 Alert for {alert_data.get('sku')} failed ({error}), retry {attempts + 1} via {topic} in {delay}s")
+        else:
+            topic = self.dlq_topic
+            message.pop('retry_not_before', None)
+            message['dead_lettered_at'] = datetime.now().isoformat()
+            logger.error(f"☠️ Alert for {alert_data.get('sku')} dead-lettered after {attempts + 1} attempts: {error}")
+
+        future = self.producer.publish(topic, alert_data.get('product_id'), message)
+        future.get(timeout=getattr(settings, 'KAFKA_RETRY_PUBLISH_TIMEOUT', 10))
+        return topic
+
+
+def _dead_letter_consumer(group_id=None, subscribe=True):
+    """DLQ consumer: in ``group_id`` when given, otherwise reading every partition from the start.
+
+    ``subscribe=False`` assigns the partitions instead, so the read starts at
+    the group's committed offsets without joining (or moving) the group.
+    """
+    consumer = get_alert_transport().consumer(
+        value_deserializer=decode_alert,
+        key_deserializer=lambda k: k.decode('utf-8') if k else None,
+        group_id=group_id,
+        enable_auto_commit=False,
+        auto_offset_reset='earliest',
+        consumer_timeout_ms=2000,
+    )
+    if group_id and subscribe:
+        consumer.subscribe([dead_letter_topic()])
+    else:
+        partitions = consumer.partitions_for_topic(dead_letter_topic()) or set()
+        consumer.assign([TopicPartition(dead_letter_topic(), p) for p in partitions])
+        if not group_id:
+            consumer.seek_to_beginning()
+    return consumer
+
+
+def inspect_dead_letters(limit=100):
+    """Read up to ``limit`` dead letters from the start of the DLQ without committing anything"""
+    consumer = _dead_letter_consumer()
+    try:
+        letters = []
+        for message in consumer:
+            letters.append({
+                'partition': message.partition,
+                'offset': message.offset,
+                'key': message.key,
+                'alert': message.value,
+            })
+            if len(letters) >= limit:
+                break
+        return letters
+    finally:
+        consumer.close()
+
+
+def redrive_dead_letters(limit=None, product_id=None, batch_size=500):
+    """Republish dead letters to the main topic with a fresh retry budget.
+
+    Progress is tracked by the ``stock-alert-dlq-redrive`` consumer group, so
+    a rerun picks up after the letters an earlier run already redrove.
+    A batch with any republish the broker did not acknowledge is not
+    committed and raises, so its letters are redriven again next time.
+
+    With ``product_id`` only that product's letters are redriven and nothing
+    is committed: the other products' letters stay in place for a later full
+    redrive, which republishes this product's letters once more.
+    Returns ``(redriven, skipped)``.
+    """
+    consumer = _dead_letter_consumer(group_id='stock-alert-dlq-redrive', subscribe=product_id is None)
+    producer = get_stock_alert_producer()
+    redriven = skipped = 0
+    try:
+        while limit is None or redriven < limit:
+            max_records = batch_size if limit is None else min(batch_size, limit - redriven)
+            records = consumer.poll(timeout_ms=2000, max_records=max_records)
+            if not records:
+                break
+            futures = []
+            for messages in records.values():
+                for message in messages:
+                    alert_data = message.value
+                    if product_id is not None and alert_data.get('product_id') != product_id:
+                        skipped += 1
+                        continue
+                    for field in ('retry_attempts', 'retry_not_before', 'last_error', 'dead_lettered_at'):
+                        alert_data.pop(field, None)
+                    futures.append(producer.publish(settings.KAFKA_STOCK_ALERTS_TOPIC, alert_data.get('product_id'), alert_data))
+            # Only move the group forward once the batch is safely on the main topic
+            producer.flush()
+            failed = [future.exception for future in futures if future.failed()]
+            if failed:
+                raise RuntimeError(f"{len(failed)} of {len(futures)} redriven alerts not acknowledged: {failed[0]}")
+            if product_id is None:
+                consumer.commit()
+            redriven += len(futures)
+        return redriven, skipped
+    finally:
+        consumer.close()
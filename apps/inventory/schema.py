@@ -4,12 +4,15 @@ from typing import List, Optional
 from decimal import Decimal
 from .models import InventoryTransaction, StockLot
 from apps.product.schema import ProductType
+from config.dataloaders import get_loaders
+from config.optimizer import optimize
+from config.pagination import Connection, capped_list, paginate
+from config.schema_extensions import SCHEMA_EXTENSIONS
 
 
 @strawberry.django.type(InventoryTransaction)
 class InventoryTransactionType:
     id: auto
-    product: ProductType
     qty: auto
     type: auto
     reference_type: Optional[str]
@@ -17,17 +20,24 @@ class InventoryTransactionType:
     created_at: auto
     note: Optional[str]
 
+    @strawberry.field
+    def product(self, info: strawberry.Info) -> ProductType:
+        return get_loaders(info).related(self, 'product')
+
 
 @strawberry.django.type(StockLot)
 class StockLotType:
     id: auto
-    product: ProductType
     qty: auto
     unit_cost: auto
     created_at: auto
     remaining_qty: auto
     reference: Optional[str]
 
+    @strawberry.field
+    def product(self, info: strawberry.Info) -> ProductType:
+        return get_loaders(info).related(self, 'product')
+
 
 @strawberry.input
 class InventoryTransactionInput:
@@ -50,30 +60,68 @@ class StockLotInput:
 @strawberry.type
 class Query:
     @strawberry.field
-    def inventory_transactions(self) -> List[InventoryTransactionType]:
-        return InventoryTransaction.objects.select_related('product').all()
+    def inventory_transactions(self, info: strawberry.Info) -> List[InventoryTransactionType]:
+        return get_loaders(info).expect(
+            capped_list(optimize(InventoryTransaction.objects.all(), info), '-created_at')
+        )
+    
+    @strawberry.field
+    def inventory_transactions_connection(
+        self,
+        info: strawberry.Info,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[InventoryTransactionType]:
+        return paginate(InventoryTransaction.objects.all(), info, '-created_at', first, after, last, before)
     
     @strawberry.field
-    def inventory_transaction(self, id: int) -> Optional[InventoryTransactionType]:
+    def inventory_transaction(self, info: strawberry.Info, id: int) -> Optional[InventoryTransactionType]:
         try:
-            return InventoryTransaction.objects.select_related('product').get(id=id)
+            return optimize(InventoryTransaction.objects.all(), info).get(id=id)
         except InventoryTransaction.DoesNotExist:
             return None
     
     @strawberry.field
-    def stock_lots(self) -> List[StockLotType]:
-        return StockLot.objects.select_related('product').all()
+    def stock_lots(self, info: strawberry.Info) -> List[StockLotType]:
+        return get_loaders(info).expect(capped_list(optimize(StockLot.objects.all(), info), '-created_at'))
+    
+    @strawberry.field
+    def stock_lots_connection(
+        self,
+        info: strawberry.Info,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[StockLotType]:
+        return paginate(StockLot.objects.all(), info, '-created_at', first, after, last, before)
     
     @strawberry.field
-    def stock_lot(self, id: int) -> Optional[StockLotType]:
+    def stock_lot(self, info: strawberry.Info, id: int) -> Optional[StockLotType]:
         try:
-            return StockLot.objects.select_related('product').get(id=id)
+            return optimize(StockLot.objects.all(), info).get(id=id)
         except StockLot.DoesNotExist:
             return None
     
     @strawberry.field
-    def product_stock_lots(self, product_id: int) -> List[StockLotType]:
-        return StockLot.objects.filter(product_id=product_id).select_related('product')
+    def product_stock_lots(self, info: strawberry.Info, product_id: int) -> List[StockLotType]:
+        return get_loaders(info).expect(
+            capped_list(optimize(StockLot.objects.filter(product_id=product_id), info), '-created_at')
+        )
+    
+    @strawberry.field
+    def product_stock_lots_connection(
+        self,
+        info: strawberry.Info,
+        product_id: int,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[StockLotType]:
+        return paginate(StockLot.objects.filter(product_id=product_id), info, '-created_at', first, after, last, before)
 
 
 @strawberry.type
@@ -102,4 +150,4 @@ class Mutation:
         return stock_lot
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=SCHEMA_EXTENSIONS)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.db import transaction
 from .models import InventoryTransaction
+from .ticker import get_stock_tick_dispatcher
 from apps.product.models import Product
 
 class InventoryService:
@@ -17,6 +18,7 @@ class InventoryService:
             type="IN",
             reference_type="Purchase"
         )
+        InventoryService._publish_tick(product)
         return product
 
     @staticmethod
@@ -35,8 +37,15 @@ class InventoryService:
             type="OUT",
             reference_type="Sale"
         )
+        InventoryService._publish_tick(product)
         return product
 
+    @staticmethod
+    def _publish_tick(product):
+        """Queue the new stock level for ticker watchers once the change is committed"""
+        product_id, qty = product.id, product.current_stock
+        transaction.on_commit(lambda: get_stock_tick_dispatcher().submit(product_id, qty))
+
     @staticmethod
     def check_stock(product_id: int):
         try:
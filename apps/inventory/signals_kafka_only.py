@@ -1,39 +1,86 @@
 import logging
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from apps.product.models import Product
 from datetime import datetime
-from .kafka_producer import StockAlertProducer
+from django.conf import settings
+from django.db import transaction
+from .alert_state import get_stock_alert_gate
+from .kafka_producer import StockAlertProducer, get_stock_alert_dispatcher
+from .outbox import enqueue_outbox_event
+from .low_stock_index import get_low_stock_index, sync_product
 
 logger = logging.getLogger(__name__)
 
+@receiver(post_save, sender=Product)
+def update_low_stock_index(sender, instance, **kwargs):
+    """Keep the low stock index (WebSocket snapshots) in step with committed stock changes"""
+    transaction.on_commit(lambda: sync_product(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_low_stock_index(sender, instance, **kwargs):
+    product_id = instance.id
+    transaction.on_commit(lambda: get_low_stock_index().discard(product_id))
+
+
 @receiver(post_save, sender=Product)
 def send_kafka_stock_alert(sender, instance, created, **kwargs):
     """Send stock alert via Kafka only (Kafka consumer forwards to WebSocket)"""
     if created:
         return
     
-    if instance.current_stock <= instance.low_stock_threshold:
+    # Saves that only touch name, price, etc. can never change alert state
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'current_stock', 'low_stock_threshold'} & set(update_fields):
+        return
+    
+    gate = get_stock_alert_gate()
+    try:
+        should_alert, state = gate.evaluate(instance.id, instance.current_stock, instance.low_stock_threshold)
+    except Exception as e:
+        # Fail open: without alert state every low stock save alerts, as before
+        logger.error(f"❌ Alert state unavailable for {instance.sku}: {e}")
+        should_alert, state = instance.current_stock <= instance.low_stock_threshold, None
+    
+    # Alerts are already recorded by the gate; only quiet state changes wait for the commit
+    if state is not None:
+        transaction.on_commit(lambda: gate.record(instance.id, state))
+    
+    if should_alert:
         logger.info(f"🚨 Low stock detected for {instance.sku}: {instance.current_stock} <= {instance.low_stock_threshold}")
         
-        # Send to Kafka only (Kafka consumer will forward to WebSocket)
+        product_data = {
+            'id': instance.id,
+            'name': instance.name,
+            'sku': instance.sku,
+            'current_stock': instance.current_stock,
+            'low_stock_threshold': instance.low_stock_threshold,
+            'category_id': instance.category_id,
+            # supplier_ids are resolved by the consumer, keeping the save path free of reads
+        }
+        
+        if getattr(settings, 'STOCK_ALERT_USE_OUTBOX', True):
+            # Written in the caller's transaction; relay_outbox publishes it once committed
+            enqueue_outbox_event(
+                settings.KAFKA_STOCK_ALERTS_TOPIC,
+                instance.id,
+                StockAlertProducer.build_alert_message(product_data)
+            )
+            logger.info(f"✅ Stock alert written to outbox for {instance.sku}")
+            return
+        
+        # Queue for the shared Kafka producer (Kafka consumer will forward to WebSocket)
         try:
-            producer = StockAlertProducer()
-            product_data = {
-                'id': instance.id,
-                'name': instance.name,
-                'sku': instance.sku,
-                'current_stock': instance.current_stock,
-                'low_stock_threshold': instance.low_stock_threshold,
-            }
-            success = producer.send_stock_alert(product_data)
-            producer.close()
+            queued = get_stock_alert_dispatcher().submit(product_data)
             
-            if success:
-                logger.info(f"✅ Kafka alert sent for {instance.sku} (will be forwarded to WebSocket)")
+            if queued:
+                logger.info(f"✅ Kafka alert queued for {instance.sku} (will be forwarded to WebSocket)")
             else:
-                logger.error(f"❌ Kafka alert failed for {instance.sku}")
+                logger.error(f"❌ Kafka alert dropped for {instance.sku}")
         except Exception as e:
             logger.error(f"❌ Kafka unavailable for {instance.sku}: {e}")
+    elif instance.current_stock <= instance.low_stock_threshold:
+        logger.debug(f"Low stock alert suppressed for {instance.sku}: already alerted at this severity")
     else:
         logger.debug(f"Stock levels normal for {instance.sku}: {instance.current_stock} > {instance.low_stock_threshold}")
\ No newline at end of file
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from channels.exceptions import StopConsumer
+from channels.generic.http import AsyncHttpConsumer
+from .alert_stream import get_stock_alert_history
+from .low_stock_index import low_stock_snapshot
+from .fanout import (
+    STOCK_ALERTS_GROUP, SUBSCRIPTION_GROUPS, RecentKeys, filter_groups,
+    stamp_delivery, stock_alert_event, purchase_suggestion_event,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class EventStreamConsumer(AsyncHttpConsumer):
+    """Base for ``text/event-stream`` responses fed by channel layer groups.
+
+    ``AsyncHttpConsumer`` stops once ``handle`` returns. Here the response
+    stays open after ``start_stream`` and group events keep being dispatched
+    to the handlers until the client disconnects. A comment line is written
+    every ``STOCK_ALERT_SSE_KEEPALIVE_SECONDS`` so proxies keep the stream open.
+    """
+
+    streaming = False
+
+    async def http_request(self, message):
+        if 'body' in message:
+            self.body.append(message['body'])
+        if message.get('more_body'):
+            return
+        await self.handle(b''.join(self.body))
+        if not self.streaming:
+            await self.disconnect()
+            raise StopConsumer()
+
+    def query(self):
+        return parse_qs(self.scope.get('query_string', b'').decode('latin-1'))
+
+    async def send_error(self, status, message):
+        await self.send_response(status, json.dumps({'error': message}).encode(), headers=[
+            (b'Content-Type', b'application/json'),
+        ])
+
+    async def start_stream(self, groups):
+        """Join ``groups`` and send the event stream headers"""
+        self.groups = set(groups)
+        await asyncio.gather(*[self.channel_layer.group_add(group, self.channel_name) for group in self.groups])
+        headers = [
+            (b'Content-Type', b'text/event-stream'),
+            (b'Cache-Control', b'no-cache'),
+            # Stop nginx from buffering the stream
+            (b'X-Accel-Buffering', b'no'),
+        ]
+        if getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False):
+            headers.append((b'Access-Control-Allow-Origin', b'*'))
+        await self.send_headers(headers=headers)
+        self.streaming = True
+        # The server only starts the response with the first body message
+        await self.send_body(b': connected\n\n', more_body=True)
+        self.keepalive_task = asyncio.create_task(self._keepalive())
+
+    async def send_event(self, data, event=None, event_id=None):
+        """Write one event; ``data`` is a single line of JSON text"""
+        lines = []
+        if event_id is not None:
+            lines.append(f'id: {event_id}')
+        if event:
+            lines.append(f'event: {event}')
+        lines.append(f'data: {data}')
+        await self.send_body(('\n'.join(lines) + '\n\n').encode(), more_body=True)
+
+    async def _keepalive(self):
+        interval = getattr(settings, 'STOCK_ALERT_SSE_KEEPALIVE_SECONDS', 15)
+        while True:
+            await asyncio.sleep(interval)
+            await self.send_body(b': keepalive\n\n', more_body=True)
+
+    async def disconnect(self):
+        if getattr(self, 'keepalive_task', None):
+            self.keepalive_task.cancel()
+        await asyncio.gather(*[
+            self.channel_layer.group_discard(group, self.channel_name) for group in getattr(self, 'groups', ())
+        ])
+
+
+class StockAlertSSEConsumer(EventStreamConsumer):
+    """Server-Sent Events stream of stock alerts for read-only clients.
+
+    Filters are query parameters with comma separated values, using the
+    WebSocket filter names (``?product_ids=1,2&severities=CRITICAL``); no
+    filter streams every alert. Each ``stock_alert`` event has the alert's
+    ``event_id`` as its id, so a reconnecting ``EventSource`` resumes through
+    its ``Last-Event-ID`` header (or ``?last_event_id=N``) exactly like a
+    WebSocket. New streams start with a ``stock_snapshot`` event unless
+    ``?snapshot=0`` is given.
+    """
+
+    async def handle(self, body):
+        query = self.query()
+        filters = {
+            name: [value for item in query.get(name, []) for value in item.split(',') if value]
+            for name in SUBSCRIPTION_GROUPS
+        }
+        try:
+            groups = filter_groups(filters) or {STOCK_ALERTS_GROUP}
+            last_event_id = self._last_event_id(query)
+        except ValueError as e:
+            await self.send_error(400, str(e))
+            return
+        max_subscriptions = getattr(settings, 'STOCK_ALERT_MAX_SUBSCRIPTIONS', 2000)
+        if len(groups) > max_subscriptions:
+            await self.send_error(400, f"At most {max_subscriptions} filters per stream")
+            return
+
+        self.history = get_stock_alert_history()
+        self.recent_keys = RecentKeys()
+        self.replayed_through = 0
+        await self.start_stream(groups)
+        logger.info(f"🔗 SSE client connected: {self.channel_name} ({len(groups)} groups)")
+
+        if last_event_id is not None:
+            await self._resume(last_event_id)
+        elif query.get('snapshot') != ['0']:
+            await self._send_snapshot()
+
+    def _last_event_id(self, query):
+        value = dict(self.scope.get('headers', [])).get(b'last-event-id', b'').decode('latin-1')
+        value = value or query.get('last_event_id', [''])[0]
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError("Last-Event-ID must be an integer")
+
+    async def _resume(self, last_event_id):
+        """Replay the alerts published after ``last_event_id``, or send a snapshot if they were evicted"""
+        try:
+            entries, latest = await sync_to_async(self.history.since)(last_event_id)
+        except Exception as e:
+            logger.error(f"❌ Alert history unavailable for {self.channel_name}: {e}")
+            entries, latest = None, None
+
+        if entries is None:
+            await self._send_snapshot(latest)
+        else:
+            for entry in entries:
+                # Every entry lists all its groups, the firehose included
+                if self.groups.intersection(entry['groups']):
+                    await self._send_alert(entry['event'])
+            logger.info(f"⏪ Replayed {len(entries)} events after {last_event_id} to SSE client {self.channel_name}")
+        self.replayed_through = max(self.replayed_through, latest or 0)
+
+    async def _send_snapshot(self, event_id=None):
+        """Send the current low stock set from the low stock index"""
+        try:
+            if event_id is None:
+                event_id = await sync_to_async(self.history.latest_id)()
+            products = await sync_to_async(low_stock_snapshot)()
+        except Exception as e:
+            logger.error(f"❌ Low stock snapshot unavailable for {self.channel_name}: {e}")
+            return
+        await self.send_event(json.dumps({
+            'type': 'stock_snapshot',
+            'event_id': event_id,
+            'products': products,
+        }), event='stock_snapshot', event_id=event_id)
+        self.replayed_through = max(self.replayed_through, event_id or 0)
+
+    async def _send_alert(self, event):
+        await self.send_event(stamp_delivery(event['frame']), event='stock_alert', event_id=event.get('event_id'))
+
+    async def stock_alert_message(self, event):
+        """Handle stock alert messages from Kafka consumer"""
+        if len(self.groups) > 1 and self.recent_keys.seen(event.get('key')):
+            return
+        if 'frame' not in event:
+            event = stock_alert_event(event['message'])
+        if event.get('event_id') is not None and event['event_id'] <= self.replayed_through:
+            return
+        await self._send_alert(event)
+
+
+class PurchaseSuggestionSSEConsumer(EventStreamConsumer):
+    """Server-Sent Events stream of purchase order suggestions"""
+
+    async def handle(self, body):
+        await self.start_stream({'purchase_suggestions'})
+        logger.info(f"🛒 Purchase suggestion SSE client connected: {self.channel_name}")
+
+    async def purchase_suggestion_message(self, event):
+        """Handle purchase suggestion messages from Kafka consumer"""
+        if 'frame' not in event:
+            event = purchase_suggestion_event(event['message'])
+        await self.send_event(stamp_delivery(event['frame']), event='purchase_suggestion')
@@ -1,3 +1,1040 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+import json
+import msgpack
+import queue
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import ApplicationCommunicator, WebsocketCommunicator
+from channels_redis.core import RedisChannelLayer
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from kafka.structs import TopicPartition
 
-# Create your tests here.
+from apps.inventory import alert_codec, alert_stream, channel_layers, kafka_producer, low_stock_index, ticker, transports
+from apps.inventory.alert_codec import decode_alert, encode_alert
+from apps.inventory.alert_state import StockAlertGate
+from apps.inventory.channel_layers import BroadcastRedisChannelLayer
+from apps.inventory.consumers import StockAlertWebSocketConsumer, StockTickerWebSocketConsumer
+from apps.inventory.fanout import publish_stock_alert
+from apps.inventory.kafka_consumer import PartitionOffsetTracker, PooledStockAlertConsumer, StockAlertConsumer
+from apps.inventory.kafka_producer import StockAlertProducer
+from apps.inventory.models import InventoryTransaction, OutboxEvent, StockLot
+from apps.inventory.outbound import COALESCE, OutboundQueue, outbound_metrics
+from apps.inventory.outbox import OutboxRelay, enqueue_outbox_event
+from apps.inventory.retry import redrive_dead_letters
+from apps.inventory.services import InventoryService
+from apps.inventory.sse import StockAlertSSEConsumer
+from apps.inventory.ticker import get_stock_tick_dispatcher, get_stock_ticker, ticker_group
+from apps.inventory.transports import (
+    ConsumerRecord, InMemoryBroker, InMemoryConsumer, InMemoryFuture, InMemoryProducer, InMemoryTransport,
+)
+from apps.product.models import Category, Product
+from apps.purchase.models import ProductSupplier
+from apps.supplier.models import Supplier
+
+
+def alert_message(product_id=1, current_stock=2, threshold=10, **extra):
+    return StockAlertProducer.build_alert_message({
+        'id': product_id,
+        'name': f'Product {product_id}',
+        'sku': f'SKU-{product_id}',
+        'current_stock': current_stock,
+        'low_stock_threshold': threshold,
+        **extra,
+    })
+
+
+class StockAlertProducerTests(SimpleTestCase):
+    def test_failed_setup_is_retried_after_backoff(self):
+        clock = mock.Mock()
+        clock.monotonic.return_value = 100.0
+        attempts = iter([ConnectionError('broker down'), None])
+
+        def create_producer(**config):
+            error = next(attempts)
+            if error:
+                raise error
+            return InMemoryTransport().producer(**config)
+
+        transport = mock.Mock()
+        transport.producer.side_effect = create_producer
+        with mock.patch('apps.inventory.kafka_producer.time', clock), \
+                mock.patch('apps.inventory.kafka_producer.get_alert_transport', return_value=transport):
+            producer = StockAlertProducer()
+            self.assertIsNone(producer.producer)
+            with self.assertRaises(RuntimeError):
+                producer.publish('stock-alerts', 1, alert_message())
+
+            clock.monotonic.return_value = 102.0
+            self.assertIsNotNone(producer.producer)
+            self.assertTrue(producer.publish('stock-alerts', 1, alert_message()).succeeded())
+        self.assertEqual(transport.producer.call_count, 2)
+
+    def test_backoff_grows_between_failed_attempts(self):
+        clock = mock.Mock()
+        clock.monotonic.return_value = 0.0
+        transport = mock.Mock()
+        transport.producer.side_effect = ConnectionError('broker down')
+        with mock.patch('apps.inventory.kafka_producer.time', clock), \
+                mock.patch('apps.inventory.kafka_producer.get_alert_transport', return_value=transport):
+            producer = StockAlertProducer()
+            for now in (0.5, 1.0, 2.0, 3.0, 4.0):
+                clock.monotonic.return_value = now
+                producer.producer
+        # Attempts at 0, 1 and 3 seconds (backoff 1s, then 2s, then 4s)
+        self.assertEqual(transport.producer.call_count, 3)
+
+
+class OutboxRelayTests(TestCase):
+    def setUp(self):
+        self.producer = mock.Mock()
+        self.producer.publish.return_value = InMemoryFuture(value='ok')
+        patcher = mock.patch('apps.inventory.outbox.get_stock_alert_producer', return_value=self.producer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.relay = OutboxRelay(batch_size=10)
+        for product_id in (1, 2, 3):
+            enqueue_outbox_event('stock-alerts', product_id, alert_message(product_id))
+
+    def test_relayed_rows_are_deleted(self):
+        self.assertEqual(self.relay.relay_batch(), 3)
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual([c.args[1] for c in self.producer.publish.call_args_list], ['1', '2', '3'])
+        self.producer.flush.assert_called_once()
+
+    def test_rows_are_kept_when_a_publish_fails(self):
+        self.producer.publish.side_effect = [
+            InMemoryFuture(value='ok'), InMemoryFuture(exception=ConnectionError('not acknowledged')), InMemoryFuture(value='ok'),
+        ]
+        with self.assertRaises(RuntimeError):
+            self.relay.relay_batch()
+        self.assertEqual(OutboxEvent.objects.count(), 3)
+        self.assertEqual(self.relay.relayed, 0)
+
+    def test_rows_are_kept_while_the_producer_is_unavailable(self):
+        self.producer.publish.side_effect = RuntimeError("Kafka producer not available")
+        with self.assertRaises(RuntimeError):
+            self.relay.relay_batch()
+        self.assertEqual(OutboxEvent.objects.count(), 3)
+
+
+@override_settings(
+    STOCK_ALERT_CACHE='default', STOCK_ALERT_COOLDOWN_SECONDS=900,
+    STOCK_ALERT_REARM_RATIO=0.2, STOCK_ALERT_REARM_MIN_UNITS=1,
+)
+class StockAlertGateTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.clock = mock.Mock()
+        self.clock.time.return_value = 1000.0
+        patcher = mock.patch('apps.inventory.alert_state.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gate = StockAlertGate()
+
+    def save(self, stock, threshold=10):
+        """Evaluate one product save and persist the state like the signal does"""
+        should_alert, state = self.gate.evaluate(1, stock, threshold)
+        if state is not None:
+            self.gate.record(1, state)
+        return should_alert
+
+    def test_first_crossing_alerts_once(self):
+        self.assertTrue(self.save(9))
+        self.assertFalse(self.save(8))
+        self.assertFalse(self.save(7))
+
+    def test_escalating_severity_alerts_again(self):
+        self.assertTrue(self.save(9))
+        self.assertTrue(self.save(4))
+        self.assertTrue(self.save(0))
+        self.assertFalse(self.save(3))
+
+    def test_oscillating_around_the_threshold_stays_quiet(self):
+        self.assertEqual(self.gate.rearm_level(10), 12)
+        self.assertTrue(self.save(10))
+        for stock in (11, 10, 12, 9, 11, 10):
+            self.assertFalse(self.save(stock))
+
+    def test_rearmed_product_waits_for_the_cooldown(self):
+        self.assertTrue(self.save(9))
+        self.assertFalse(self.save(13))
+        self.clock.time.return_value += 60
+        self.assertFalse(self.save(9))
+        self.assertFalse(self.save(13))
+        self.clock.time.return_value += 900
+        self.assertTrue(self.save(9))
+
+    def test_products_above_threshold_keep_no_state(self):
+        self.assertFalse(self.save(50))
+        self.assertIsNone(caches['default'].get('stock_alert_state:1'))
+
+    def test_saves_racing_from_the_same_state_alert_once(self):
+        self.assertTrue(self.save(9))
+        stale = caches['default'].get('stock_alert_state:1')
+        # Both saves read the state before either one records its alert
+        with mock.patch.object(self.gate.cache, 'get', return_value=stale):
+            self.assertEqual([self.save(4), self.save(4)], [True, False])
+        self.assertEqual(caches['default'].get('stock_alert_state:1')['severity'], 'HIGH')
+
+    def test_reset_product_alerts_again(self):
+        self.assertTrue(self.save(9))
+        self.gate.reset(1)
+        self.assertTrue(self.save(9))
+
+
+class PartitionOffsetTrackerTests(SimpleTestCase):
+    def setUp(self):
+        self.tracker = PartitionOffsetTracker()
+        self.p0 = TopicPartition('stock-alerts', 0)
+        self.p1 = TopicPartition('stock-alerts', 1)
+        for offset in (10, 11, 12):
+            self.tracker.track(self.p0, offset)
+        self.tracker.track(self.p1, 5)
+
+    def test_commit_waits_for_earlier_offsets(self):
+        self.tracker.done(self.p0, 12)
+        self.tracker.done(self.p0, 11)
+        self.assertEqual(self.tracker.take_commits(), {})
+        self.tracker.done(self.p0, 10)
+        self.assertEqual(self.tracker.take_commits(), {self.p0: 13})
+
+    def test_commit_advances_over_the_completed_prefix(self):
+        self.tracker.done(self.p0, 10)
+        self.tracker.done(self.p0, 12)
+        self.assertEqual(self.tracker.take_commits(), {self.p0: 11})
+        self.assertEqual(self.tracker.take_commits(), {})
+        self.tracker.done(self.p0, 11)
+        self.assertEqual(self.tracker.take_commits(), {self.p0: 13})
+
+    def test_partitions_are_independent(self):
+        self.tracker.done(self.p1, 5)
+        self.assertEqual(self.tracker.take_commits(), {self.p1: 6})
+
+    def test_revoked_partitions_are_forgotten(self):
+        self.tracker.done(self.p0, 10)
+        self.tracker.forget([self.p0])
+        self.tracker.done(self.p0, 11)
+        self.assertEqual(self.tracker.take_commits(), {})
+
+
+@override_settings(KAFKA_STOCK_ALERTS_DLQ_TOPIC='stock-alerts-dlq', KAFKA_STOCK_ALERTS_TOPIC='stock-alerts')
+class RedriveDeadLettersTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = InMemoryBroker(default_partitions=1)
+        dlq = InMemoryProducer(self.broker, value_serializer=encode_alert, key_serializer=lambda k: str(k).encode())
+        for product_id in (1, 2, 3):
+            dlq.send('stock-alerts-dlq', key=product_id, value={**alert_message(product_id), 'retry_attempts': 4})
+        transport = mock.Mock()
+        transport.consumer.side_effect = lambda **config: InMemoryConsumer(self.broker, **config)
+        self.producer = mock.Mock()
+        self.producer.publish.return_value = InMemoryFuture(value='ok')
+        for target, value in (('get_alert_transport', transport), ('get_stock_alert_producer', self.producer)):
+            patcher = mock.patch(f'apps.inventory.retry.{target}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def committed(self):
+        return self.broker.committed.get(('stock-alert-dlq-redrive', TopicPartition('stock-alerts-dlq', 0)))
+
+    def test_redriven_batch_is_committed(self):
+        self.assertEqual(redrive_dead_letters(limit=3), (3, 0))
+        self.assertEqual(self.committed(), 3)
+        republished = self.producer.publish.call_args_list[0].args
+        self.assertEqual(republished[0], 'stock-alerts')
+        self.assertNotIn('retry_attempts', republished[2])
+
+    def test_rejected_republish_is_not_committed(self):
+        self.producer.publish.side_effect = [
+            InMemoryFuture(value='ok'), InMemoryFuture(exception=ConnectionError('not acknowledged')), InMemoryFuture(value='ok'),
+        ]
+        with self.assertRaises(RuntimeError):
+            redrive_dead_letters(limit=3)
+        self.assertIsNone(self.committed())
+
+    def test_filtered_redrive_keeps_other_products_letters(self):
+        self.assertEqual(redrive_dead_letters(product_id=2), (1, 2))
+        self.assertIsNone(self.committed())
+
+        self.producer.publish.reset_mock()
+        self.assertEqual(redrive_dead_letters(), (3, 0))
+        self.assertEqual([call.args[1] for call in self.producer.publish.call_args_list], [1, 2, 3])
+        self.assertEqual(self.committed(), 3)
+
+
+class StartKafkaConsumerCommandTests(SimpleTestCase):
+    @override_settings(KAFKA_STOCK_ALERTS_RETRY_TIERS=[('stock-alerts-retry-1', 5), ('stock-alerts-retry-2', 60)])
+    def test_out_of_range_retry_tier_is_rejected(self):
+        for tier in (0, 3, -1):
+            with self.assertRaisesMessage(CommandError, 'between 1 and 2'):
+                call_command('start_kafka_consumer', retry_tier=tier)
+
+
+class AlertCodecTests(SimpleTestCase):
+    def setUp(self):
+        self.alert = alert_message(7, current_stock=0, category_id=3, supplier_ids=[4, 5])
+        self.alert['timestamp'] = '2026-01-02T03:04:05.123456'
+
+    def test_low_stock_alert_round_trip(self):
+        data = encode_alert(self.alert, 'msgpack')
+        self.assertEqual(data[:2], bytes((alert_codec.MAGIC, alert_codec.SCHEMA_LOW_STOCK_ALERT_V2)))
+        self.assertEqual(decode_alert(data), self.alert)
+        self.assertLess(len(data), len(encode_alert(self.alert, 'json')))
+
+    def test_fields_outside_the_schema_survive(self):
+        alert = {**self.alert, 'retry_attempts': 2, 'last_error': 'ValueError: boom', 'timestamp': '2026-01-02T03:04:05+02:00'}
+        self.assertEqual(decode_alert(encode_alert(alert, 'msgpack')), alert)
+
+    def test_v1_messages_still_decode(self):
+        fields = alert_codec.SCHEMAS[alert_codec.SCHEMA_LOW_STOCK_ALERT_V1][1]
+        body = [alert_codec._pack_field(name, self.alert[name]) for name in fields] + [{}]
+        data = bytes((alert_codec.MAGIC, alert_codec.SCHEMA_LOW_STOCK_ALERT_V1)) + msgpack.packb(body, use_bin_type=True)
+        decoded = decode_alert(data)
+        self.assertEqual(decoded, {key: value for key, value in self.alert.items() if key in fields or key == 'type'})
+        self.assertNotIn('supplier_ids', decoded)
+
+    def test_purchase_suggestions_and_unknown_types(self):
+        suggestion = {
+            'type': 'PURCHASE_SUGGESTION', 'suggestion_id': 9, 'product_name': 'Widget', 'sku': 'W-1',
+            'supplier': 'Acme', 'suggested_qty': 40, 'total_cost': '120.00', 'reason': 'Low stock',
+        }
+        other = {'type': 'SOMETHING_ELSE', 'value': [1, 2]}
+        self.assertEqual(decode_alert(encode_alert(suggestion, 'msgpack')), suggestion)
+        self.assertEqual(decode_alert(encode_alert(other, 'msgpack')), other)
+
+    def test_json_fallback(self):
+        with override_settings(STOCK_ALERT_ENCODING='json'):
+            data = encode_alert(self.alert)
+        self.assertEqual(json.loads(data), self.alert)
+        self.assertEqual(decode_alert(data), self.alert)
+
+    def test_unknown_schema_id_is_rejected(self):
+        with self.assertRaises(ValueError):
+            decode_alert(bytes((alert_codec.MAGIC, 250)) + msgpack.packb([]))
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    STOCK_ALERT_CACHE='default',
+    STOCK_ALERT_LOW_STOCK_INDEX={'BACKEND': 'apps.inventory.low_stock_index.InProcessLowStockIndex'},
+)
+class StockAlertWebSocketTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        for module, name in ((alert_stream, '_history'), (low_stock_index, '_index')):
+            setattr(module, name, None)
+            self.addCleanup(setattr, module, name, None)
+
+    async def connect(self, query='snapshot=0'):
+        client = WebsocketCommunicator(StockAlertWebSocketConsumer.as_asgi(), f'/ws/stock-alerts/?{query}')
+        connected, _ = await client.connect()
+        self.assertTrue(connected)
+        self.established = await client.receive_json_from()
+        self.assertEqual(self.established['type'], 'connection_established')
+        return client
+
+    async def request(self, client, frame):
+        await client.send_json_to(frame)
+        return await client.receive_json_from()
+
+    def record(self, product_id, current_stock=2, **extra):
+        alert = alert_message(product_id, current_stock, category_id=product_id * 10, supplier_ids=[], **extra)
+        event, = alert_stream.get_stock_alert_history().record([alert])
+        return alert, event
+
+    async def publish(self, product_id, current_stock=2, **extra):
+        alert, event = self.record(product_id, current_stock, **extra)
+        await publish_stock_alert(get_channel_layer(), alert, event)
+        return event['event_id']
+
+    async def receive_alert(self, client):
+        frame = await client.receive_json_from()
+        self.assertEqual(frame['type'], 'stock_alert')
+        return frame
+
+    async def test_filters_only_receive_matching_alerts(self):
+        client = await self.connect()
+        reply = await self.request(client, {'type': 'subscribe', 'product_ids': [1], 'category_ids': [30]})
+        self.assertEqual((reply['all'], reply['subscriptions']), (False, 2))
+
+        await self.publish(2)
+        await self.publish(3)
+        await self.publish(1)
+        self.assertEqual((await self.receive_alert(client))['data']['product_id'], 3)
+        self.assertEqual((await self.receive_alert(client))['data']['product_id'], 1)
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    async def test_alert_matching_several_filters_is_delivered_once(self):
+        client = await self.connect()
+        await self.request(client, {'type': 'subscribe', 'product_ids': [1], 'severities': ['critical']})
+        await self.publish(1, current_stock=0)
+        await self.receive_alert(client)
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    async def test_firehose_with_filters_is_delivered_once(self):
+        client = await self.connect()
+        await self.request(client, {'type': 'subscribe', 'product_ids': [1]})
+        reply = await self.request(client, {'type': 'subscribe', 'all': True})
+        self.assertTrue(reply['all'])
+
+        await self.publish(1)
+        await self.publish(2)
+        self.assertEqual((await self.receive_alert(client))['data']['product_id'], 1)
+        self.assertEqual((await self.receive_alert(client))['data']['product_id'], 2)
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    async def test_unsubscribe_all_stops_delivery(self):
+        client = await self.connect()
+        await self.request(client, {'type': 'subscribe', 'product_ids': [1]})
+        await self.request(client, {'type': 'unsubscribe', 'all': True})
+        await self.publish(1)
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    async def test_invalid_filters_are_reported(self):
+        client = await self.connect()
+        reply = await self.request(client, {'type': 'subscribe', 'severities': ['URGENT']})
+        self.assertEqual(reply, {'type': 'error', 'message': "Unknown severity 'URGENT'"})
+        reply = await self.request(client, {'type': 'subscribe', 'product_ids': 5, 'product_id': 1})
+        self.assertEqual(reply, {'type': 'error', 'message': "'product_ids' must be a list"})
+        await client.disconnect()
+
+    @override_settings(STOCK_ALERT_BATCH_MAX_WINDOW_MS=200)
+    async def test_batch_window_is_capped(self):
+        client = await self.connect('snapshot=0&batch_window_ms=60000')
+        self.assertEqual(self.established['batch_window_ms'], 200)
+        await client.disconnect()
+
+    async def test_batch_window_supersedes_alerts_for_the_same_sku(self):
+        client = await self.connect('snapshot=0&batch_window_ms=50')
+        self.assertEqual(self.established['batch_window_ms'], 50)
+        await self.publish(1, current_stock=4)
+        await self.publish(1, current_stock=1)
+        await self.publish(2)
+
+        frame = await client.receive_json_from(timeout=1)
+        self.assertEqual((frame['type'], frame['superseded']), ('stock_alert_batch', 1))
+        self.assertEqual(
+            [(alert['data']['product_id'], alert['data']['current_stock']) for alert in frame['alerts']],
+            [(1, 1), (2, 2)],
+        )
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    @override_settings(STOCK_ALERT_BATCH_MAX_SIZE=2)
+    async def test_full_batch_is_flushed_before_the_window_ends(self):
+        client = await self.connect('snapshot=0&batch_window_ms=5000')
+        for product_id in (1, 2, 3):
+            await self.publish(product_id)
+
+        frame = await client.receive_json_from(timeout=0.5)
+        self.assertEqual([alert['data']['product_id'] for alert in frame['alerts']], [1, 2])
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    async def test_reconnect_replays_missed_alerts(self):
+        last_seen = self.record(1)[1]['event_id']
+        self.record(2)
+        self.record(3)
+        client = await self.connect(f'last_event_id={last_seen}')
+        self.assertEqual((await self.receive_alert(client))['data']['product_id'], 2)
+        self.assertEqual((await self.receive_alert(client))['data']['product_id'], 3)
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    @override_settings(STOCK_ALERT_HISTORY_SIZE=2)
+    async def test_evicted_gap_falls_back_to_snapshot(self):
+        for product_id in (1, 2, 3, 4):
+            latest = self.record(product_id)[1]['event_id']
+        client = await self.connect('last_event_id=0')
+        frame = await client.receive_json_from()
+        self.assertEqual((frame['type'], frame['event_id']), ('stock_snapshot', latest))
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    async def test_connect_without_last_event_id_sends_a_snapshot(self):
+        index = low_stock_index.get_low_stock_index()
+        for product_id, current_stock in ((1, 4), (2, 0)):
+            product = Product(id=product_id, sku=f'W-{product_id}', name='Widget', current_stock=current_stock, low_stock_threshold=5)
+            index.update(low_stock_index.low_stock_entry(product))
+        latest = self.record(3)[1]['event_id']
+
+        client = await self.connect('')
+        frame = await client.receive_json_from()
+        self.assertEqual((frame['type'], frame['event_id']), ('stock_snapshot', latest))
+        self.assertEqual([(entry['product_id'], entry['current_stock']) for entry in frame['products']], [(2, 0), (1, 4)])
+        self.assertTrue(await client.receive_nothing())
+        await client.disconnect()
+
+    async def test_resume_message_replays_only_subscribed_alerts(self):
+        client = await self.connect()
+        await self.request(client, {'type': 'subscribe', 'product_ids': [1]})
+        for product_id in (1, 2, 1):
+            self.record(product_id)
+        await client.send_json_to({'type': 'resume', 'last_event_id': 0})
+        self.assertEqual((await self.receive_alert(client))['data']['product_id'], 1)
+        self.assertEqual((await self.receive_alert(client))['data']['product_id'], 1)
+        self.assertTrue(await client.receive_nothing())
+
+        reply = await self.request(client, {'type': 'resume', 'last_event_id': 'latest'})
+        self.assertEqual(reply, {'type': 'error', 'message': "'last_event_id' must be an integer"})
+        await client.disconnect()
+
+
+@override_settings(
+    STOCK_ALERT_CACHE='default', STOCK_ALERT_USE_OUTBOX=True,
+    STOCK_ALERT_LOW_STOCK_INDEX={'BACKEND': 'apps.inventory.low_stock_index.InProcessLowStockIndex'},
+)
+class StockAlertSupplierRoutingTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.product = Product.objects.create(sku='W-1', name='Widget', current_stock=50, low_stock_threshold=10)
+        for code in ('S1', 'S2'):
+            ProductSupplier.objects.create(
+                product=self.product, supplier=Supplier.objects.create(name=code, code=code), unit_cost=1,
+            )
+
+    def test_low_stock_save_does_not_read_suppliers(self):
+        self.product.current_stock = 3
+        with CaptureQueriesContext(connection) as queries:
+            self.product.save(update_fields=['current_stock'])
+        self.assertFalse([q for q in queries if ProductSupplier._meta.db_table in q['sql']])
+        self.assertIsNone(OutboxEvent.objects.get().payload['supplier_ids'])
+
+    def test_consumer_resolves_supplier_ids_per_batch(self):
+        with mock.patch('apps.inventory.kafka_consumer.get_alert_transport'), \
+                mock.patch('apps.inventory.kafka_consumer.AlertRetryRouter'):
+            consumer = StockAlertConsumer()
+        alerts = [alert_message(self.product.id), alert_message(999), alert_message(5, supplier_ids=[7])]
+        with self.assertNumQueries(1):
+            consumer._resolve_supplier_ids(alerts)
+        self.assertEqual(sorted(alerts[0]['supplier_ids']), list(self.product.suppliers.values_list('supplier_id', flat=True)))
+        self.assertEqual(alerts[1]['supplier_ids'], [])
+        self.assertEqual(alerts[2]['supplier_ids'], [7])
+
+
+class OutboundQueueTests(SimpleTestCase):
+    class Socket:
+        channel_name = 'test'
+
+        def __init__(self):
+            self.sent = []
+
+        async def send(self, text_data):
+            self.sent.append(text_data)
+
+    async def test_coalesce_only_replaces_frames_on_overflow(self):
+        queue = OutboundQueue(self.Socket(), maxsize=3, policy=COALESCE)
+        queue.put('a1', key='A')
+        queue.put('a2', key='A')
+        queue.put('b1', key='B')
+        self.assertEqual([frame for frame, _, _ in queue.frames.values()], ['a1', 'a2', 'b1'])
+
+        queue.put('a3', key='A')
+        self.assertEqual([frame for frame, _, _ in queue.frames.values()], ['a1', 'b1', 'a3'])
+        queue.put('c1', key='C')
+        self.assertEqual([frame for frame, _, _ in queue.frames.values()], ['b1', 'a3', 'c1'])
+        self.assertEqual(queue.dropped, 1)
+        queue.close()
+
+    async def test_failed_send_closes_the_connection(self):
+        socket = self.Socket()
+        socket.send = mock.AsyncMock(side_effect=RuntimeError('socket closed'))
+        socket.close = mock.AsyncMock()
+        before = outbound_metrics()['send_failures']
+        queue = OutboundQueue(socket, maxsize=10)
+        queue.put('a')
+        queue.put('b')
+        await asyncio.wait_for(queue.writer, timeout=1)
+
+        socket.close.assert_awaited_once()
+        self.assertTrue(queue.closed)
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(outbound_metrics()['send_failures'], before + 1)
+        queue.put('c')
+        self.assertEqual(len(queue), 0)
+        queue.close()
+
+    async def test_close_does_not_count_queued_frames_as_dropped(self):
+        before = outbound_metrics()
+        queue = OutboundQueue(self.Socket(), maxsize=10)
+        queue.put('a')
+        queue.put('b')
+        queue.close()
+        after = outbound_metrics()
+        self.assertEqual(after['frames_dropped'], before['frames_dropped'])
+        self.assertEqual(after['frames_discarded_on_close'], before['frames_discarded_on_close'] + 2)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    STOCK_ALERT_CACHE='default',
+)
+class StockAlertConsumerBatchTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        alert_stream._history = None
+        self.addCleanup(setattr, alert_stream, '_history', None)
+        with mock.patch('apps.inventory.kafka_consumer.get_alert_transport'), \
+                mock.patch('apps.inventory.kafka_consumer.AlertRetryRouter'):
+            self.consumer = StockAlertConsumer()
+
+    def records(self, *alerts):
+        return [
+            ConsumerRecord('stock-alerts', 0, offset, 0, str(alert['product_id']), alert)
+            for offset, alert in enumerate(alerts)
+        ]
+
+    def test_failed_retry_publish_does_not_fail_the_batch(self):
+        failing, healthy = alert_message(1, supplier_ids=[]), alert_message(2, supplier_ids=[])
+        self.consumer.retry.route_failure.side_effect = ConnectionError('retry topic down')
+        suggestion = mock.Mock(side_effect=lambda alert: self.fail_for(alert, 1))
+        with mock.patch.object(self.consumer, '_generate_purchase_suggestion', suggestion):
+            self.consumer.process_batch(self.records(failing, healthy))
+
+        self.consumer.retry.route_failure.assert_called_once()
+        self.assertEqual(self.consumer.processed.filter_new([failing, healthy]), [failing])
+
+    def test_alerts_without_a_channel_layer_go_to_retry(self):
+        alerts = [alert_message(1, supplier_ids=[]), alert_message(2, supplier_ids=[])]
+        self.consumer.channel_layer = None
+        with mock.patch.object(self.consumer, '_generate_purchase_suggestion', return_value=None):
+            self.consumer.process_batch(self.records(*alerts))
+
+        self.assertEqual([call.args[0] for call in self.consumer.retry.route_failure.call_args_list], alerts)
+        self.assertEqual(self.consumer.processed.filter_new(alerts), alerts)
+
+    @staticmethod
+    def fail_for(alert, product_id):
+        if alert['product_id'] == product_id:
+            raise ValueError('supplier lookup failed')
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    STOCK_ALERT_CACHE='default',
+    STOCK_ALERT_LOW_STOCK_INDEX={'BACKEND': 'apps.inventory.low_stock_index.InProcessLowStockIndex'},
+)
+class StockTickerTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        for module, name in ((ticker, '_ticker'), (low_stock_index, '_index')):
+            setattr(module, name, None)
+            self.addCleanup(setattr, module, name, None)
+        self.product = Product.objects.create(sku='W-1', name='Widget', current_stock=10, low_stock_threshold=5)
+
+    def test_stock_changes_publish_deltas(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(ticker_group(self.product.id), channel)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService.increase_stock(self.product.id, 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService.decrease_stock(self.product.id, 3)
+        get_stock_tick_dispatcher().queue.join()
+
+        frames = [json.loads(async_to_sync(layer.receive)(channel)['frame']) for _ in range(2)]
+        self.assertEqual(frames, [['d', self.product.id, 15, 1], ['d', self.product.id, 12, 2]])
+
+    def test_keyframe_reads_expired_levels_with_their_current_seq(self):
+        other = Product.objects.create(sku='W-2', name='Gadget', current_stock=4, low_stock_threshold=5)
+        stock_ticker = get_stock_ticker()
+        stock_ticker.publish(self.product.id, 9)
+        stock_ticker.publish(other.id, 3)
+        caches['default'].delete(stock_ticker._last_key(self.product.id))
+
+        frame = json.loads(stock_ticker.keyframe([self.product.id, other.id, 999]))
+        self.assertEqual(frame, ['k', [[self.product.id, 10, 1], [other.id, 3, 1]]])
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    STOCK_ALERT_CACHE='default',
+)
+class StockTickerWebSocketTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        ticker._ticker = None
+        self.addCleanup(setattr, ticker, '_ticker', None)
+        # Cached levels keep the keyframes off the database
+        get_stock_ticker().publish(1, 5)
+        get_stock_ticker().publish(2, 8)
+
+    async def test_watch_and_unwatch(self):
+        client = WebsocketCommunicator(StockTickerWebSocketConsumer.as_asgi(), '/ws/stock-ticker/')
+        connected, _ = await client.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await client.receive_json_from())['type'], 'connection_established')
+
+        await client.send_json_to({'type': 'watch', 'product_ids': [1, 2]})
+        self.assertEqual(await client.receive_json_from(), {'type': 'watching', 'products': 2})
+        self.assertEqual(await client.receive_json_from(), ['k', [[1, 5, 1], [2, 8, 1]]])
+
+        await sync_to_async(get_stock_ticker().publish)(1, 4)
+        self.assertEqual(await client.receive_json_from(), ['d', 1, 4, 2])
+
+        await client.send_json_to({'type': 'unwatch', 'product_ids': [1]})
+        self.assertEqual(await client.receive_json_from(), {'type': 'watching', 'products': 1})
+        await sync_to_async(get_stock_ticker().publish)(1, 3)
+        self.assertTrue(await client.receive_nothing())
+
+        await client.send_json_to({'type': 'watch', 'product_ids': 1})
+        self.assertEqual(await client.receive_json_from(), {'type': 'error', 'message': "'product_ids' must be a list"})
+        await client.disconnect()
+
+
+class InMemoryConsumerTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = InMemoryBroker(default_partitions=2)
+        producer = InMemoryProducer(self.broker, key_serializer=lambda k: str(k).encode())
+        self.partitions = [TopicPartition('stock-alerts', p) for p in (0, 1)]
+        self.keys = {}
+        for key in range(20):
+            partition = producer.send('stock-alerts', key=key, value=key).get().partition
+            self.keys.setdefault(partition, key)
+
+    def test_polls_rotate_between_partitions(self):
+        busy, quiet = self.partitions
+        producer = InMemoryProducer(self.broker, key_serializer=lambda k: str(k).encode())
+        for _ in range(50):
+            producer.send('stock-alerts', key=self.keys[busy.partition], value='busy')
+        consumer = InMemoryConsumer(self.broker, auto_offset_reset='earliest')
+        consumer.assign(self.partitions)
+
+        seen = set()
+        for _ in range(2):
+            seen |= set(consumer.poll(max_records=5))
+        self.assertEqual(seen, set(self.partitions))
+
+    def test_close_commits_positions_with_auto_commit(self):
+        consumer = InMemoryConsumer(self.broker, group_id='g', auto_offset_reset='earliest')
+        consumer.assign(self.partitions)
+        consumer.poll(max_records=1000, timeout_ms=0)
+        consumer.seek(self.partitions[0], 1)
+        consumer.close()
+        self.assertEqual(self.broker.committed[('g', self.partitions[0])], 1)
+
+        manual = InMemoryConsumer(self.broker, group_id='h', auto_offset_reset='earliest', enable_auto_commit=False)
+        manual.assign(self.partitions)
+        manual.poll(max_records=1000, timeout_ms=0)
+        manual.close()
+        self.assertNotIn(('h', self.partitions[0]), self.broker.committed)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    STOCK_ALERT_TRANSPORT={'BACKEND': 'apps.inventory.transports.InMemoryTransport', 'OPTIONS': {'partitions': 1}},
+    STOCK_ALERT_CACHE='default', STOCK_ALERT_USE_OUTBOX=True, KAFKA_CONSUMER_AUTO_OFFSET_RESET='earliest',
+    STOCK_ALERT_LOW_STOCK_INDEX={'BACKEND': 'apps.inventory.low_stock_index.InProcessLowStockIndex'},
+)
+class AlertPipelineEndToEndTests(TestCase):
+    """Product save -> outbox -> in-memory broker -> consumer -> WebSocket"""
+
+    def setUp(self):
+        caches['default'].clear()
+        for module, name in (
+            (transports, '_transport'), (transports, '_broker'), (kafka_producer, '_producer'),
+            (alert_stream, '_history'), (low_stock_index, '_index'),
+        ):
+            setattr(module, name, None)
+            self.addCleanup(setattr, module, name, None)
+        self.product = Product.objects.create(sku='W-1', name='Widget', current_stock=50, low_stock_threshold=10)
+
+    def save_low_stock(self):
+        self.product.current_stock = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+
+    def consume_one_batch(self):
+        consumer = StockAlertConsumer()
+        records = consumer.consumer.poll(timeout_ms=1000, max_records=consumer.batch_size)
+        consumer.process_batch([message for batch in records.values() for message in batch])
+        consumer.consumer.close()
+
+    async def test_low_stock_save_reaches_websocket(self):
+        client = WebsocketCommunicator(StockAlertWebSocketConsumer.as_asgi(), '/ws/stock-alerts/?snapshot=0')
+        connected, _ = await client.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await client.receive_json_from())['type'], 'connection_established')
+
+        await database_sync_to_async(self.save_low_stock)()
+        self.assertEqual(await database_sync_to_async(OutboxRelay(batch_size=10).relay_batch)(), 1)
+        await database_sync_to_async(self.consume_one_batch)()
+
+        frame = await client.receive_json_from()
+        self.assertEqual(frame['type'], 'stock_alert')
+        self.assertEqual((frame['data']['sku'], frame['data']['current_stock']), ('W-1', 3))
+        await client.disconnect()
+
+
+@override_settings(STOCK_ALERT_CACHE='default')
+class PooledStockAlertConsumerTests(SimpleTestCase):
+    def setUp(self):
+        with mock.patch('apps.inventory.kafka_consumer.get_alert_transport'), \
+                mock.patch('apps.inventory.kafka_consumer.AlertRetryRouter'):
+            self.pool = PooledStockAlertConsumer(workers=1, queue_size=1)
+        self.pool.queues = [queue.Queue(maxsize=1)]
+        self.tp = TopicPartition('stock-alerts', 0)
+
+    def record(self, offset):
+        return ConsumerRecord('stock-alerts', 0, offset, 0, str(offset), alert_message(offset))
+
+    def test_full_worker_queue_pauses_the_partition_instead_of_blocking(self):
+        for offset in (1, 2, 3):
+            self.pool._route(self.tp, self.record(offset))
+        self.pool.consumer.pause.assert_called_once_with(self.tp)
+        self.assertEqual([m.offset for m in self.pool.backlog[self.tp]], [2, 3])
+
+        self.pool._drain_backlog()
+        self.assertEqual(len(self.pool.backlog[self.tp]), 2)
+        self.pool.consumer.resume.assert_not_called()
+
+        drained = []
+        for _ in range(3):
+            drained.append(self.pool.queues[0].get_nowait()[1].offset)
+            self.pool._drain_backlog()
+        self.assertEqual(drained, [1, 2, 3])
+        self.assertNotIn(self.tp, self.pool.backlog)
+        self.pool.consumer.resume.assert_called_once_with(self.tp)
+
+
+@override_settings(STOCK_ALERT_CACHE='default', STOCK_ALERT_HISTORY_IN_FLIGHT=2)
+class StockAlertHistoryTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.history = alert_stream.StockAlertHistory()
+
+    def test_events_still_being_written_are_not_evicted(self):
+        stored = self.history.record([alert_message(1, supplier_ids=[]), alert_message(2, supplier_ids=[])])
+        # Another consumer reserved the next id and has not stored its event yet
+        self.history._reserve(1)
+        entries, latest = self.history.since(0)
+        self.assertEqual([entry['event'] for entry in entries], stored)
+        self.assertEqual(latest, 2)
+
+    def test_missing_events_outside_the_in_flight_window_are_evicted(self):
+        self.history.record([alert_message(product_id, supplier_ids=[]) for product_id in (1, 2, 3, 4)])
+        caches['default'].delete(self.history._key(1))
+        self.assertEqual(self.history.since(0), (None, 4))
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    STOCK_ALERT_CACHE='default',
+    STOCK_ALERT_LOW_STOCK_INDEX={'BACKEND': 'apps.inventory.low_stock_index.InProcessLowStockIndex'},
+)
+class StockAlertSSETests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        for module, name in ((alert_stream, '_history'), (low_stock_index, '_index')):
+            setattr(module, name, None)
+            self.addCleanup(setattr, module, name, None)
+
+    async def open(self, query='snapshot=0', headers=()):
+        self.stream = ApplicationCommunicator(StockAlertSSEConsumer.as_asgi(), {
+            'type': 'http', 'method': 'GET', 'path': '/sse/stock-alerts/',
+            'query_string': query.encode(), 'headers': list(headers),
+        })
+        await self.stream.send_input({'type': 'http.request', 'body': b''})
+        return await self.stream.receive_output(1)
+
+    async def close(self):
+        await self.stream.send_input({'type': 'http.disconnect'})
+        await self.stream.wait(1)
+
+    async def read_event(self):
+        body = (await self.stream.receive_output(1))['body'].decode()
+        fields = dict(line.split(': ', 1) for line in body.strip().splitlines())
+        return fields.get('id'), fields.get('event'), json.loads(fields['data'])
+
+    def record(self, product_id):
+        alert = alert_message(product_id, category_id=product_id * 10, supplier_ids=[])
+        event, = alert_stream.get_stock_alert_history().record([alert])
+        return alert, event
+
+    async def test_stream_headers(self):
+        start = await self.open()
+        self.assertEqual(start['status'], 200)
+        headers = dict(start['headers'])
+        self.assertEqual(headers[b'Content-Type'], b'text/event-stream')
+        self.assertEqual(headers[b'Cache-Control'], b'no-cache')
+        self.assertEqual(headers[b'X-Accel-Buffering'], b'no')
+        self.assertEqual((await self.stream.receive_output(1))['body'], b': connected\n\n')
+        await self.close()
+
+    async def test_filtered_alerts_are_streamed(self):
+        await self.open('snapshot=0&product_ids=1')
+        await self.stream.receive_output(1)
+        for product_id in (2, 1):
+            await publish_stock_alert(get_channel_layer(), *await sync_to_async(self.record)(product_id))
+
+        event_id, event, data = await self.read_event()
+        self.assertEqual((event_id, event, data['data']['product_id']), ('2', 'stock_alert', 1))
+        self.assertTrue(await self.stream.receive_nothing())
+        await self.close()
+
+    async def test_last_event_id_header_resumes_the_stream(self):
+        last_seen = (await sync_to_async(self.record)(1))[1]['event_id']
+        await sync_to_async(self.record)(2)
+        await sync_to_async(self.record)(3)
+        await self.open('', headers=[(b'last-event-id', str(last_seen).encode())])
+        await self.stream.receive_output(1)
+
+        replayed = [(await self.read_event())[2]['data']['product_id'] for _ in range(2)]
+        self.assertEqual(replayed, [2, 3])
+        self.assertTrue(await self.stream.receive_nothing())
+        await self.close()
+
+    async def test_invalid_severity_is_rejected(self):
+        start = await self.open('severities=URGENT')
+        self.assertEqual(start['status'], 400)
+        body = await self.stream.receive_output(1)
+        self.assertEqual(json.loads(body['body']), {'error': "Unknown severity 'URGENT'"})
+
+
+class FakePubSub:
+    """Stand-in for redis.asyncio's PubSub, fed by the test"""
+
+    def __init__(self):
+        self.channels = set()
+        self.messages = asyncio.Queue()
+
+    @property
+    def subscribed(self):
+        return bool(self.channels)
+
+    async def subscribe(self, name):
+        self.channels.add(name)
+
+    async def unsubscribe(self, name):
+        self.channels.discard(name)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def reset(self):
+        self.channels.clear()
+
+
+class BroadcastRedisChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        self.pubsub = FakePubSub()
+        redis = mock.Mock()
+        redis.pubsub.return_value = self.pubsub
+        # Regular (per-channel) messages, handed out by the patched RedisChannelLayer.receive
+        self.regular = {}
+        self.regular_receives = 0
+
+        async def regular_receive(layer, channel):
+            self.regular_receives += 1
+            return await self.regular.setdefault(channel, asyncio.Queue()).get()
+
+        for patcher in (
+            mock.patch.object(channel_layers.aioredis, 'Redis', return_value=redis),
+            mock.patch.object(channel_layers, 'create_pool'),
+            mock.patch.object(channel_layers, '_close_redis', mock.AsyncMock()),
+            mock.patch.object(RedisChannelLayer, 'receive', regular_receive),
+            mock.patch.object(RedisChannelLayer, 'flush', mock.AsyncMock()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.layer = BroadcastRedisChannelLayer(hosts=['redis://localhost:6379'], broadcast_groups=['stock_alerts'])
+
+    async def broadcast(self, message):
+        await self.pubsub.messages.put({
+            'channel': self.layer._broadcast_channel('stock_alerts').encode(),
+            'data': self.layer.serialize(message),
+        })
+
+    async def test_broadcast_is_deserialised_once_for_all_local_members(self):
+        channels = [await self.layer.new_channel() for _ in range(2)]
+        for channel in channels:
+            await self.layer.group_add('stock_alerts', channel)
+        self.assertEqual(self.pubsub.channels, {self.layer._broadcast_channel('stock_alerts')})
+
+        with mock.patch.object(self.layer, 'deserialize', wraps=self.layer.deserialize) as deserialize:
+            await self.broadcast({'type': 'stock.alert', 'n': 1})
+            received = [await asyncio.wait_for(self.layer.receive(channel), 1) for channel in channels]
+        self.assertEqual(received, [{'type': 'stock.alert', 'n': 1}] * 2)
+        deserialize.assert_called_once()
+        await self.layer.flush()
+
+    async def test_regular_receive_that_lost_the_race_is_reused(self):
+        channel = await self.layer.new_channel()
+        await self.layer.group_add('stock_alerts', channel)
+        await self.broadcast({'type': 'broadcast'})
+        self.assertEqual(await asyncio.wait_for(self.layer.receive(channel), 1), {'type': 'broadcast'})
+        self.assertIn(channel, self.layer._pending_receives)
+
+        await self.regular.setdefault(channel, asyncio.Queue()).put({'type': 'regular'})
+        self.assertEqual(await asyncio.wait_for(self.layer.receive(channel), 1), {'type': 'regular'})
+        self.assertEqual(self.regular_receives, 1)
+        self.assertNotIn(channel, self.layer._pending_receives)
+        await self.layer.flush()
+
+    async def test_broadcast_tied_with_a_regular_message_is_kept_for_the_next_receive(self):
+        channel = await self.layer.new_channel()
+        inbox = self.layer.broadcast_inbox[channel]
+        regular = self.regular.setdefault(channel, asyncio.Queue())
+        regular.put_nowait({'type': 'regular'})
+        # The broadcast lands while the regular receive completes
+        original_get = inbox.get
+
+        async def get():
+            inbox.put_nowait({'type': 'broadcast'})
+            return await original_get()
+
+        with mock.patch.object(inbox, 'get', get):
+            self.assertEqual(await asyncio.wait_for(self.layer.receive(channel), 1), {'type': 'regular'})
+        self.assertEqual(await asyncio.wait_for(self.layer.receive(channel), 1), {'type': 'broadcast'})
+        await self.layer.flush()
+
+    async def test_flush_drops_subscriptions_and_pending_receives(self):
+        channel = await self.layer.new_channel()
+        await self.layer.group_add('stock_alerts', channel)
+        await self.broadcast({'type': 'broadcast'})
+        await asyncio.wait_for(self.layer.receive(channel), 1)
+        pending = self.layer._pending_receives[channel]
+
+        await self.layer.flush()
+        await asyncio.sleep(0)
+        self.assertTrue(pending.cancelled())
+        self.assertEqual((self.layer.local_groups, self.layer._pending_receives), ({}, {}))
+        self.assertEqual(self.pubsub.channels, set())
+        RedisChannelLayer.flush.assert_awaited()
+
+
+@override_settings(GRAPHQL_COST_BUDGET=None, GRAPHQL_MAX_QUERY_COST=100000)
+class InventoryQueryCountTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            category = Category.objects.create(name=f'Category {i}', slug=f'category-{i}')
+            product = Product.objects.create(sku=f'W-{i}', name=f'Widget {i}', category=category)
+            StockLot.objects.create(product=product, qty=1, unit_cost=1, remaining_qty=1)
+            InventoryTransaction.objects.create(product=product, qty=1, type='IN')
+
+    def query(self, query):
+        response = self.client.post('/api/inventory/graphql/', {'query': query}, content_type='application/json')
+        return response.json()
+
+    def test_stock_lots_load_product_and_category_in_one_query(self):
+        with self.assertNumQueries(1):
+            result = self.query('{ stockLots { product { category { name } } } }')
+        self.assertEqual(len(result['data']['stockLots']), 3)
+
+    def test_transactions_load_product_and_category_in_one_query(self):
+        with self.assertNumQueries(1):
+            result = self.query('{ inventoryTransactions { product { category { name } } } }')
+        self.assertEqual(len(result['data']['inventoryTransactions']), 3)
@@ -0,0 +1,150 @@
+import json
+import logging
+import queue
+import threading
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Frames are compact JSON arrays:
+#   delta     ["d", product_id, qty, seq]
+#   keyframe  ["k", [[product_id, qty, seq], ...]]
+# ``seq`` counts stock changes per product; a client that sees a jump in a
+# product's seq has missed a delta and can rely on the next keyframe.
+
+
+def ticker_group(product_id):
+    return f'stock_ticker_{product_id}'
+
+
+def _compact(frame):
+    return json.dumps(frame, separators=(',', ':'))
+
+
+class StockTicker:
+    """Publishes per-product stock levels to ``stock_ticker_{id}`` groups"""
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'STOCK_ALERT_CACHE', 'default')]
+        self.ttl = getattr(settings, 'STOCK_TICKER_STATE_TTL', 24 * 3600)
+
+    def _seq_key(self, product_id):
+        return f'stock_ticker_seq:{product_id}'
+
+    def _last_key(self, product_id):
+        return f'stock_ticker_last:{product_id}'
+
+    def _next_seq(self, product_id):
+        try:
+            return self.cache.incr(self._seq_key(product_id))
+        except ValueError:
+            self.cache.add(self._seq_key(product_id), 0, timeout=None)
+            return self.cache.incr(self._seq_key(product_id))
+
+    def publish(self, product_id, qty):
+        """Record a product's new stock level and send the delta to its watchers"""
+        try:
+            seq = self._next_seq(product_id)
+            self.cache.set(self._last_key(product_id), (qty, seq), timeout=self.ttl)
+            async_to_sync(get_channel_layer().group_send)(ticker_group(product_id), {
+                'type': 'stock_tick',
+                'product_id': product_id,
+                'frame': _compact(['d', product_id, qty, seq]),
+            })
+        except Exception as e:
+            # The ticker is best effort; watchers catch up on the next keyframe
+            logger.error(f"❌ Failed to publish stock tick for product {product_id}: {e}")
+
+    def keyframe(self, product_ids):
+        """Keyframe with the latest level of each product.
+
+        Products without a cached level (never ticked, or expired) are read
+        from the DB and stamped with their current sequence, so a keyframe
+        never reports a lower seq than the deltas already sent.
+        """
+        from apps.product.models import Product
+
+        found = self.cache.get_many([self._last_key(product_id) for product_id in product_ids])
+        levels = {}
+        missing = []
+        for product_id in product_ids:
+            state = found.get(self._last_key(product_id))
+            if state is None:
+                missing.append(product_id)
+            else:
+                levels[product_id] = state
+        if missing:
+            seqs = self.cache.get_many([self._seq_key(product_id) for product_id in missing])
+            for product_id, qty in Product.objects.filter(id__in=missing).values_list('id', 'current_stock'):
+                levels[product_id] = (qty, seqs.get(self._seq_key(product_id), 0))
+        return _compact(['k', [[product_id, qty, seq] for product_id, (qty, seq) in sorted(levels.items())]])
+
+
+class StockTickDispatcher:
+    """Bounded queue of stock ticks published by a background thread.
+
+    ``InventoryService`` only enqueues from ``on_commit``, so the cache and
+    channel layer round trips never run on the request thread. Ticks are
+    published in order; when the queue is full new ticks are dropped and
+    counted, and watchers catch up on the next keyframe.
+    """
+
+    def __init__(self, maxsize=None):
+        if maxsize is None:
+            maxsize = getattr(settings, 'STOCK_TICKER_QUEUE_SIZE', 10000)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, product_id, qty):
+        """Queue a stock level for publishing; returns False if it had to be dropped"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((product_id, qty))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Stock tick queue full, dropping tick for product {product_id} ({self.dropped} dropped so far)")
+            return False
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stock-tick-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            product_id, qty = self.queue.get()
+            try:
+                get_stock_ticker().publish(product_id, qty)
+            finally:
+                self.queue.task_done()
+
+
+_ticker = None
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_stock_ticker():
+    """Return the shared stock ticker"""
+    global _ticker
+    if _ticker is None:
+        _ticker = StockTicker()
+    return _ticker
+
+
+def get_stock_tick_dispatcher():
+    """Return the process-wide stock tick dispatcher, creating it on first use"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = StockTickDispatcher()
+        return _dispatcher
@@ -0,0 +1,356 @@
+import itertools
+import logging
+import threading
+import time
+import zlib
+from collections import namedtuple
+from django.conf import settings
+from django.utils.module_loading import import_string
+from kafka.structs import TopicPartition
+
+logger = logging.getLogger(__name__)
+
+
+class KafkaTransport:
+    """Alert transport backed by a real Kafka cluster through kafka-python"""
+
+    def __init__(self, bootstrap_servers=None):
+        self.bootstrap_servers = bootstrap_servers or settings.KAFKA_BOOTSTRAP_SERVERS
+
+    def producer(self, **config):
+        from kafka import KafkaProducer
+        return KafkaProducer(bootstrap_servers=self.bootstrap_servers, **config)
+
+    def consumer(self, **config):
+        from kafka import KafkaConsumer
+        return KafkaConsumer(bootstrap_servers=self.bootstrap_servers, **config)
+
+
+RecordMetadata = namedtuple('RecordMetadata', ['topic', 'partition', 'offset', 'timestamp'])
+ConsumerRecord = namedtuple('ConsumerRecord', ['topic', 'partition', 'offset', 'timestamp', 'key', 'value'])
+
+
+class InMemoryFuture:
+    """Already-resolved stand-in for kafka-python's FutureRecordMetadata"""
+
+    def __init__(self, value=None, exception=None):
+        self.value = value
+        self.exception = exception
+
+    def is_done(self):
+        return True
+
+    def succeeded(self):
+        return self.exception is None
+
+    def failed(self):
+        return self.exception is not None
+
+    def add_callback(self, fn, *args, **kwargs):
+        if self.succeeded():
+            fn(*args, self.value, **kwargs)
+        return self
+
+    def add_errback(self, fn, *args, **kwargs):
+        if self.failed():
+            fn(*args, self.exception, **kwargs)
+        return self
+
+    def get(self, timeout=None):
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+
+class InMemoryBroker:
+    """Process-local broker with Kafka's topic/partition/group/offset semantics.
+
+    Topics are created on first use with ``default_partitions`` partitions.
+    Keyed records are partitioned by crc32 of the serialised key, so records
+    for one key stay ordered. Consumers that subscribe with the same
+    ``group_id`` split a topic's partitions between them (round robin,
+    rebalanced whenever a member joins or leaves) and share committed offsets.
+    """
+
+    def __init__(self, default_partitions=4):
+        self.default_partitions = default_partitions
+        self.condition = threading.Condition()
+        self.topics = {}
+        self.committed = {}
+        self.groups = {}
+        self.generation = itertools.count(1)
+        self.round_robin = itertools.count()
+
+    def ensure_topic(self, topic, partitions=None):
+        with self.condition:
+            if topic not in self.topics:
+                self.topics[topic] = [[] for _ in range(partitions or self.default_partitions)]
+            return len(self.topics[topic])
+
+    def append(self, topic, key, value):
+        partitions = self.ensure_topic(topic)
+        with self.condition:
+            if key is None:
+                partition = next(self.round_robin) % partitions
+            else:
+                partition = zlib.crc32(key) % partitions
+            log = self.topics[topic][partition]
+            log.append((key, value, int(time.time() * 1000)))
+            offset = len(log) - 1
+            self.condition.notify_all()
+        return RecordMetadata(topic, partition, offset, log[offset][2])
+
+    def fetch(self, tp, offset, limit):
+        log = self.topics.get(tp.topic, [])[tp.partition]
+        return [(offset + i, *record) for i, record in enumerate(log[offset:offset + limit])]
+
+    def end_offset(self, tp):
+        return len(self.topics[tp.topic][tp.partition])
+
+    def join(self, group_id, member, topics):
+        with self.condition:
+            group = self.groups.setdefault(group_id, {'members': {}, 'generation': 0})
+            group['members'][member] = list(topics)
+            self._rebalance(group)
+
+    def leave(self, group_id, member):
+        with self.condition:
+            group = self.groups.get(group_id)
+            if group and group['members'].pop(member, None) is not None:
+                self._rebalance(group)
+
+    def _rebalance(self, group):
+        for topic in {t for topics in group['members'].values() for t in topics}:
+            self.ensure_topic(topic)
+        group['generation'] = next(self.generation)
+        group['assignment'] = {member: [] for member in group['members']}
+        for topic in sorted({t for topics in group['members'].values() for t in topics}):
+            members = sorted(m for m, topics in group['members'].items() if topic in topics)
+            for partition in range(len(self.topics[topic])):
+                group['assignment'][members[partition % len(members)]].append(TopicPartition(topic, partition))
+        self.condition.notify_all()
+
+    def assignment(self, group_id, member):
+        group = self.groups[group_id]
+        return group['generation'], list(group['assignment'].get(member, []))
+
+
+class InMemoryProducer:
+    """Subset of the KafkaProducer API used by the alert pipeline"""
+
+    def __init__(self, broker, value_serializer=None, key_serializer=None, **config):
+        self.broker = broker
+        self.value_serializer = value_serializer or (lambda v: v)
+        self.key_serializer = key_serializer or (lambda k: k)
+        self.config = config
+
+    def send(self, topic, value=None, key=None):
+        try:
+            key_bytes = self.key_serializer(key) if key is not None else None
+            metadata = self.broker.append(topic, key_bytes, self.value_serializer(value))
+            return InMemoryFuture(value=metadata)
+        except Exception as e:
+            return InMemoryFuture(exception=e)
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+
+class InMemoryConsumer:
+    """Subset of the KafkaConsumer API used by the alert pipeline"""
+
+    def __init__(self, broker, *topics, group_id=None, value_deserializer=None, key_deserializer=None,
+                 auto_offset_reset='latest', enable_auto_commit=True, consumer_timeout_ms=float('inf'), **config):
+        self.broker = broker
+        self.group_id = group_id
+        self.value_deserializer = value_deserializer or (lambda v: v)
+        self.key_deserializer = key_deserializer or (lambda k: k)
+        self.auto_offset_reset = auto_offset_reset
+        self.enable_auto_commit = enable_auto_commit
+        self.consumer_timeout_ms = consumer_timeout_ms
+        self.config = {'bootstrap_servers': 'in-memory', 'group_id': group_id, **config}
+        self.member = f'{group_id}-{id(self)}'
+        self.listener = None
+        self.subscribed = False
+        self.generation = None
+        self.assigned = []
+        self.positions = {}
+        self.paused = set()
+        self.fetch_start = 0
+        if topics:
+            self.subscribe(list(topics))
+
+    def subscribe(self, topics, listener=None):
+        if not self.group_id:
+            raise ValueError("subscribe() requires a group_id")
+        self.listener = listener
+        self.subscribed = True
+        self.broker.join(self.group_id, self.member, topics)
+
+    def assign(self, partitions):
+        self.subscribed = False
+        self.assigned = list(partitions)
+        for tp in self.assigned:
+            self.broker.ensure_topic(tp.topic)
+            self.positions.setdefault(tp, self._reset_position(tp))
+
+    def partitions_for_topic(self, topic):
+        return set(range(self.broker.ensure_topic(topic)))
+
+    def assignment(self):
+        return set(self.assigned)
+
+    def _reset_position(self, tp):
+        committed = self.broker.committed.get((self.group_id, tp)) if self.group_id else None
+        if committed is not None:
+            return committed
+        return 0 if self.auto_offset_reset == 'earliest' else self.broker.end_offset(tp)
+
+    def _sync_assignment(self):
+        if not self.subscribed:
+            return
+        generation, assigned = self.broker.assignment(self.group_id, self.member)
+        if generation == self.generation:
+            return
+        revoked = [tp for tp in self.assigned if tp not in assigned]
+        if self.listener and revoked:
+            self.listener.on_partitions_revoked(revoked)
+        for tp in revoked:
+            self.positions.pop(tp, None)
+            self.paused.discard(tp)
+        self.generation = generation
+        self.assigned = assigned
+        for tp in assigned:
+            self.positions.setdefault(tp, self._reset_position(tp))
+        if self.listener:
+            self.listener.on_partitions_assigned(assigned)
+
+    def poll(self, timeout_ms=0, max_records=None):
+        deadline = time.monotonic() + timeout_ms / 1000
+        max_records = max_records or 500
+        with self.broker.condition:
+            while True:
+                self._sync_assignment()
+                records = self._fetch(max_records)
+                remaining = deadline - time.monotonic()
+                if records or remaining <= 0:
+                    break
+                self.broker.condition.wait(remaining)
+        if records and self.enable_auto_commit and self.group_id:
+            self.commit()
+        return records
+
+    def _fetch(self, max_records):
+        """Fetch up to ``max_records``, starting one partition later on every poll.
+
+        Like Kafka's fetcher this rotates between partitions, so a busy
+        partition cannot starve the others.
+        """
+        records = {}
+        if not self.assigned:
+            return records
+        start = self.fetch_start % len(self.assigned)
+        self.fetch_start = start + 1
+        for tp in self.assigned[start:] + self.assigned[:start]:
+            if max_records <= 0:
+                break
+            if tp in self.paused:
+                continue
+            batch = self.broker.fetch(tp, self.positions[tp], max_records)
+            if not batch:
+                continue
+            records[tp] = [
+                ConsumerRecord(
+                    tp.topic, tp.partition, offset, timestamp,
+                    self.key_deserializer(key) if key is not None else None,
+                    self.value_deserializer(value),
+                )
+                for offset, key, value, timestamp in batch
+            ]
+            self.positions[tp] = batch[-1][0] + 1
+            max_records -= len(batch)
+        return records
+
+    def __iter__(self):
+        while True:
+            records = self.poll(timeout_ms=min(self.consumer_timeout_ms, 1000), max_records=1)
+            if not records:
+                if self.consumer_timeout_ms != float('inf'):
+                    return
+                continue
+            for batch in records.values():
+                yield from batch
+
+    def commit(self, offsets=None):
+        if offsets is None:
+            offsets = {tp: self.positions[tp] for tp in self.assigned}
+        with self.broker.condition:
+            for tp, offset in offsets.items():
+                self.broker.committed[(self.group_id, tp)] = getattr(offset, 'offset', offset)
+
+    def committed(self, tp):
+        return self.broker.committed.get((self.group_id, tp))
+
+    def seek(self, tp, offset):
+        self.positions[tp] = offset
+
+    def seek_to_beginning(self, *partitions):
+        for tp in partitions or self.assigned:
+            self.positions[tp] = 0
+
+    def position(self, tp):
+        return self.positions[tp]
+
+    def pause(self, *partitions):
+        self.paused.update(partitions)
+
+    def resume(self, *partitions):
+        self.paused.difference_update(partitions)
+
+    def paused_partitions(self):
+        return set(self.paused)
+
+    def close(self, autocommit=True):
+        if autocommit and self.enable_auto_commit and self.group_id and self.assigned:
+            self.commit()
+        if self.subscribed:
+            self.broker.leave(self.group_id, self.member)
+            self.subscribed = False
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class InMemoryTransport:
+    """Alert transport backed by a broker living in this process (tests, benchmarks, local runs)"""
+
+    def __init__(self, partitions=4):
+        global _broker
+        with _broker_lock:
+            if _broker is None:
+                _broker = InMemoryBroker(default_partitions=partitions)
+        self.broker = _broker
+
+    def producer(self, **config):
+        return InMemoryProducer(self.broker, **config)
+
+    def consumer(self, *topics, **config):
+        return InMemoryConsumer(self.broker, *topics, **config)
+
+
+_transport = None
+
+
+def get_alert_transport():
+    """Return the transport configured in ``STOCK_ALERT_TRANSPORT``"""
+    global _transport
+    if _transport is None:
+        config = getattr(settings, 'STOCK_ALERT_TRANSPORT', {
+            'BACKEND': 'apps.inventory.transports.KafkaTransport',
+        })
+        _transport = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _transport
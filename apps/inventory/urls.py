@@ -3,6 +3,7 @@ from strawberry.django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 from .schema import schema
 from .test_views import simulate_stock_update, get_low_stock_products
+from .views import websocket_metrics
 
 app_name = 'inventory'
 
@@ -10,4 +11,5 @@ urlpatterns = [
     path('graphql/', csrf_exempt(GraphQLView.as_view(schema=schema)), name='inventory-graphql'),
     path('test/update-stock/', simulate_stock_update, name='test-stock-update'),
     path('test/low-stock/', get_low_stock_products, name='test-low-stock'),
+    path('websocket-metrics/', websocket_metrics, name='websocket-metrics'),
 ]
\ No newline at end of file
@@ -1,3 +1,9 @@
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from .outbound import outbound_metrics
 
-# Create your views here.
+
+@require_http_methods(["GET"])
+def websocket_metrics(request):
+    """WebSocket queue depth and dropped frame counters for this ASGI process"""
+    return JsonResponse(outbound_metrics())
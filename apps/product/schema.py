@@ -4,6 +4,10 @@ from typing import List, Optional
 from decimal import Decimal
 from django.shortcuts import get_object_or_404
 
+from config.dataloaders import get_loaders
+from config.optimizer import optimize
+from config.pagination import Connection, capped_list, paginate
+from config.schema_extensions import SCHEMA_EXTENSIONS
 from .models import Product, Category
 
 
@@ -20,7 +24,6 @@ class ProductType:
     id: auto
     sku: auto
     name: auto
-    category: Optional[CategoryType]
     barcode: Optional[str]
     cost_price: auto
     selling_price: auto
@@ -30,6 +33,10 @@ class ProductType:
     created_at: auto
     updated_at: auto
 
+    @strawberry.field
+    def category(self, info: strawberry.Info) -> Optional[CategoryType]:
+        return get_loaders(info).related(self, 'category')
+
 
 @strawberry.input
 class CategoryInput:
@@ -65,31 +72,53 @@ class ProductUpdateInput:
 @strawberry.type
 class Query:
     @strawberry.field
-    def products(self) -> List[ProductType]:
-        return Product.objects.select_related('category').all()
+    def products(self, info: strawberry.Info) -> List[ProductType]:
+        return get_loaders(info).expect(capped_list(optimize(Product.objects.all(), info), 'name'))
+    
+    @strawberry.field
+    def products_connection(
+        self,
+        info: strawberry.Info,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[ProductType]:
+        return paginate(Product.objects.all(), info, 'name', first, after, last, before)
     
     @strawberry.field
-    def product(self, id: int) -> Optional[ProductType]:
+    def product(self, info: strawberry.Info, id: int) -> Optional[ProductType]:
         try:
-            return Product.objects.select_related('category').get(id=id)
+            return optimize(Product.objects.all(), info).get(id=id)
         except Product.DoesNotExist:
             return None
     
     @strawberry.field
-    def product_by_sku(self, sku: str) -> Optional[ProductType]:
+    def product_by_sku(self, info: strawberry.Info, sku: str) -> Optional[ProductType]:
         try:
-            return Product.objects.select_related('category').get(sku=sku)
+            return optimize(Product.objects.all(), info).get(sku=sku)
         except Product.DoesNotExist:
             return None
     
     @strawberry.field
-    def categories(self) -> List[CategoryType]:
-        return Category.objects.all()
+    def categories(self, info: strawberry.Info) -> List[CategoryType]:
+        return capped_list(optimize(Category.objects.all(), info), 'name')
+    
+    @strawberry.field
+    def categories_connection(
+        self,
+        info: strawberry.Info,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[CategoryType]:
+        return paginate(Category.objects.all(), info, 'name', first, after, last, before)
     
     @strawberry.field
-    def category(self, id: int) -> Optional[CategoryType]:
+    def category(self, info: strawberry.Info, id: int) -> Optional[CategoryType]:
         try:
-            return Category.objects.get(id=id)
+            return optimize(Category.objects.all(), info).get(id=id)
         except Category.DoesNotExist:
             return None
 
@@ -165,4 +194,4 @@ class Mutation:
             return False
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=SCHEMA_EXTENSIONS)
\ No newline at end of file
@@ -1,3 +1,83 @@
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from config.persisted_queries import query_hash
+
+from apps.product.models import Product
+
+
+@override_settings(DEBUG=True)
+class ProductGraphQLTests(TestCase):
+    def query(self, query, path='/api/products/graphql/'):
+        response = self.client.post(path, {'query': query}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_per_app_endpoint_optimizes_querysets(self):
+        Product.objects.create(sku='W-1', name='Widget', current_stock=5, low_stock_threshold=10)
+        result = self.query('{ products { sku } }')
+        self.assertEqual(result['data']['products'], [{'sku': 'W-1'}])
+        self.assertTrue(result['extensions']['optimizer']['querysets'])
+
+    def page(self, arguments):
+        result = self.query(
+            f'{{ productsConnection({arguments}) {{ edges {{ node {{ sku }} }} '
+            'pageInfo { hasNextPage hasPreviousPage startCursor endCursor } } }'
+        )
+        connection = result['data']['productsConnection']
+        return [edge['node']['sku'] for edge in connection['edges']], connection['pageInfo']
+
+    def test_keyset_cursors_page_forward_and_backward(self):
+        for sku, name in (('A', 'Anvil'), ('B1', 'Bolt'), ('B2', 'Bolt'), ('C', 'Crate'), ('D', 'Drill')):
+            Product.objects.create(sku=sku, name=name, current_stock=5, low_stock_threshold=10)
+
+        skus, info = self.page('first: 2')
+        self.assertEqual((skus, info['hasNextPage']), (['A', 'B1'], True))
+        skus, info = self.page(f'first: 2, after: "{info["endCursor"]}"')
+        self.assertEqual((skus, info['hasNextPage'], info['hasPreviousPage']), (['B2', 'C'], True, True))
+        skus, info = self.page(f'first: 2, after: "{info["endCursor"]}"')
+        self.assertEqual((skus, info['hasNextPage']), (['D'], False))
+
+        skus, info = self.page('last: 2')
+        self.assertEqual((skus, info['hasPreviousPage']), (['C', 'D'], True))
+        skus, info = self.page(f'last: 2, before: "{info["startCursor"]}"')
+        self.assertEqual((skus, info['hasPreviousPage'], info['hasNextPage']), (['B1', 'B2'], True, True))
+        skus, info = self.page(f'last: 2, before: "{info["startCursor"]}"')
+        self.assertEqual((skus, info['hasPreviousPage']), (['A'], False))
+
+    def test_invalid_cursor_is_rejected(self):
+        result = self.query('{ productsConnection(after: "not-a-cursor") { edges { cursor } } }')
+        self.assertIn("Invalid cursor", result['errors'][0]['message'])
+
+
+@override_settings(GRAPHQL_PERSISTED_QUERY_CACHE='default')
+class PersistedQueryTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def post(self, sha256, query=None, path='/api/products/graphql/'):
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha256}}}
+        if query is not None:
+            body['query'] = query
+        response = self.client.post(path, body, content_type='application/json')
+        return response.json()
+
+    def error_code(self, result):
+        return result['errors'][0]['extensions']['code']
+
+    def test_unknown_hash_asks_for_the_query(self):
+        result = self.post(query_hash('{ products { id name } }'))
+        self.assertEqual(self.error_code(result), 'PERSISTED_QUERY_NOT_FOUND')
+
+    def test_hash_must_match_the_query(self):
+        result = self.post(query_hash('{ products { id } }'), '{ products { sku } }')
+        self.assertEqual(self.error_code(result), 'PERSISTED_QUERY_HASH_MISMATCH')
+
+    def test_registered_query_runs_from_its_hash(self):
+        Product.objects.create(sku='W-1', name='Widget', current_stock=5, low_stock_threshold=10)
+        query = '{ products { sku currentStock } }'
+        self.assertEqual(self.post(query_hash(query), query)['data'], {'products': [{'sku': 'W-1', 'currentStock': 5}]})
+
+        for path in ('/api/products/graphql/', '/graphql/'):
+            result = self.post(query_hash(query), path=path)
+            self.assertEqual(result['data'], {'products': [{'sku': 'W-1', 'currentStock': 5}]})
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchase', '0002_purchaseordersuggestion_productsupplier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseordersuggestion',
+            name='source_event_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
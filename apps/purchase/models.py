@@ -68,6 +68,7 @@ class PurchaseOrderSuggestion(models.Model):
     unit_cost = models.DecimalField(max_digits=14, decimal_places=2)
     total_cost = models.DecimalField(max_digits=16, decimal_places=2)
     reason = models.TextField()  # Why this suggestion was made
+    source_event_id = models.CharField(max_length=64, unique=True, null=True, blank=True)  # idempotency key of the stock alert
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
     created_at = models.DateTimeField(auto_now_add=True)
     reviewed_at = models.DateTimeField(null=True, blank=True)
@@ -7,45 +7,62 @@ from .models import Purchase, PurchaseItem, PurchaseOrderSuggestion, ProductSupp
 from .services import PurchaseOrderSuggestionService
 from apps.supplier.schema import SupplierType
 from apps.product.schema import ProductType
+from config.dataloaders import get_loaders
+from config.optimizer import optimize
+from config.pagination import Connection, capped_list, max_page_size, paginate
+from config.schema_extensions import SCHEMA_EXTENSIONS
 
 
 @strawberry.django.type(PurchaseItem)
 class PurchaseItemType:
     id: auto
-    product: ProductType
     qty: auto
     unit_cost: auto
     line_total: auto
 
+    @strawberry.field
+    def product(self, info: strawberry.Info) -> ProductType:
+        return get_loaders(info).related(self, 'product')
+
 
 @strawberry.django.type(Purchase)
 class PurchaseType:
     id: auto
-    supplier: SupplierType
     invoice_no: Optional[str]
     total_amount: auto
     status: auto
     created_at: auto
-    items: List[PurchaseItemType]
+
+    @strawberry.field
+    def supplier(self, info: strawberry.Info) -> SupplierType:
+        return get_loaders(info).related(self, 'supplier')
+
+    @strawberry.field
+    def items(self, info: strawberry.Info) -> List[PurchaseItemType]:
+        return get_loaders(info).items(self)
 
 
 @strawberry.django.type(ProductSupplier)
 class ProductSupplierType:
     id: auto
-    product: ProductType
-    supplier: SupplierType
     unit_cost: auto
     minimum_order_qty: auto
     lead_time_days: auto
     is_preferred: auto
     created_at: auto
 
+    @strawberry.field
+    def product(self, info: strawberry.Info) -> ProductType:
+        return get_loaders(info).related(self, 'product')
+
+    @strawberry.field
+    def supplier(self, info: strawberry.Info) -> SupplierType:
+        return get_loaders(info).related(self, 'supplier')
+
 
 @strawberry.django.type(PurchaseOrderSuggestion)
 class PurchaseOrderSuggestionType:
     id: auto
-    product: ProductType
-    supplier: SupplierType
     suggested_qty: auto
     unit_cost: auto
     total_cost: auto
@@ -54,6 +71,14 @@ class PurchaseOrderSuggestionType:
     created_at: auto
     reviewed_at: Optional[datetime]
 
+    @strawberry.field
+    def product(self, info: strawberry.Info) -> ProductType:
+        return get_loaders(info).related(self, 'product')
+
+    @strawberry.field
+    def supplier(self, info: strawberry.Info) -> SupplierType:
+        return get_loaders(info).related(self, 'supplier')
+
 
 @strawberry.input
 class PurchaseItemInput:
@@ -97,26 +122,38 @@ class PurchaseSuggestionsResponse:
 @strawberry.type
 class Query:
     @strawberry.field
-    def purchases(self) -> List[PurchaseType]:
-        return Purchase.objects.select_related('supplier').prefetch_related('items__product').all()
+    def purchases(self, info: strawberry.Info) -> List[PurchaseType]:
+        return get_loaders(info).expect(capped_list(optimize(Purchase.objects.all(), info), '-created_at'))
     
     @strawberry.field
-    def purchase(self, id: int) -> Optional[PurchaseType]:
+    def purchases_connection(
+        self,
+        info: strawberry.Info,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[PurchaseType]:
+        return paginate(Purchase.objects.all(), info, '-created_at', first, after, last, before)
+    
+    @strawberry.field
+    def purchase(self, info: strawberry.Info, id: int) -> Optional[PurchaseType]:
         try:
-            return Purchase.objects.select_related('supplier').prefetch_related('items__product').get(id=id)
+            return optimize(Purchase.objects.all(), info).get(id=id)
         except Purchase.DoesNotExist:
             return None
     
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Page numbers use OFFSET and a full count; use purchaseSuggestionsConnection")
     def purchase_suggestions(
         self, 
+        info: strawberry.Info,
         status: Optional[str] = None,
         page: int = 1,
         limit: int = 5,
         product_id: Optional[int] = None,
         supplier_id: Optional[int] = None
     ) -> PurchaseSuggestionsResponse:
-        queryset = PurchaseOrderSuggestion.objects.select_related('product', 'supplier').all()
+        queryset = PurchaseOrderSuggestion.objects.all()
         
         # Apply filters
         if status:
@@ -129,9 +166,12 @@ class Query:
         # Get total count before pagination
         total_count = queryset.count()
         
-        # Apply pagination
+        # Apply pagination; kept on page numbers for existing clients
+        limit = min(limit, max_page_size())
         offset = (page - 1) * limit
-        suggestions = list(queryset.order_by('-created_at')[offset:offset + limit])
+        suggestions = get_loaders(info).expect(
+            optimize(queryset.order_by('-created_at', '-pk'), info, 'suggestions')[offset:offset + limit]
+        )
         
         # Calculate pagination info
         has_next = offset + limit < total_count
@@ -147,18 +187,39 @@ class Query:
         )
     
     @strawberry.field
-    def purchase_suggestion(self, id: int) -> Optional[PurchaseOrderSuggestionType]:
+    def purchase_suggestions_connection(
+        self,
+        info: strawberry.Info,
+        status: Optional[str] = None,
+        product_id: Optional[int] = None,
+        supplier_id: Optional[int] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[PurchaseOrderSuggestionType]:
+        queryset = PurchaseOrderSuggestion.objects.all()
+        if status:
+            queryset = queryset.filter(status=status)
+        if product_id:
+            queryset = queryset.filter(product_id=product_id)
+        if supplier_id:
+            queryset = queryset.filter(supplier_id=supplier_id)
+        return paginate(queryset, info, '-created_at', first, after, last, before)
+    
+    @strawberry.field
+    def purchase_suggestion(self, info: strawberry.Info, id: int) -> Optional[PurchaseOrderSuggestionType]:
         try:
-            return PurchaseOrderSuggestion.objects.select_related('product', 'supplier').get(id=id)
+            return optimize(PurchaseOrderSuggestion.objects.all(), info).get(id=id)
         except PurchaseOrderSuggestion.DoesNotExist:
             return None
     
     @strawberry.field
-    def product_suppliers(self, product_id: Optional[int] = None) -> List[ProductSupplierType]:
-        queryset = ProductSupplier.objects.select_related('product', 'supplier').all()
+    def product_suppliers(self, info: strawberry.Info, product_id: Optional[int] = None) -> List[ProductSupplierType]:
+        queryset = ProductSupplier.objects.all()
         if product_id:
             queryset = queryset.filter(product_id=product_id)
-        return queryset
+        return get_loaders(info).expect(capped_list(optimize(queryset, info), 'id'))
 
 
 @strawberry.type
@@ -239,4 +300,4 @@ class Mutation:
             return False
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=SCHEMA_EXTENSIONS)
\ No newline at end of file
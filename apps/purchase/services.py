@@ -1,8 +1,9 @@
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from datetime import datetime, timedelta
 from django.db.models import Avg, Sum
 from .models import Purchase, PurchaseItem, ProductSupplier, PurchaseOrderSuggestion
 from apps.inventory.services import InventoryService
+from apps.product.models import Product
 from apps.sales.models import SaleItem
 
 class PurchaseService:
@@ -29,10 +30,18 @@ class PurchaseService:
 
 class PurchaseOrderSuggestionService:
     @staticmethod
-    def generate_suggestion_for_product(product_id: int, current_stock: int, threshold: int):
-        """Generate purchase order suggestion when stock is low"""
+    def generate_suggestion_for_product(product_id: int, current_stock: int, threshold: int, source_event_id: str = None):
+        """Generate purchase order suggestion when stock is low.
+
+        With a ``source_event_id`` the call is idempotent: replaying the same
+        alert returns the suggestion created the first time.
+        """
         try:
-            from apps.product.models import Product
+            if source_event_id:
+                existing = PurchaseOrderSuggestion.objects.filter(source_event_id=source_event_id).first()
+                if existing:
+                    return existing
+            
             product = Product.objects.get(id=product_id)
             
             # Find preferred supplier
@@ -56,23 +65,34 @@ class PurchaseOrderSuggestionService:
             total_cost = suggested_qty * supplier_info.unit_cost
             
             # Create suggestion
-            suggestion = PurchaseOrderSuggestion.objects.create(
-                product=product,
-                supplier=supplier_info.supplier,
-                suggested_qty=suggested_qty,
-                unit_cost=supplier_info.unit_cost,
-                total_cost=total_cost,
-                reason=f"Stock alert: {current_stock} units remaining (threshold: {threshold}). "
-                       f"Suggested based on {supplier_info.lead_time_days}-day lead time and sales history."
-            )
+            try:
+                with transaction.atomic():
+                    suggestion = PurchaseOrderSuggestion.objects.create(
+                        product=product,
+                        supplier=supplier_info.supplier,
+                        suggested_qty=suggested_qty,
+                        unit_cost=supplier_info.unit_cost,
+                        total_cost=total_cost,
+                        reason=f"Stock alert: {current_stock} units remaining (threshold: {threshold}). "
+                               f"Suggested based on {supplier_info.lead_time_days}-day lead time and sales history.",
+                        source_event_id=source_event_id
+                    )
+            except IntegrityError:
+                # Another consumer processed the same alert concurrently
+                if not source_event_id:
+                    raise
+                return PurchaseOrderSuggestion.objects.get(source_event_id=source_event_id)
             
             return suggestion
             
+        except Product.DoesNotExist:
+            return None
         except Exception as e:
+            # Let the caller decide whether to retry (the stock alert consumer does)
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Failed to generate PO suggestion for product {product_id}: {e}")
-            return None
+            raise
     
     @staticmethod
     def _calculate_order_quantity(product_id: int, current_stock: int, threshold: int, min_order_qty: int):
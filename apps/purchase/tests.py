@@ -1,3 +1,88 @@
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from apps.product.models import Category, Product
+from apps.purchase.models import ProductSupplier, Purchase, PurchaseItem, PurchaseOrderSuggestion
+from apps.supplier.models import Supplier
+
+
+class PurchaseGraphQLTests(TestCase):
+    def query(self, query):
+        response = self.client.post('/api/purchases/graphql/', {'query': query}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    @override_settings(GRAPHQL_MAX_PAGE_SIZE=2)
+    def test_product_suppliers_without_product_is_capped(self):
+        product = Product.objects.create(sku='W-1', name='Widget', current_stock=5, low_stock_threshold=10)
+        for code in ('S1', 'S2', 'S3'):
+            supplier = Supplier.objects.create(name=code, code=code)
+            ProductSupplier.objects.create(product=product, supplier=supplier, unit_cost=1)
+
+        result = self.query('{ productSuppliers { supplier { code } } }')
+        self.assertEqual([row['supplier']['code'] for row in result['data']['productSuppliers']], ['S1', 'S2'])
+
+
+@override_settings(GRAPHQL_MAX_PAGE_SIZE=500, GRAPHQL_QUERY_COST_LIST_SIZE=20, GRAPHQL_COST_BUDGET_CACHE='default')
+class QueryCostTests(TestCase):
+    nested = '{ purchases { items { product { category { name } } } } }'
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def query(self, query):
+        response = self.client.post('/api/purchases/graphql/', {'query': query}, content_type='application/json')
+        return response.json()
+
+    def test_costly_query_is_rejected_before_it_runs(self):
+        result = self.query(self.nested)
+        self.assertIsNone(result['data'])
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'QUERY_TOO_COSTLY')
+        self.assertEqual(result['extensions']['queryCost']['cost'], 30500)
+
+    @override_settings(GRAPHQL_MAX_QUERY_DEPTH=4, GRAPHQL_MAX_QUERY_COST=100000)
+    def test_deep_query_is_rejected(self):
+        result = self.query(self.nested)
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'QUERY_TOO_DEEP')
+        self.assertEqual(result['extensions']['queryCost']['depth'], 5)
+
+    @override_settings(GRAPHQL_COST_BUDGET=800)
+    def test_budget_is_spent_per_client(self):
+        result = self.query('{ purchases { id } }')
+        self.assertEqual(result['data'], {'purchases': []})
+        self.assertEqual(result['extensions']['queryCost']['budget']['remaining'], 300)
+
+        result = self.query('{ purchases { id } }')
+        self.assertIsNone(result['data'])
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'COST_BUDGET_EXHAUSTED')
+        self.assertEqual(result['extensions']['queryCost']['budget']['remaining'], 300)
+
+
+@override_settings(GRAPHQL_COST_BUDGET=None, GRAPHQL_MAX_QUERY_COST=100000)
+class PurchaseQueryCountTests(TestCase):
+    def setUp(self):
+        supplier = Supplier.objects.create(name='Acme', code='ACME')
+        for i in range(3):
+            category = Category.objects.create(name=f'Category {i}', slug=f'category-{i}')
+            product = Product.objects.create(sku=f'W-{i}', name=f'Widget {i}', category=category)
+            for _ in range(2):
+                purchase = Purchase.objects.create(supplier=supplier)
+                PurchaseItem.objects.create(purchase=purchase, product=product, qty=1, unit_cost=1, line_total=1)
+            PurchaseOrderSuggestion.objects.create(
+                product=product, supplier=supplier, suggested_qty=1, unit_cost=1, total_cost=1
+            )
+
+    def query(self, query):
+        response = self.client.post('/api/purchases/graphql/', {'query': query}, content_type='application/json')
+        return response.json()
+
+    def test_purchase_items_load_product_and_category_in_one_query(self):
+        with self.assertNumQueries(2):
+            result = self.query('{ purchases { items { product { category { name } } } } }')
+        self.assertEqual(len(result['data']['purchases']), 6)
+
+    def test_suggestions_load_product_and_category_with_the_page(self):
+        with self.assertNumQueries(2):
+            result = self.query('{ purchaseSuggestions { suggestions { product { category { name } } } } }')
+        names = {row['product']['category']['name'] for row in result['data']['purchaseSuggestions']['suggestions']}
+        self.assertEqual(names, {'Category 0', 'Category 1', 'Category 2'})
@@ -4,16 +4,23 @@ from typing import List, Optional
 from decimal import Decimal
 from .models import Sale, SaleItem
 from apps.product.schema import ProductType
+from config.dataloaders import get_loaders
+from config.optimizer import optimize
+from config.pagination import Connection, capped_list, paginate
+from config.schema_extensions import SCHEMA_EXTENSIONS
 
 
 @strawberry.django.type(SaleItem)
 class SaleItemType:
     id: auto
-    product: ProductType
     qty: auto
     unit_price: auto
     line_total: auto
 
+    @strawberry.field
+    def product(self, info: strawberry.Info) -> ProductType:
+        return get_loaders(info).related(self, 'product')
+
 
 @strawberry.django.type(Sale)
 class SaleType:
@@ -22,7 +29,10 @@ class SaleType:
     total_amount: auto
     status: auto
     created_at: auto
-    items: List[SaleItemType]
+
+    @strawberry.field
+    def items(self, info: strawberry.Info) -> List[SaleItemType]:
+        return get_loaders(info).items(self)
 
 
 @strawberry.input
@@ -47,13 +57,24 @@ class SaleUpdateInput:
 @strawberry.type
 class Query:
     @strawberry.field
-    def sales(self) -> List[SaleType]:
-        return Sale.objects.prefetch_related('items__product').all()
+    def sales(self, info: strawberry.Info) -> List[SaleType]:
+        return get_loaders(info).expect(capped_list(optimize(Sale.objects.all(), info), '-created_at'))
+    
+    @strawberry.field
+    def sales_connection(
+        self,
+        info: strawberry.Info,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[SaleType]:
+        return paginate(Sale.objects.all(), info, '-created_at', first, after, last, before)
     
     @strawberry.field
-    def sale(self, id: int) -> Optional[SaleType]:
+    def sale(self, info: strawberry.Info, id: int) -> Optional[SaleType]:
         try:
-            return Sale.objects.prefetch_related('items__product').get(id=id)
+            return optimize(Sale.objects.all(), info).get(id=id)
         except Sale.DoesNotExist:
             return None
 
@@ -107,4 +128,4 @@ class Mutation:
             return False
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=SCHEMA_EXTENSIONS)
\ No newline at end of file
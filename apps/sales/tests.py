@@ -1,3 +1,24 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from apps.product.models import Category, Product
+from apps.sales.models import Sale, SaleItem
+
+
+@override_settings(GRAPHQL_COST_BUDGET=None, GRAPHQL_MAX_QUERY_COST=100000)
+class SalesQueryCountTests(TestCase):
+    def test_sale_items_load_product_and_category_in_one_query(self):
+        for i in range(3):
+            category = Category.objects.create(name=f'Category {i}', slug=f'category-{i}')
+            product = Product.objects.create(sku=f'W-{i}', name=f'Widget {i}', category=category)
+            sale = Sale.objects.create(customer_name=f'Customer {i}')
+            for _ in range(2):
+                SaleItem.objects.create(sale=sale, product=product, qty=1, unit_price=1, line_total=1)
+
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                '/api/sales/graphql/',
+                {'query': '{ sales { items { product { category { name } } } } }'},
+                content_type='application/json',
+            )
+        sales = response.json()['data']['sales']
+        self.assertEqual([len(sale['items']) for sale in sales], [2, 2, 2])
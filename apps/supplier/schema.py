@@ -1,6 +1,9 @@
 import strawberry
 from strawberry import auto
 from typing import List, Optional
+from config.optimizer import optimize
+from config.pagination import Connection, capped_list, paginate
+from config.schema_extensions import SCHEMA_EXTENSIONS
 from .models import Supplier
 
 
@@ -41,20 +44,31 @@ class SupplierUpdateInput:
 @strawberry.type
 class Query:
     @strawberry.field
-    def suppliers(self) -> List[SupplierType]:
-        return Supplier.objects.all()
+    def suppliers(self, info: strawberry.Info) -> List[SupplierType]:
+        return capped_list(optimize(Supplier.objects.all(), info), 'name')
     
     @strawberry.field
-    def supplier(self, id: int) -> Optional[SupplierType]:
+    def suppliers_connection(
+        self,
+        info: strawberry.Info,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        last: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Connection[SupplierType]:
+        return paginate(Supplier.objects.all(), info, 'name', first, after, last, before)
+    
+    @strawberry.field
+    def supplier(self, info: strawberry.Info, id: int) -> Optional[SupplierType]:
         try:
-            return Supplier.objects.get(id=id)
+            return optimize(Supplier.objects.all(), info).get(id=id)
         except Supplier.DoesNotExist:
             return None
     
     @strawberry.field
-    def supplier_by_code(self, code: str) -> Optional[SupplierType]:
+    def supplier_by_code(self, info: strawberry.Info, code: str) -> Optional[SupplierType]:
         try:
-            return Supplier.objects.get(code=code)
+            return optimize(Supplier.objects.all(), info).get(code=code)
         except Supplier.DoesNotExist:
             return None
 
@@ -107,4 +121,4 @@ class Mutation:
             return False
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=SCHEMA_EXTENSIONS)
\ No newline at end of file
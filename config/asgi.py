@@ -8,6 +8,7 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
+from django.urls import re_path
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
@@ -16,7 +17,10 @@ from . import routing
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = ProtocolTypeRouter({
-    'http': get_asgi_application(),
+    'http': URLRouter([
+        *routing.sse_urlpatterns,
+        re_path(r'', get_asgi_application()),
+    ]),
     'websocket': AuthMiddlewareStack(
         URLRouter(routing.websocket_urlpatterns)
     ),
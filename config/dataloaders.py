@@ -0,0 +1,141 @@
+from collections import defaultdict
+from django.core.exceptions import FieldDoesNotExist
+from apps.product.models import Product, Category
+from apps.supplier.models import Supplier
+from apps.purchase.models import Purchase, PurchaseItem
+from apps.sales.models import Sale, SaleItem
+
+
+class BatchLoader:
+    """Request-scoped cache that fetches every queued key in one query.
+
+    The GraphQL views execute synchronously, so a resolver cannot wait for
+    its siblings the way an async DataLoader does. Instead the keys a level
+    will need are queued with ``want`` when its parent rows are loaded, and
+    the first ``load`` that misses the cache fetches all of them at once.
+    """
+
+    def __init__(self, batch_load, many=False):
+        self.batch_load = batch_load
+        self.many = many
+        self.cache = {}
+        self.pending = set()
+
+    def want(self, key):
+        if key is not None and key not in self.cache:
+            self.pending.add(key)
+
+    def load(self, key):
+        if key is None:
+            return None
+        if key not in self.cache:
+            keys = self.pending | {key}
+            self.pending = set()
+            found = self.batch_load(list(keys))
+            for k in keys:
+                self.cache[k] = found.get(k, [] if self.many else None)
+        return self.cache[key]
+
+
+# Forward relations resolved through a loader of the same name
+FORWARD_RELATIONS = ('product', 'category', 'supplier')
+# Models whose ``items`` are resolved through a loader
+ITEM_LOADERS = {Purchase: 'purchase_items', Sale: 'sale_items'}
+
+
+class GraphQLLoaders:
+    """The loaders of one GraphQL request (see ``get_loaders``)"""
+
+    def __init__(self):
+        self.product = BatchLoader(self._load_products)
+        self.category = BatchLoader(self._load_categories)
+        self.supplier = BatchLoader(self._load_suppliers)
+        self.purchase_items = BatchLoader(self._load_purchase_items, many=True)
+        self.sale_items = BatchLoader(self._load_sale_items, many=True)
+        self._fields = {}
+
+    def _forward_fields(self, model):
+        if model not in self._fields:
+            fields = []
+            for name in FORWARD_RELATIONS:
+                try:
+                    fields.append(model._meta.get_field(name))
+                except FieldDoesNotExist:
+                    pass
+            self._fields[model] = fields
+        return self._fields[model]
+
+    def expect(self, rows):
+        """Queue the relations of ``rows`` so all of them load in one query per relation.
+
+        Relations already fetched with ``select_related``/``prefetch_related``
+        are walked instead, so their own relations are queued too.
+        """
+        rows = list(rows)
+        for row in rows:
+            deferred = row.get_deferred_fields()
+            for field in self._forward_fields(type(row)):
+                if field.attname in deferred:
+                    # Left out by the query optimizer: not selected
+                    continue
+                if field.is_cached(row):
+                    related = getattr(row, field.name)
+                    if related is not None:
+                        self.expect([related])
+                else:
+                    getattr(self, field.name).want(getattr(row, field.attname))
+            if type(row) in ITEM_LOADERS:
+                prefetched = getattr(row, '_prefetched_objects_cache', {})
+                if 'items' in prefetched:
+                    self.expect(prefetched['items'])
+                else:
+                    getattr(self, ITEM_LOADERS[type(row)]).want(row.pk)
+        return rows
+
+    def related(self, row, name):
+        """Forward relation ``name`` of ``row``, batched with its siblings"""
+        field = row._meta.get_field(name)
+        if field.is_cached(row):
+            return getattr(row, name)
+        return getattr(self, name).load(getattr(row, field.attname))
+
+    def items(self, row):
+        """``items`` of a purchase or sale, batched with its siblings"""
+        if 'items' in getattr(row, '_prefetched_objects_cache', {}):
+            return list(row.items.all())
+        return getattr(self, ITEM_LOADERS[type(row)]).load(row.pk)
+
+    def _load_products(self, keys):
+        return self._in_bulk(Product, keys)
+
+    def _load_categories(self, keys):
+        return self._in_bulk(Category, keys)
+
+    def _load_suppliers(self, keys):
+        return self._in_bulk(Supplier, keys)
+
+    def _in_bulk(self, model, keys):
+        found = model.objects.in_bulk(keys)
+        self.expect(found.values())
+        return found
+
+    def _load_purchase_items(self, keys):
+        return self._group_items(PurchaseItem.objects.filter(purchase_id__in=keys), 'purchase_id')
+
+    def _load_sale_items(self, keys):
+        return self._group_items(SaleItem.objects.filter(sale_id__in=keys), 'sale_id')
+
+    def _group_items(self, queryset, parent_attname):
+        grouped = defaultdict(list)
+        for item in self.expect(queryset.order_by('id')):
+            grouped[getattr(item, parent_attname)].append(item)
+        return grouped
+
+
+def get_loaders(info):
+    """Loaders shared by every resolver of the current request"""
+    request = info.context["request"]
+    loaders = getattr(request, 'graphql_loaders', None)
+    if loaders is None:
+        loaders = request.graphql_loaders = GraphQLLoaders()
+    return loaders
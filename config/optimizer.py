@@ -0,0 +1,211 @@
+import logging
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import Prefetch
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode, OperationType, get_named_type
+from strawberry.extensions import SchemaExtension
+
+logger = logging.getLogger(__name__)
+
+_active = ContextVar('graphql_query_optimizer', default=None)
+
+
+class QueryPlan:
+    """Columns and relations one model's queryset needs for a selection"""
+
+    def __init__(self, model):
+        self.model = model
+        self.only = {model._meta.pk.name}
+        self.load_all = False
+        self.select_related = {}
+        self.prefetch_related = {}
+
+    def apply(self, queryset):
+        related = list(self.related_paths())
+        if related:
+            queryset = queryset.select_related(*related)
+        for lookup, plan in self.prefetches():
+            queryset = queryset.prefetch_related(Prefetch(lookup, queryset=plan.apply(plan.model.objects.all())))
+        only = self.only_fields()
+        if only is not None:
+            queryset = queryset.only(*only)
+        return queryset
+
+    def related_paths(self):
+        for name, plan in self.select_related.items():
+            yield name
+            for path in plan.related_paths():
+                yield f'{name}__{path}'
+
+    def prefetches(self, prefix=''):
+        """Prefetch lookups of this model and of the relations joined to it"""
+        for name, plan in self.prefetch_related.items():
+            yield f'{prefix}{name}', plan
+        for name, plan in self.select_related.items():
+            yield from plan.prefetches(f'{prefix}{name}__')
+
+    def only_fields(self):
+        """Field names for ``only()``, or None when every column has to be loaded"""
+        if self.load_all:
+            return None
+        fields = set(self.only)
+        for name, plan in self.select_related.items():
+            nested = plan.only_fields()
+            if nested is None:
+                return None
+            fields.update(f'{name}__{field}' for field in nested)
+        return sorted(fields)
+
+    def deferred_columns(self):
+        """Columns of this model and its joined relations that the plan leaves out"""
+        only = self.only_fields()
+        if only is None:
+            return []
+        loaded = set(only)
+        return [
+            f'{prefix}{field.name}'
+            for prefix, model in [('', self.model), *self._joined_models()]
+            for field in model._meta.concrete_fields
+            if f'{prefix}{field.name}' not in loaded
+        ]
+
+    def _joined_models(self, prefix=''):
+        for name, plan in self.select_related.items():
+            yield f'{prefix}{name}__', plan.model
+            yield from plan._joined_models(f'{prefix}{name}__')
+
+
+def _django_model(graphql_type):
+    definition = getattr(graphql_type, 'extensions', {}).get('strawberry-definition')
+    django_definition = getattr(getattr(definition, 'origin', None), '__strawberry_django_definition__', None)
+    return getattr(django_definition, 'model', None)
+
+
+def _collect_fields(selection_set, fragments, fields=None):
+    """Response fields of a selection set, with fragments inlined and repeated fields merged"""
+    fields = {} if fields is None else fields
+    for selection in selection_set.selections if selection_set else ():
+        if isinstance(selection, FieldNode):
+            fields.setdefault(selection.name.value, []).append(selection)
+        elif isinstance(selection, InlineFragmentNode):
+            _collect_fields(selection.selection_set, fragments, fields)
+        elif isinstance(selection, FragmentSpreadNode):
+            _collect_fields(fragments[selection.name.value].selection_set, fragments, fields)
+    return fields
+
+
+def _subselection(nodes, fragments):
+    merged = {}
+    for node in nodes:
+        _collect_fields(node.selection_set, fragments, merged)
+    return merged
+
+
+def build_plan(model, graphql_type, fields, fragments):
+    """Plan the queryset of ``model`` for the selected ``fields`` of ``graphql_type``"""
+    plan = QueryPlan(model)
+    for name, nodes in fields.items():
+        if name == '__typename':
+            continue
+        definition = graphql_type.fields[name].extensions.get('strawberry-definition')
+        try:
+            model_field = model._meta.get_field(definition.python_name)
+        except (AttributeError, FieldDoesNotExist):
+            # Computed field: its resolver may read any column
+            plan.load_all = True
+            continue
+
+        if not model_field.is_relation:
+            plan.only.add(model_field.name)
+            continue
+
+        related_type = get_named_type(graphql_type.fields[name].type)
+        related_model = _django_model(related_type)
+        if related_model is None:
+            plan.load_all = True
+            continue
+        nested = build_plan(related_model, related_type, _subselection(nodes, fragments), fragments)
+        if model_field.many_to_one or (model_field.one_to_one and model_field.concrete):
+            plan.only.add(model_field.name)
+            plan.select_related[model_field.name] = nested
+        elif model_field.one_to_many:
+            # The prefetched rows are matched to their parent through this column
+            nested.only.add(model_field.field.name)
+            plan.prefetch_related[model_field.get_accessor_name()] = nested
+        else:
+            plan.load_all = True
+    return plan
+
+
+class SelectionOptimizerExtension(SchemaExtension):
+    """Derives ``only``/``select_related``/``prefetch_related`` from the GraphQL selection.
+
+    List and detail resolvers pass their queryset through ``optimize``; while
+    this extension is installed the queryset is narrowed to the columns and
+    relations the client selected, for every ``strawberry.django.type``.
+    Without it ``optimize`` returns the queryset unchanged and the request
+    loaders still batch the relations. With ``DEBUG`` on, each response
+    reports the plans under ``extensions.optimizer``: the columns left out,
+    the relations joined or prefetched and the queries the operation ran.
+    """
+
+    def on_execute(self):
+        self.report = []
+        token = _active.set(self)
+        queries_before = len(connection.queries)
+        try:
+            yield
+        finally:
+            _active.reset(token)
+            self.queries = len(connection.queries) - queries_before
+
+    def get_results(self):
+        if not settings.DEBUG or not getattr(self, 'report', None):
+            return {}
+        return {'optimizer': {'querysets': self.report, 'queries': self.queries}}
+
+    def optimize(self, queryset, info, path=(), include=()):
+        # Resolvers get strawberry's Info; the selection lives on graphql-core's
+        info = getattr(info, '_raw_info', info)
+        if info.operation.operation != OperationType.QUERY:
+            return queryset
+        graphql_type = get_named_type(info.return_type)
+        fields = _subselection(info.field_nodes, info.fragments)
+        for name in path:
+            graphql_type = get_named_type(graphql_type.fields[name].type)
+            fields = _subselection(fields.get(name, []), info.fragments)
+        if _django_model(graphql_type) is not queryset.model:
+            return queryset
+
+        plan = build_plan(queryset.model, graphql_type, fields, info.fragments)
+        plan.only.update(include)
+        optimized = plan.apply(queryset)
+        if settings.DEBUG:
+            deferred = plan.deferred_columns()
+            self.report.append({
+                'field': '.'.join([info.field_name, *path]),
+                'deferred_columns': deferred,
+                'select_related': list(plan.related_paths()),
+                'prefetch_related': [lookup for lookup, _ in plan.prefetches()],
+                'sql': str(optimized.query),
+            })
+            logger.debug(
+                f"🧮 {info.field_name}: {len(deferred)} columns deferred, "
+                f"{len(plan.select_related)} joins, {len(plan.prefetch_related)} prefetches"
+            )
+        return optimized
+
+
+def optimize(queryset, info, *path, include=()):
+    """Narrow ``queryset`` to the current selection when the optimizer extension is installed.
+
+    ``path`` names the fields between the resolver's return type and the
+    Django type when rows are wrapped, e.g. ``optimize(qs, info, 'suggestions')``;
+    ``include`` lists columns the resolver itself reads.
+    """
+    extension = _active.get()
+    if extension is None:
+        return queryset
+    return extension.optimize(queryset, info, path, include)
@@ -0,0 +1,143 @@
+import base64
+import binascii
+import json
+from typing import Any, Generic, List, Optional, TypeVar
+import strawberry
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from .dataloaders import get_loaders
+from .optimizer import optimize
+
+NodeType = TypeVar('NodeType')
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    has_previous_page: bool
+    start_cursor: Optional[str]
+    end_cursor: Optional[str]
+
+
+@strawberry.type
+class Edge(Generic[NodeType]):
+    cursor: str
+    node: NodeType
+
+
+@strawberry.type
+class Connection(Generic[NodeType]):
+    edges: List[Edge[NodeType]]
+    page_info: PageInfo
+    queryset: strawberry.Private[Any]
+
+    @strawberry.field(description="Rows matching the query; estimate=true reads planner statistics instead of counting")
+    def total_count(self, estimate: bool = False) -> int:
+        return estimated_count(self.queryset) if estimate else self.queryset.count()
+
+
+def max_page_size():
+    return getattr(settings, 'GRAPHQL_MAX_PAGE_SIZE', 500)
+
+
+def capped_list(queryset, ordering):
+    """First ``GRAPHQL_MAX_PAGE_SIZE`` rows in keyset order, for the plain list fields"""
+    pk = '-pk' if ordering.startswith('-') else 'pk'
+    return queryset.order_by(ordering, pk)[:max_page_size()]
+
+
+def _parse_ordering(model, ordering):
+    return model._meta.get_field(ordering.lstrip('-')), ordering.startswith('-')
+
+
+def encode_cursor(row, field):
+    value = field.value_to_string(row)
+    return base64.urlsafe_b64encode(json.dumps([value, row.pk]).encode()).decode()
+
+
+def decode_cursor(cursor, field):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return field.to_python(value), int(pk)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor '{cursor}'") from e
+
+
+def _seek(field, descending, value, pk):
+    """Rows after ``(value, pk)`` in ``(field, pk)`` order"""
+    op = 'lt' if descending else 'gt'
+    return Q(**{f'{field.name}__{op}': value}) | Q(**{field.name: value, f'pk__{op}': pk})
+
+
+def paginate(queryset, info, ordering, first=None, after=None, last=None, before=None):
+    """Relay connection over ``queryset`` using keyset cursors on ``(ordering, pk)``.
+
+    ``ordering`` is one indexed column, e.g. ``'name'`` or ``'-created_at'``;
+    the primary key breaks ties. Pages never use OFFSET, so their cost does
+    not grow with the position in the table.
+    """
+    if first is not None and last is not None:
+        raise ValueError("Pass either 'first' or 'last', not both")
+    size = first if last is None else last
+    size = getattr(settings, 'GRAPHQL_DEFAULT_PAGE_SIZE', 50) if size is None else size
+    if size < 0 or size > max_page_size():
+        raise ValueError(f"Page size must be between 0 and {max_page_size()}")
+
+    field, descending = _parse_ordering(queryset.model, ordering)
+    backward = last is not None or (before is not None and first is None)
+    page = queryset
+    if after is not None:
+        page = page.filter(_seek(field, descending, *decode_cursor(after, field)))
+    if before is not None:
+        page = page.filter(_seek(field, not descending, *decode_cursor(before, field)))
+
+    # Walking backwards reads the index in reverse and flips the page afterwards
+    reverse = descending != backward
+    sign = '-' if reverse else ''
+    page = optimize(page, info, 'edges', 'node', include=[field.name])
+    page = page.order_by(f'{sign}{field.name}', f'{sign}pk')
+    rows = get_loaders(info).expect(page[:size + 1])
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if backward:
+        rows.reverse()
+
+    edges = [Edge(cursor=encode_cursor(row, field), node=row) for row in rows]
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_more if not backward else before is not None,
+            has_previous_page=has_more if backward else after is not None,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+        queryset=queryset,
+    )
+
+
+def estimated_count(queryset):
+    """Row count from PostgreSQL statistics instead of a full ``count()``.
+
+    An unfiltered table reads ``pg_class.reltuples``; a filtered queryset
+    uses the planner's row estimate. Other databases, and tables that were
+    never analysed, fall back to an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+        return queryset.count()
+    plan = json.loads(queryset.explain(format='json'))
+    # psycopg hands back the decoded plan, which Django re-encodes without the outer list
+    if isinstance(plan, list):
+        plan = plan[0]
+    return int(plan['Plan']['Plan Rows'])
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from graphql import GraphQLError, parse
+from strawberry.extensions import SchemaExtension
+
+logger = logging.getLogger(__name__)
+
+# Stand-in document for requests rejected before parsing, so strawberry
+# returns their errors as a regular GraphQL response
+_REJECTED = parse('{ __typename }')
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class DocumentCache:
+    """Process-local LRU of parsed and validated documents keyed by (schema version, query hash)"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, document, cost):
+        with self.lock:
+            self.entries[key] = (document, cost)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+_documents = None
+_schema_versions = {}
+_manifest = None
+
+
+def get_document_cache():
+    global _documents
+    if _documents is None:
+        _documents = DocumentCache(getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 1000))
+    return _documents
+
+
+def schema_version(schema):
+    """Hash of the schema SDL; cached documents are only reused by the schema that validated them"""
+    version = _schema_versions.get(id(schema))
+    if version is None:
+        version = _schema_versions[id(schema)] = query_hash(schema.as_str())[:16]
+    return version
+
+
+def load_manifest():
+    """Registered queries (hash -> query) from ``GRAPHQL_PERSISTED_QUERY_MANIFEST``.
+
+    Accepts Apollo's persisted query manifest (``{"operations": [{"id", "body"}]}``)
+    or a plain ``{hash: query}`` object.
+    """
+    global _manifest
+    if _manifest is None:
+        path = getattr(settings, 'GRAPHQL_PERSISTED_QUERY_MANIFEST', None)
+        manifest = {}
+        if path:
+            with open(path) as f:
+                data = json.load(f)
+            if 'operations' in data:
+                data = {operation['id']: operation['body'] for operation in data['operations']}
+            for sha256, query in data.items():
+                if query_hash(query) != sha256:
+                    raise ValueError(f"Persisted query manifest entry {sha256} does not match its query")
+                manifest[sha256] = query
+        _manifest = manifest
+    return _manifest
+
+
+class PersistedQueryExtension(SchemaExtension):
+    """Automatic persisted queries plus a cache of parsed and validated documents.
+
+    Clients send ``extensions.persistedQuery.sha256Hash`` (Apollo APQ). An
+    unknown hash gets a ``PersistedQueryNotFound`` error; the client retries
+    with the query text, which is stored in the shared
+    ``GRAPHQL_PERSISTED_QUERY_CACHE`` for every worker. With
+    ``GRAPHQL_PERSISTED_QUERIES_ALLOWLIST`` on, only hashes registered in
+    ``GRAPHQL_PERSISTED_QUERY_MANIFEST`` are executed and plain query text
+    is refused.
+
+    Whatever the transport, a document that validated once is reused from the
+    per-process LRU, skipping parse and validation. Each response reports the
+    hit and the parse/validate time saved under ``extensions.documentCache``.
+    """
+
+    def on_operation(self):
+        context = self.execution_context
+        self.report = None
+        self.started = None
+        try:
+            self.key = self._resolve_query(context)
+        except GraphQLError as error:
+            context.graphql_document = _REJECTED
+            context.pre_execution_errors = [error]
+            self.key = None
+            yield
+            return
+
+        entry = get_document_cache().get(self.key)
+        if entry is not None:
+            # Validation is skipped when pre_execution_errors is already set
+            context.graphql_document, cost = entry
+            context.pre_execution_errors = []
+            self.report = {'hit': True, 'savedMs': round(cost * 1000, 3)}
+        yield
+
+    def on_parse(self):
+        # The hooks still run on a cache hit; only time real parses
+        if self.report is None:
+            self.started = time.perf_counter()
+        yield
+
+    def on_validate(self):
+        yield
+        context = self.execution_context
+        if self.started is None or self.key is None or context.pre_execution_errors:
+            return
+        cost = time.perf_counter() - self.started
+        get_document_cache().put(self.key, context.graphql_document, cost)
+        self.report = {'hit': False, 'parseValidateMs': round(cost * 1000, 3)}
+
+    def get_results(self):
+        return {'documentCache': self.report} if self.report else {}
+
+    def _resolve_query(self, context):
+        """Fill in the query text for hash-only requests and return the document cache key"""
+        allowlist = getattr(settings, 'GRAPHQL_PERSISTED_QUERIES_ALLOWLIST', False)
+        persisted = (context.operation_extensions or {}).get('persistedQuery')
+        version = schema_version(context.schema)
+
+        if not persisted:
+            if allowlist:
+                raise GraphQLError(
+                    "Only persisted queries are accepted",
+                    extensions={'code': 'PERSISTED_QUERY_REQUIRED'},
+                )
+            return (version, query_hash(context.query)) if context.query else None
+
+        sha256 = persisted.get('sha256Hash')
+        if persisted.get('version', 1) != 1 or not isinstance(sha256, str):
+            raise GraphQLError("Unsupported persisted query", extensions={'code': 'PERSISTED_QUERY_NOT_SUPPORTED'})
+
+        if allowlist:
+            query = load_manifest().get(sha256)
+            if query is None:
+                raise GraphQLError("Persisted query is not registered", extensions={'code': 'PERSISTED_QUERY_NOT_ALLOWED'})
+            context.query = query
+            return version, sha256
+
+        cache = caches[getattr(settings, 'GRAPHQL_PERSISTED_QUERY_CACHE', 'default')]
+        if context.query:
+            if query_hash(context.query) != sha256:
+                raise GraphQLError("provided sha does not match query", extensions={'code': 'PERSISTED_QUERY_HASH_MISMATCH'})
+            cache.set(f'apq:{sha256}', context.query, timeout=getattr(settings, 'GRAPHQL_PERSISTED_QUERY_TTL', None))
+            return version, sha256
+
+        if get_document_cache().get((version, sha256)) is not None:
+            # Parsed here before: no need for the text
+            return version, sha256
+        query = cache.get(f'apq:{sha256}')
+        if query is None:
+            raise GraphQLError("PersistedQueryNotFound", extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})
+        context.query = query
+        return version, sha256
@@ -0,0 +1,226 @@
+import logging
+import time
+from django.conf import settings
+from django.core.cache import caches
+from graphql import (
+    ExecutionResult, FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, GraphQLList,
+    GraphQLNonNull, InlineFragmentNode, OperationType, get_named_type, get_operation_ast, is_leaf_type,
+)
+from graphql.execution.values import get_argument_values, get_variable_values
+from strawberry.extensions import SchemaExtension
+from .pagination import max_page_size
+
+logger = logging.getLogger(__name__)
+
+# Arguments that bound the rows a field returns
+PAGE_ARGUMENTS = ('first', 'last', 'limit')
+
+
+def _is_list(graphql_type):
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+    return isinstance(graphql_type, GraphQLList)
+
+
+class QueryCost:
+    """Static cost and depth of one operation, computed before it runs.
+
+    Object fields cost 1 and scalars 0, unless ``GRAPHQL_FIELD_COSTS`` has an
+    entry for ``"Type.field"``. A field's cost includes its selection and is
+    multiplied by the rows it can return: a paginated field (``first``,
+    ``last`` or ``limit``) multiplies the list below it (``edges``,
+    ``suggestions``) by its page size, a root list field by
+    ``GRAPHQL_MAX_PAGE_SIZE`` and any other list by
+    ``GRAPHQL_QUERY_COST_LIST_SIZE``. Introspection fields are free.
+    """
+
+    def __init__(self, schema, document, operation_name=None, variables=None):
+        self.schema = schema
+        self.operation = get_operation_ast(document, operation_name)
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.variables = None
+        if self.operation is not None:
+            coerced = get_variable_values(schema, self.operation.variable_definitions or (), variables or {})
+            # Invalid variables fail execution anyway; page sizes fall back to their defaults
+            if not isinstance(coerced, list):
+                self.variables = coerced
+        self.field_costs = getattr(settings, 'GRAPHQL_FIELD_COSTS', {})
+        self.list_size = getattr(settings, 'GRAPHQL_QUERY_COST_LIST_SIZE', 20)
+
+    def compute(self):
+        """``(cost, depth)`` of the operation"""
+        if self.operation is None:
+            return 0, 0
+        root_type = {
+            OperationType.QUERY: self.schema.query_type,
+            OperationType.MUTATION: self.schema.mutation_type,
+            OperationType.SUBSCRIPTION: self.schema.subscription_type,
+        }[self.operation.operation]
+        return self._selection(root_type, self.operation.selection_set, root=True)
+
+    def _fields(self, selection_set, fields=None):
+        """Field nodes of a selection set by response key, with fragments inlined"""
+        fields = {} if fields is None else fields
+        for selection in selection_set.selections if selection_set else ():
+            if isinstance(selection, FieldNode):
+                key = selection.alias.value if selection.alias else selection.name.value
+                fields.setdefault(key, []).append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                self._fields(selection.selection_set, fields)
+            elif isinstance(selection, FragmentSpreadNode) and selection.name.value in self.fragments:
+                self._fields(self.fragments[selection.name.value].selection_set, fields)
+        return fields
+
+    def _selection(self, parent_type, selection_set, root=False, page_size=None):
+        cost = depth = 0
+        for nodes in self._fields(selection_set).values():
+            name = nodes[0].name.value
+            field = getattr(parent_type, 'fields', {}).get(name)
+            if field is None or name.startswith('__'):
+                continue
+
+            size = self._page_size(field, nodes[0])
+            if size is not None:
+                multiplier = 1
+            elif not _is_list(field.type):
+                multiplier = 1
+            elif page_size is not None:
+                multiplier = page_size
+            else:
+                multiplier = max_page_size() if root else self.list_size
+
+            field_type = get_named_type(field.type)
+            own = self.field_costs.get(f'{parent_type.name}.{name}')
+            if own is None:
+                own = 0 if is_leaf_type(field_type) else 1
+            if root:
+                own = max(own, 1)
+            nested_cost = nested_depth = 0
+            for node in nodes:
+                node_cost, node_depth = self._selection(field_type, node.selection_set, page_size=size)
+                nested_cost += node_cost
+                nested_depth = max(nested_depth, node_depth)
+            cost += multiplier * (own + nested_cost)
+            depth = max(depth, 1 + nested_depth)
+        return cost, depth
+
+    def _page_size(self, field, node):
+        """Rows a paginated field returns at most, or None for other fields"""
+        if not any(name in field.args for name in PAGE_ARGUMENTS):
+            return None
+        try:
+            arguments = get_argument_values(field, node, self.variables)
+        except GraphQLError:
+            arguments = {}
+        sizes = [arguments[name] for name in PAGE_ARGUMENTS if arguments.get(name) is not None]
+        if not sizes:
+            return getattr(settings, 'GRAPHQL_DEFAULT_PAGE_SIZE', 50)
+        return max(0, min(max(sizes), max_page_size()))
+
+
+class CostBudget:
+    """Query cost each client may spend per fixed window, counted in a shared cache"""
+
+    def __init__(self, limit, window, cache_alias):
+        self.limit = limit
+        self.window = window
+        self.cache = caches[cache_alias]
+
+    def charge(self, client, cost):
+        """Spend ``cost``; returns ``(allowed, remaining, reset_seconds)``"""
+        now = time.time()
+        window_start = int(now // self.window) * self.window
+        key = f'graphql_cost:{client}:{window_start}'
+        reset = int(window_start + self.window - now) + 1
+        self.cache.add(key, 0, timeout=self.window + 1)
+        spent = self.cache.incr(key, cost)
+        if spent > self.limit:
+            # Rejected operations do not use up the budget
+            self.cache.decr(key, cost)
+            return False, max(0, self.limit - spent + cost), reset
+        return True, self.limit - spent, reset
+
+
+def client_key(request):
+    """Budget key: the signed in user, otherwise the client address"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', 'unknown')}"
+
+
+class QueryCostExtension(SchemaExtension):
+    """Rejects operations that are too deep or too expensive before they run.
+
+    Every validated operation (document cache hits included) is measured with
+    ``QueryCost``. Operations deeper than ``GRAPHQL_MAX_QUERY_DEPTH`` or costing
+    more than ``GRAPHQL_MAX_QUERY_COST`` fail with ``QUERY_TOO_DEEP`` /
+    ``QUERY_TOO_COSTLY``. Each client may also spend ``GRAPHQL_COST_BUDGET``
+    per ``GRAPHQL_COST_BUDGET_WINDOW`` seconds (``COST_BUDGET_EXHAUSTED`` once
+    used up). The cost, depth and remaining budget are returned under
+    ``extensions.queryCost`` so clients can tune their queries.
+    """
+
+    def on_execute(self):
+        context = self.execution_context
+        self.report = None
+        try:
+            cost, depth = QueryCost(
+                context.schema._schema, context.graphql_document, context.operation_name, context.variables,
+            ).compute()
+        except Exception as e:
+            logger.error(f"❌ Query cost analysis failed: {e}")
+            yield
+            return
+
+        max_depth = getattr(settings, 'GRAPHQL_MAX_QUERY_DEPTH', 10)
+        max_cost = getattr(settings, 'GRAPHQL_MAX_QUERY_COST', 20000)
+        self.report = {'cost': cost, 'maximum': max_cost, 'depth': depth, 'maxDepth': max_depth}
+        if depth > max_depth:
+            error = GraphQLError(
+                f"Query depth {depth} exceeds the maximum of {max_depth}",
+                extensions={'code': 'QUERY_TOO_DEEP'},
+            )
+        elif cost > max_cost:
+            error = GraphQLError(
+                f"Query cost {cost} exceeds the maximum of {max_cost}; request smaller pages",
+                extensions={'code': 'QUERY_TOO_COSTLY'},
+            )
+        else:
+            error = self._charge(cost)
+
+        if error is not None:
+            logger.warning(f"🚫 GraphQL operation {context.operation_name or '(anonymous)'} rejected: {error.message}")
+            # A result set before execution replaces it
+            context.result = ExecutionResult(data=None, errors=[error])
+        yield
+
+    def _charge(self, cost):
+        limit = getattr(settings, 'GRAPHQL_COST_BUDGET', None)
+        if not limit or not cost:
+            return None
+        budget = CostBudget(
+            limit,
+            getattr(settings, 'GRAPHQL_COST_BUDGET_WINDOW', 60),
+            getattr(settings, 'GRAPHQL_COST_BUDGET_CACHE', 'default'),
+        )
+        try:
+            allowed, remaining, reset = budget.charge(client_key(self.execution_context.context["request"]), cost)
+        except Exception as e:
+            # Budgets are best effort: an unavailable cache does not block queries
+            logger.warning(f"⚠️ Query cost budget unavailable: {e}")
+            return None
+        self.report['budget'] = {'limit': limit, 'remaining': remaining, 'resetSeconds': reset}
+        if allowed:
+            return None
+        return GraphQLError(
+            f"Query cost budget of {limit} per {budget.window}s used up; retry in {reset}s",
+            extensions={'code': 'COST_BUDGET_EXHAUSTED', 'retryAfter': reset},
+        )
+
+    def get_results(self):
+        return {'queryCost': self.report} if getattr(self, 'report', None) else {}
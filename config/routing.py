@@ -1,7 +1,15 @@
 from django.urls import path
-from apps.inventory.consumers import StockAlertWebSocketConsumer, PurchaseSuggestionWebSocketConsumer
+from apps.inventory.consumers import StockAlertWebSocketConsumer, PurchaseSuggestionWebSocketConsumer, StockTickerWebSocketConsumer
+from apps.inventory.sse import StockAlertSSEConsumer, PurchaseSuggestionSSEConsumer
 
 websocket_urlpatterns = [
     path('ws/stock-alerts/', StockAlertWebSocketConsumer.as_asgi()),
     path('ws/purchase-suggestions/', PurchaseSuggestionWebSocketConsumer.as_asgi()),
+    path('ws/stock-ticker/', StockTickerWebSocketConsumer.as_asgi()),
+]
+
+# Server-Sent Events streams served by the ASGI app ahead of the Django views
+sse_urlpatterns = [
+    path('api/inventory/stream/stock-alerts/', StockAlertSSEConsumer.as_asgi()),
+    path('api/inventory/stream/purchase-suggestions/', PurchaseSuggestionSSEConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 import strawberry
+from .schema_extensions import SCHEMA_EXTENSIONS
 from apps.product.schema import Query as ProductQuery, Mutation as ProductMutation
 from apps.supplier.schema import Query as SupplierQuery, Mutation as SupplierMutation
 from apps.purchase.schema import Query as PurchaseQuery, Mutation as PurchaseMutation
@@ -17,4 +18,4 @@ class Mutation(ProductMutation, SupplierMutation, PurchaseMutation, SalesMutatio
     pass
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=SCHEMA_EXTENSIONS)
\ No newline at end of file
@@ -0,0 +1,11 @@
+from .optimizer import SelectionOptimizerExtension
+from .persisted_queries import PersistedQueryExtension
+from .query_cost import QueryCostExtension
+
+# Installed on the project schema and on every per-app schema, so each
+# GraphQL endpoint applies the same optimisation and limits
+SCHEMA_EXTENSIONS = [
+    PersistedQueryExtension,
+    QueryCostExtension,
+    SelectionOptimizerExtension,
+]
@@ -178,23 +178,162 @@ STRAWBERRY_DJANGO = {
     "FIELD_DESCRIPTION_FROM_HELP_TEXT": True,
     "TYPE_DESCRIPTION_FROM_MODEL_DOCSTRING": True,
 }
+# Connection fields (productsConnection, ...) return GRAPHQL_DEFAULT_PAGE_SIZE
+# rows unless asked for more; no page, and no plain list field, exceeds the max
+GRAPHQL_DEFAULT_PAGE_SIZE = 50
+GRAPHQL_MAX_PAGE_SIZE = 500
+# Automatic persisted queries: query text by sha256 in this (shared) cache.
+# With the allowlist on, only hashes listed in the manifest (Apollo
+# persisted-query-manifest.json or {hash: query}) are executed.
+GRAPHQL_PERSISTED_QUERY_CACHE = 'alerts'
+GRAPHQL_PERSISTED_QUERY_TTL = 7 * 24 * 3600
+GRAPHQL_PERSISTED_QUERIES_ALLOWLIST = False
+GRAPHQL_PERSISTED_QUERY_MANIFEST = None
+# Parsed and validated documents kept per process
+GRAPHQL_DOCUMENT_CACHE_SIZE = 1000
+# Static query cost: object fields cost 1, scalars 0 (override per "Type.field"),
+# multiplied by page sizes; root lists count GRAPHQL_MAX_PAGE_SIZE rows and other
+# lists (items of a purchase or sale) GRAPHQL_QUERY_COST_LIST_SIZE
+GRAPHQL_MAX_QUERY_DEPTH = 10
+GRAPHQL_MAX_QUERY_COST = 20000
+GRAPHQL_QUERY_COST_LIST_SIZE = 20
+GRAPHQL_FIELD_COSTS = {}
+# Cost each user (or client address) may spend per window; None disables
+GRAPHQL_COST_BUDGET = 200000
+GRAPHQL_COST_BUDGET_WINDOW = 60
+GRAPHQL_COST_BUDGET_CACHE = 'alerts'
 
 # Channels and WebSocket settings
 ASGI_APPLICATION = 'config.asgi.application'
 
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        # RedisChannelLayer plus pub/sub fan-out for the broadcast alert groups
+        'BACKEND': 'apps.inventory.channel_layers.BroadcastRedisChannelLayer',
         'CONFIG': {
             "hosts": [('127.0.0.1', 6379)],
+            # Groups whose group_send is one PUBLISH instead of one queue write per member
+            "broadcast_groups": [
+                'stock_alerts', 'purchase_suggestions',
+                'product_alerts_*', 'category_alerts_*', 'severity_alerts_*', 'supplier_alerts_*',
+                'stock_ticker_*',
+            ],
+            # Redis hosts the broadcast groups are sharded across (defaults to "hosts")
+            "broadcast_hosts": [('127.0.0.1', 6379)],
         },
     },
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared across web workers and consumers (alert state, dedupe keys, ...)
+    'alerts': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
+}
+
 # Kafka settings
 KAFKA_BOOTSTRAP_SERVERS = ['localhost:9092']
 KAFKA_STOCK_ALERTS_TOPIC = 'stock-alerts'
 
+# Broker used by the alert producer/consumers. For CI and local benchmarks
+# without Kafka use {'BACKEND': 'apps.inventory.transports.InMemoryTransport',
+# 'OPTIONS': {'partitions': 4}} (producer and consumers must share a process).
+STOCK_ALERT_TRANSPORT = {
+    'BACKEND': 'apps.inventory.transports.KafkaTransport',
+    'OPTIONS': {'bootstrap_servers': KAFKA_BOOTSTRAP_SERVERS},
+}
+# Offsets are committed manually after processing (at-least-once); set to
+# 'earliest' to replay from the start when a new consumer group is created
+KAFKA_CONSUMER_AUTO_OFFSET_RESET = 'latest'
+# Upper bound on filter groups (product/category/severity/supplier) one
+# stock alert WebSocket may subscribe to
+STOCK_ALERT_MAX_SUBSCRIPTIONS = 2000
+# Stock alert WebSockets may ask for batched delivery with ?batch_window_ms=N;
+# the window is capped here and a batch is flushed early once it holds this many SKUs
+STOCK_ALERT_BATCH_MAX_WINDOW_MS = 5000
+STOCK_ALERT_BATCH_MAX_SIZE = 500
+# Recent alerts kept (in STOCK_ALERT_CACHE) for WebSocket clients resuming with
+# last_event_id; a larger gap gets a snapshot of up to SNAPSHOT_LIMIT products
+STOCK_ALERT_HISTORY_SIZE = 10000
+STOCK_ALERT_HISTORY_TTL = 3600
+STOCK_ALERT_SNAPSHOT_LIMIT = 1000
+# Newest event ids whose history entry may still be in flight; a reconnect
+# replays up to them instead of treating them as evicted
+STOCK_ALERT_HISTORY_IN_FLIGHT = 1000
+# Seconds between keepalive comments on the Server-Sent Events streams
+STOCK_ALERT_SSE_KEEPALIVE_SECONDS = 15
+# Per-connection outbound WebSocket queue. When a slow client fills it:
+# 'drop_oldest' drops frames, 'coalesce' replaces queued frames for the same
+# SKU first, 'disconnect' sends a resync hint and closes the socket.
+WEBSOCKET_OUTBOUND_QUEUE_SIZE = 1000
+WEBSOCKET_OVERFLOW_POLICY = 'drop_oldest'
+# Low stock set sent to WebSockets on connect, kept up to date from product
+# saves. Seed it (or repair it after bulk updates) with rebuild_low_stock_index.
+STOCK_ALERT_LOW_STOCK_INDEX = {
+    'BACKEND': 'apps.inventory.low_stock_index.RedisLowStockIndex',
+    'OPTIONS': {'url': 'redis://127.0.0.1:6379/1'},
+}
+# Kafka value encoding for new alerts: 'msgpack' (compact, schema-versioned)
+# or 'json'. Upgraded consumers decode both; deploy them before switching.
+STOCK_ALERT_ENCODING = 'msgpack'
+# Live stock ticker (ws/stock-ticker/): products one socket may watch, seconds
+# between keyframes, and how long the last level of each product is cached
+STOCK_TICKER_MAX_PRODUCTS = 5000
+STOCK_TICKER_KEYFRAME_SECONDS = 30
+STOCK_TICKER_STATE_TTL = 24 * 3600
+# Ticks waiting for the background publisher; newer ticks are dropped when full
+STOCK_TICKER_QUEUE_SIZE = 10000
+# Failed alerts move through these (topic, delay seconds) tiers, then to the DLQ.
+# Run one `start_kafka_consumer --retry-tier N` per tier.
+KAFKA_STOCK_ALERTS_RETRY_TIERS = [
+    ('stock-alerts-retry-1', 5),
+    ('stock-alerts-retry-2', 60),
+    ('stock-alerts-retry-3', 600),
+]
+KAFKA_STOCK_ALERTS_DLQ_TOPIC = 'stock-alerts-dlq'
+# Consumer polls up to BATCH_SIZE records or MAX_WAIT_MS, whichever comes first
+KAFKA_CONSUMER_BATCH_SIZE = 500
+KAFKA_CONSUMER_MAX_WAIT_MS = 100
+# `start_kafka_consumer --mode async`: alerts in flight and ORM thread pool size
+KAFKA_CONSUMER_CONCURRENCY = 100
+KAFKA_CONSUMER_ORM_WORKERS = 8
+# `start_kafka_consumer --mode pool`: worker threads and per-worker queue bound
+KAFKA_CONSUMER_WORKERS = 8
+KAFKA_CONSUMER_WORKER_QUEUE_SIZE = 1000
+
+# Shared producer tuning: batch alerts for up to linger_ms instead of
+# flushing each one, and compress batches on the wire
+KAFKA_PRODUCER_CONFIG = {
+    'linger_ms': 20,
+    'batch_size': 64 * 1024,
+    'compression_type': 'gzip',
+    'max_block_ms': 5000,
+}
+# Seconds between attempts to recreate the producer while the broker is down
+KAFKA_PRODUCER_RETRY_BACKOFF_MAX = 60
+# Alerts waiting for the producer thread; extra alerts are dropped, never blocked on
+KAFKA_ALERT_QUEUE_SIZE = 10000
+
+# Transactional outbox: stock alerts are stored with the stock change and
+# published by `manage.py relay_outbox` after commit
+STOCK_ALERT_USE_OUTBOX = True
+OUTBOX_RELAY_BATCH_SIZE = 500
+OUTBOX_RELAY_POLL_INTERVAL = 0.5
+
+# Alert debouncing: alert on crossing the threshold or escalating severity,
+# re-arm once stock is back above threshold + max(ratio * threshold, min units)
+STOCK_ALERT_CACHE = 'alerts'
+STOCK_ALERT_COOLDOWN_SECONDS = 900
+STOCK_ALERT_REARM_RATIO = 0.2
+STOCK_ALERT_REARM_MIN_UNITS = 1
+STOCK_ALERT_STATE_TTL = 7 * 24 * 3600
+# How long processed alert idempotency keys are remembered by consumers
+STOCK_ALERT_DEDUPE_TTL = 24 * 3600
+
 # # Logging configuration
 # LOGGING = {
 #     'version': 1,